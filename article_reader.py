@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章读取：所有脚本共用的文章解析入口
+爬虫在每篇文章的文本文件旁写一个同名的 .json 元数据文件（标题、网址、正文、发布日期、图片和视频），
+读取时优先使用元数据文件；没有元数据文件（旧版文件）或文本文件在之后被修改过时，
+按爬虫写入的文本格式一次扫描解析：
+    标题: <标题>
+    网址: <网址>
+    日期: <发布日期>（可选，爬虫从网址或网页元数据中解析到发布日期时写入）
+
+    <正文>
+
+    图片列表:
+    1. <文件名> - 尺寸: <宽>x<高>
+
+    视频列表:
+    1. <文件名>
+"""
+
+import os
+import re
+import json
+import logging
+from typing import Dict, Iterator, List, Optional
+
+from storage_layout import StorageLayout
+from date_resolver import date_from_url, find_date, is_plausible
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_EXT = '.json'
+SIDECAR_VERSION = 2
+
+# 以下正则都预编译，并在原文上按位置(pos/endpos)匹配，不为每行或每段生成中间字符串
+# 头部的标题、网址、日期行，兼容全角冒号
+HEADER_PATTERN = re.compile(r'(标题|网址|日期)[:：]')
+# 资源列表标题，兼容全角冒号
+SECTION_PATTERN = re.compile(r'^(图片列表|视频列表)[:：][ \t]*$', re.MULTILINE)
+# 资源列表中的一行，例如 "1. 3f2a9c0d1e4b5a67_1.jpeg - 尺寸: 600x303"
+ASSET_PATTERN = re.compile(r'^\d+\.[ \t]+(.+?)(?:[ \t]+-[ \t]+尺寸:[ \t]*(\d+)x(\d+))?[ \t]*$', re.MULTILINE)
+# 正文末尾网页上的“Specials”“Videos”推荐栏目，不属于文章内容
+SITE_SECTION_PATTERN = re.compile(r'\n(?:Specials|Videos)\n')
+BLANK_PATTERN = re.compile(r'[ \t\r]*$')
+
+
+def sidecar_path(text_path: str) -> str:
+    """文本文件对应的元数据文件路径"""
+    return os.path.splitext(text_path)[0] + SIDECAR_EXT
+
+
+def parse_article_text(text: str) -> Dict:
+    """
+    一次扫描解析爬虫写入的文本格式：逐行跳过头部，定位资源列表，正文只切片一次
+    发布日期依次取头部的“日期:”行、网址中的日期、正文中的日期（见date_resolver.py）
+    :return: 包含 title、url、body、publish_date（ISO格式或None）、date_source、images、videos 的字典
+    """
+    title = url = ''
+    header_date = None
+    length = len(text)
+    pos = 0
+    body_start = length
+
+    # 头部：标题行、网址行和空行，遇到第一行正文为止
+    while pos < length:
+        end = text.find('\n', pos)
+        if end < 0:
+            end = length
+        header = HEADER_PATTERN.match(text, pos, end)
+        if header and header.group(1) == '标题':
+            title = text[header.end():end].strip()
+        elif header and header.group(1) == '网址':
+            url = text[header.end():end].strip()
+        elif header:
+            header_date = find_date(text, header.end(), end)
+        elif not BLANK_PATTERN.match(text, pos, end):
+            body_start = pos
+            break
+        pos = end + 1
+
+    # 正文到第一个资源列表为止，再去掉末尾的网页推荐栏目
+    section = SECTION_PATTERN.search(text, body_start)
+    body_end = section.start() if section else length
+    site_section = SITE_SECTION_PATTERN.search(text, body_start, body_end)
+    if site_section:
+        body_end = site_section.start()
+
+    images: List[Dict] = []
+    videos: List[Dict] = []
+    while section:
+        next_section = SECTION_PATTERN.search(text, section.end())
+        section_end = next_section.start() if next_section else length
+        for match in ASSET_PATTERN.finditer(text, section.end(), section_end):
+            if section.group(1) == '图片列表':
+                width, height = match.group(2), match.group(3)
+                images.append({
+                    'file_name': match.group(1),
+                    'width': int(width) if width else None,
+                    'height': int(height) if height else None,
+                })
+            else:
+                videos.append({'file_name': match.group(1)})
+        section = next_section
+
+    if header_date:
+        publish_date, date_source = header_date, 'header'
+    else:
+        publish_date, date_source = date_from_url(url), 'url'
+        if not publish_date:
+            publish_date, date_source = find_date(text, body_start, body_end), 'text'
+            if not is_plausible(publish_date):
+                publish_date = date_source = None
+
+    return {
+        'title': title,
+        'url': url,
+        'body': text[body_start:body_end].strip(),
+        'publish_date': publish_date,
+        'date_source': date_source,
+        'images': images,
+        'videos': videos,
+    }
+
+
+def write_sidecar(text_path: str, article: Dict):
+    """写入元数据文件（先写临时文件再替换），应在文本文件之后写入"""
+    path = sidecar_path(text_path)
+    record = dict(article, version=SIDECAR_VERSION)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_sidecar(text_path: str) -> Optional[Dict]:
+    """
+    读取元数据文件，不存在、无法解析或比文本文件旧（文本被修改过）时返回None
+    """
+    path = sidecar_path(text_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(text_path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    except OSError:
+        return None
+    except ValueError as e:
+        logger.warning(f"元数据文件无法解析（{e}），改为解析文本: {path}")
+        return None
+    return record if record.get('version') == SIDECAR_VERSION else None
+
+
+def read_article(text_path: str, text: Optional[str] = None) -> Dict:
+    """
+    读取一篇文章，优先使用元数据文件
+    :param text_path: 文本文件路径
+    :param text: 已经读出的文本内容（调用方需要原文时可避免重复读取）
+    :return: 文章字典，另外带有 text_path；旧版文件没有标题行时以文件名作为标题
+    """
+    article = read_sidecar(text_path)
+    if article is None:
+        if text is None:
+            with open(text_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        article = parse_article_text(text)
+    if not article.get('title'):
+        article['title'] = os.path.splitext(os.path.basename(text_path))[0]
+    article['text_path'] = text_path
+    return article
+
+
+def iter_articles(layout: Optional[StorageLayout] = None) -> Iterator[Dict]:
+    """遍历所有文章（按文本文件路径排序），无法读取的文件记录日志后跳过"""
+    layout = layout or StorageLayout(load_manifest=False)
+    for text_path in layout.iter_text_files():
+        try:
+            yield read_article(text_path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"读取文章 {text_path} 失败: {e}")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本解析基准：比较 article_reader 的单次扫描解析与原来逐个 re.search/re.sub 的解析方式
+两种方式都只处理已经读入内存的文本（不含磁盘IO），并核对解析结果是否一致。
+用法: python benchmark_parser.py [--repeat 5] [--limit 0]
+"""
+
+import re
+import sys
+import time
+import argparse
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from storage_layout import StorageLayout
+from article_reader import parse_article_text
+from date_resolver import date_from_url, is_plausible
+
+# 原来的解析方式：每个字段各跑一次正则，正文经过三次整段替换，日期按四个模式依次扫描
+# （日期的优先级与article_reader相同：头部“日期:”行、网址、正文）
+DATE_PATTERNS = [
+    r'(\d{4})年(\d{1,2})月(\d{1,2})日',
+    r'(\d{4}-\d{1,2}-\d{1,2})',
+    r'(\d{1,2}/\d{1,2}/\d{4})',
+    r'(\d{4}\.\d{1,2}\.\d{1,2})'
+]
+
+
+def regex_extract_date(content: str) -> Optional[date]:
+    for pattern in DATE_PATTERNS:
+        match = re.search(pattern, content)
+        if match:
+            try:
+                if len(match.groups()) == 3:
+                    year, month, day = match.groups()
+                    return date(int(year), int(month), int(day))
+                elif '-' in match.group(1):
+                    return datetime.strptime(match.group(1), '%Y-%m-%d').date()
+            except ValueError:
+                continue
+    return None
+
+
+def regex_parse(content: str) -> Dict:
+    title_match = re.search(r'标题: (.+)', content)
+    url_match = re.search(r'网址: (.+)', content)
+    date_match = re.search(r'^日期: (\d{4}-\d{2}-\d{2})', content, re.MULTILINE)
+    text_content = re.sub(r'标题: .+\n网址: .+\n(?:日期: .+\n)?\n', '', content)
+    text_content = re.sub(r'(?:图片列表|视频列表):.*$', '', text_content, flags=re.DOTALL)
+    text_content = re.sub(r'\n(?:Specials|Videos)\n.*$', '', text_content, flags=re.DOTALL)
+    url = url_match.group(1).strip() if url_match else ''
+    if date_match:
+        publish_date = date_match.group(1)
+    else:
+        publish_date = date_from_url(url)
+        if not publish_date:
+            found = regex_extract_date(text_content)
+            publish_date = found.isoformat() if found and is_plausible(found.isoformat()) else None
+    first_image = re.search(r'图片列表:\n1\. (.+?)(?: - 尺寸: \d+x\d+)?$', content, re.MULTILINE)
+    return {
+        'title': title_match.group(1).strip() if title_match else '',
+        'url': url,
+        'body': text_content.strip(),
+        'publish_date': publish_date,
+        'first_image': first_image.group(1) if first_image else None,
+    }
+
+
+def scanner_parse(content: str) -> Dict:
+    article = parse_article_text(content)
+    return {
+        'title': article['title'],
+        'url': article['url'],
+        'body': article['body'],
+        'publish_date': article['publish_date'],
+        'first_image': article['images'][0]['file_name'] if article['images'] else None,
+    }
+
+
+def run(parse, texts: List[str], repeat: int) -> float:
+    """返回最快一轮的耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            parse(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文本解析基准测试')
+    parser.add_argument('--repeat', type=int, default=5, help='重复轮数，取最快一轮（默认5）')
+    parser.add_argument('--limit', type=int, default=0, help='最多读取的文件数（默认全部）')
+    args = parser.parse_args()
+
+    texts = []
+    for file_path in StorageLayout(load_manifest=False).iter_text_files():
+        with open(file_path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+        if args.limit and len(texts) >= args.limit:
+            break
+    if not texts:
+        print("texts/ 中没有文本文件")
+        sys.exit(1)
+
+    mismatches = {}
+    for text in texts:
+        expected, actual = regex_parse(text), scanner_parse(text)
+        for key in expected:
+            if expected[key] != actual[key]:
+                mismatches[key] = mismatches.get(key, 0) + 1
+
+    total_mb = sum(len(text.encode('utf-8')) for text in texts) / 1024 / 1024
+    regex_time = run(regex_parse, texts, args.repeat)
+    scanner_time = run(scanner_parse, texts, args.repeat)
+
+    print(f"文件数: {len(texts)}，共 {total_mb:.1f} MB，取 {args.repeat} 轮中最快一轮")
+    print(f"逐个正则:   {regex_time * 1000:8.1f} ms  ({len(texts) / regex_time:,.0f} 篇/秒)")
+    print(f"单次扫描:   {scanner_time * 1000:8.1f} ms  ({len(texts) / scanner_time:,.0f} 篇/秒)")
+    print(f"加速比:     {regex_time / scanner_time:.2f}x")
+    if mismatches:
+        print(f"解析结果不一致的字段: {mismatches}")
+    else:
+        print("两种方式的解析结果完全一致")
+
+
+if __name__ == '__main__':
+    main()
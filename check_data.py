@@ -4,22 +4,16 @@
 简化版数据验证脚本
 """
 
-import mysql.connector
 from mysql.connector import Error
 
+from db_access import get_database
+
 def check_data():
     """检查数据导入结果"""
 
     try:
-        config = {
-            'host': 'localhost',
-            'user': 'root',
-            'password': '1234',
-            'database': 'public-opinion-analysis-system',
-            'charset': 'utf8mb4'
-        }
-
-        connection = mysql.connector.connect(**config)
+        # 从共享连接池借用连接，配置见db_access.py
+        connection = get_database().get_connection()
         cursor = connection.cursor()
 
         print("=== 数据导入检查报告 ===")
@@ -120,8 +114,9 @@ def check_data():
         print(f"检查失败: {e}")
         return False
     finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals():
+            if 'cursor' in locals():
+                cursor.close()
             connection.close()
 
     return True
@@ -4,14 +4,60 @@ import requests
 from bs4 import BeautifulSoup
 import re
 import time
-from urllib.parse import urljoin
+import codecs
+from urllib.parse import urljoin, urlparse
 import random
 import logging
 import json
+import heapq
+import hashlib
+from collections import deque
 from datetime import datetime
 from io import BytesIO
 from PIL import Image
 
+from storage_layout import StorageLayout, make_article_id
+from article_reader import parse_article_text, read_sidecar, write_sidecar
+from date_resolver import resolve_publish_date
+
+# 统计编码检测库（requests依赖其中之一）
+try:
+    from charset_normalizer import from_bytes as detect_charset
+except ImportError:
+    detect_charset = None
+    try:
+        import chardet
+    except ImportError:
+        chardet = None
+
+# 编码识别用的正则
+CHARSET_HEADER_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+NON_ASCII_PATTERN = re.compile(rb'[\x80-\xff]')
+# 统计检测的置信度不低于该值时才按主机缓存
+CHARSET_MIN_CONFIDENCE = 0.8
+
+# 常见BOM及其编码
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# 中文网站常把GBK声明为gb2312，统一使用其超集gb18030解码
+ENCODING_ALIASES = {
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030',
+    'x-gbk': 'gb18030',
+    'gb_2312-80': 'gb18030',
+}
+
+class TransferAborted(Exception):
+    """下载因内容类型、大小或耗时超出限制而中止"""
+
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -23,24 +69,28 @@ logging.basicConfig(
 )
 
 class WebCrawler:
-    def __init__(self, excel_path):
+    def __init__(self, excel_path, recrawl=False):
         """
         初始化爬虫类
         :param excel_path: Excel文件的路径
+        :param recrawl: 是否重新爬取已完成的URL（只有内容变化的文章才会重写）
         """
         self.excel_path = excel_path
+        self.recrawl = recrawl
         
-        # 创建保存数据的文件夹
-        self.text_folder = 'texts'
-        self.image_folder = 'images'
-        self.video_folder = 'videos'
-        
-        os.makedirs(self.text_folder, exist_ok=True)
-        os.makedirs(self.image_folder, exist_ok=True)
-        os.makedirs(self.video_folder, exist_ok=True)
+        # 创建保存数据的文件夹（按文章ID分片存放）
+        self.layout = StorageLayout()
+        self.layout.ensure_dirs()
         
         # 进度文件路径
         self.progress_file = 'crawler_progress.json'
+        # 多次重试仍失败的URL列表
+        self.dead_letter_file = 'crawler_dead_letter.json'
+        
+        # 重试配置：失败的URL按指数退避加随机抖动重新排队
+        self.max_attempts = 4
+        self.retry_base_delay = 10  # 秒
+        self.retry_max_delay = 300  # 秒
         
         # 请求头
         self.headers = {
@@ -61,6 +111,40 @@ class WebCrawler:
             '.text', '.body', '#main', '.container', '.wrapper'
         ]
 
+        # 下载限制：超过大小上限、耗时上限或内容类型不符时中止传输
+        self.max_bytes = {
+            'page': 5 * 1024 * 1024,
+            'image': 20 * 1024 * 1024,
+            'video': 500 * 1024 * 1024,
+        }
+        self.max_transfer_seconds = {
+            'page': 30,
+            'image': 60,
+            'video': 600,
+        }
+        self.allowed_content_types = {
+            'page': ('text/html', 'application/xhtml+xml', 'text/plain'),
+            'image': ('image/', 'application/octet-stream'),
+            'video': ('video/', 'application/octet-stream', 'application/mp4', 'binary/octet-stream'),
+        }
+        
+        # 爬取统计
+        self.stats = {
+            'pages': 0,
+            'images': 0,
+            'videos': 0,
+            'aborted_transfers': 0,
+            'aborted_by_kind': {'page': 0, 'image': 0, 'video': 0},
+            'added': 0,
+            'modified': 0,
+            'unchanged': 0,
+        }
+        
+        # 编码识别配置
+        self.charset_sniff_bytes = 4096  # 在前几KB中查找<meta charset>
+        self.charset_detect_bytes = 32768  # 统计检测只使用这么多字节
+        self.host_encodings = {}  # 按主机缓存识别出的编码
+        
         # 加载爬取进度
         self.completed_urls = self.load_progress()
     
@@ -92,6 +176,40 @@ class WebCrawler:
         except Exception as e:
             logging.error(f"保存进度文件失败: {str(e)}")
     
+    def retry_delay(self, attempt):
+        """
+        计算第attempt次失败后的重试等待时间（指数退避加随机抖动）
+        :param attempt: 已尝试的次数
+        :return: 等待秒数
+        """
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def save_dead_letters(self, dead_letters):
+        """
+        把本次运行中最终失败的URL合并写入死信文件
+        :param dead_letters: 失败记录列表
+        """
+        records = {}
+        if os.path.exists(self.dead_letter_file):
+            try:
+                with open(self.dead_letter_file, 'r', encoding='utf-8') as f:
+                    records = {item['url']: item for item in json.load(f)}
+            except Exception as e:
+                logging.error(f"加载死信文件失败: {str(e)}")
+        
+        for item in dead_letters:
+            records[item['url']] = item
+        # 已经成功的URL不再保留
+        for url in self.completed_urls:
+            records.pop(url, None)
+        
+        try:
+            with open(self.dead_letter_file, 'w', encoding='utf-8') as f:
+                json.dump(list(records.values()), f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logging.error(f"保存死信文件失败: {str(e)}")
+    
     def read_excel(self):
         """
         读取Excel文件
@@ -107,6 +225,180 @@ class WebCrawler:
             logging.error(f"读取Excel文件失败: {str(e)}")
             return None
     
+    @staticmethod
+    def normalize_encoding(encoding):
+        """
+        规范化编码名称，无法识别的编码返回None
+        :param encoding: 编码名称
+        :return: Python可用的编码名称
+        """
+        if not encoding:
+            return None
+        encoding = encoding.strip().lower()
+        encoding = ENCODING_ALIASES.get(encoding, encoding)
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            return None
+    
+    def detect_encoding(self, response, content):
+        """
+        按代价从低到高识别网页编码：HTTP头、BOM、<meta charset>、主机缓存（只缓存声明的或可靠检测出的编码）、统计检测
+        :param response: requests响应对象
+        :param content: 响应的原始字节
+        :return: 编码名称
+        """
+        host = urlparse(response.url).netloc
+        
+        # 1. HTTP头中声明的编码
+        header_match = CHARSET_HEADER_PATTERN.search(response.headers.get('Content-Type', ''))
+        if header_match:
+            encoding = self.normalize_encoding(header_match.group(1))
+            if encoding:
+                return encoding
+        
+        # 2. BOM
+        for bom, encoding in BOMS:
+            if content.startswith(bom):
+                return encoding
+        
+        # 3. 前几KB中的<meta charset>
+        meta_match = META_CHARSET_PATTERN.search(content[:self.charset_sniff_bytes])
+        if meta_match:
+            encoding = self.normalize_encoding(meta_match.group(1).decode('ascii', 'ignore'))
+            if encoding:
+                self.host_encodings[host] = encoding
+                return encoding
+        
+        # 4. 同一主机之前识别过的编码
+        if host in self.host_encodings:
+            return self.host_encodings[host]
+        
+        # 5. 只对一段字节做检测：纯ASCII的字节（标记、脚本、英文导航）既是合法的UTF-8也是合法的GBK，
+        #    无法区分编码，因此从第一个非ASCII字节所在处取样
+        non_ascii = NON_ASCII_PATTERN.search(content)
+        if non_ascii is None:
+            # 纯ASCII网页用任何兼容ASCII的编码解码结果都相同，不能据此判断主机的编码
+            return 'utf-8'
+        start = 0 if non_ascii.start() < self.charset_detect_bytes else non_ascii.start()
+        sample = content[start:start + self.charset_detect_bytes]
+        
+        # 含非ASCII字节且能按UTF-8解码时基本可以确定是UTF-8，否则做统计检测
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+            encoding, confidence = 'utf-8', 1.0
+        except UnicodeDecodeError:
+            encoding, confidence = self.detect_statistically(sample)
+        
+        if encoding and confidence >= CHARSET_MIN_CONFIDENCE:
+            logging.info(f"检测到编码 {encoding}（置信度 {confidence:.2f}）: {host}")
+            self.host_encodings[host] = encoding
+            return encoding
+        # 检测结果不可靠时只用于本页，不缓存；中文网站最常见的是GBK
+        logging.info(f"编码检测结果不可靠（{encoding}，置信度 {confidence:.2f}），本页按 {encoding or 'gb18030'} 解码: {host}")
+        return encoding or 'gb18030'
+    
+    def detect_statistically(self, sample):
+        """
+        统计检测编码
+        :return: (编码名称, 置信度)，没有可用的检测库或检测失败时返回 (None, 0.0)
+        """
+        if detect_charset is not None:
+            best = detect_charset(sample).best()
+            if best is None:
+                return None, 0.0
+            # charset_normalizer用“混乱度”（0到1）衡量解码结果，越低越可信
+            return self.normalize_encoding(best.encoding), 1.0 - best.chaos
+        if chardet is not None:
+            result = chardet.detect(sample)
+            return self.normalize_encoding(result.get('encoding')), result.get('confidence') or 0.0
+        return None, 0.0
+    
+    def record_abort(self, url, kind, reason):
+        """
+        记录一次被中止的传输
+        :param kind: 'page'、'image' 或 'video'
+        """
+        self.stats['aborted_transfers'] += 1
+        self.stats['aborted_by_kind'][kind] += 1
+        logging.warning(f"已中止下载 ({kind}) - {url}: {reason}")
+    
+    def open_stream(self, url, kind, timeout=10):
+        """
+        以流式方式发起请求，并在读取正文前检查Content-Type和Content-Length
+        :param url: 资源URL
+        :param kind: 'page'、'image' 或 'video'
+        :return: 尚未读取正文的响应对象
+        """
+        response = requests.get(url, headers=self.headers, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type and not content_type.startswith(self.allowed_content_types[kind]):
+                raise TransferAborted(f"内容类型不符: {content_type}")
+            
+            content_length = response.headers.get('Content-Length', '')
+            if content_length.isdigit() and int(content_length) > self.max_bytes[kind]:
+                raise TransferAborted(f"内容过大: {content_length} 字节")
+        except TransferAborted as e:
+            response.close()
+            self.record_abort(url, kind, e)
+            raise
+        except Exception:
+            response.close()
+            raise
+        return response
+    
+    def iter_limited(self, response, kind, chunk_size=65536):
+        """
+        逐块读取响应正文，超过大小或耗时上限时中止
+        :param response: open_stream返回的响应对象
+        :param kind: 'page'、'image' 或 'video'
+        :return: 数据块生成器
+        """
+        max_bytes = self.max_bytes[kind]
+        deadline = time.monotonic() + self.max_transfer_seconds[kind]
+        received = 0
+        
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            received += len(chunk)
+            if received > max_bytes:
+                raise TransferAborted(f"内容超过上限 {max_bytes} 字节")
+            if time.monotonic() > deadline:
+                raise TransferAborted(f"下载超过 {self.max_transfer_seconds[kind]} 秒")
+            yield chunk
+    
+    def fetch_bytes(self, url, kind, timeout=10):
+        """
+        带限制地下载完整内容
+        :param url: 资源URL
+        :param kind: 'page' 或 'image'
+        :return: (响应对象, 内容字节)
+        """
+        response = self.open_stream(url, kind, timeout)
+        try:
+            content = b''.join(self.iter_limited(response, kind))
+        except TransferAborted as e:
+            self.record_abort(url, kind, e)
+            raise
+        finally:
+            response.close()
+        return response, content
+    
+    def fetch_page(self, url):
+        """
+        获取网页并解码为文本
+        :param url: 网页URL
+        :return: 网页HTML文本
+        """
+        response, content = self.fetch_bytes(url, 'page')
+        self.stats['pages'] += 1
+        encoding = self.detect_encoding(response, content)
+        return content.decode(encoding, errors='replace')
+    
     def extract_article_content(self, soup):
         """
         从BeautifulSoup对象中提取文章正文内容
@@ -160,29 +452,32 @@ class WebCrawler:
             
             return '\n\n'.join(paragraphs), soup.find('body')  # 如果找不到更好的容器，使用body作为容器
     
-    def download_text(self, url, title, saved_images=None, saved_videos=None):
+    def download_text(self, url, title, saved_images=None, saved_videos=None, page_fingerprint=None, soup=None):
         """
         下载并保存文本内容
         :param url: 网页URL
         :param title: 文章标题
         :param saved_images: 已保存的图片列表，用于添加到文本末尾
         :param saved_videos: 已保存的视频列表，用于添加到文本末尾
+        :param page_fingerprint: 网页指纹，记录到清单中，下次爬取时网页没有变化就不再下载图片和视频
+        :param soup: 已经获取并解析的网页，为None时重新获取
         :return: 是否成功，以及提取到的文章容器元素
         """
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
+            if soup is None:
+                soup = BeautifulSoup(self.fetch_page(url), 'html.parser')
             
             # 提取文章正文内容和容器
             content, article_container = self.extract_article_content(soup)
             
-            # 清理文件名，去除不合法字符
-            safe_title = re.sub(r'[\\/*?:"<>|]', "", title)
+            # 按网址、meta标签、JSON-LD、正文的顺序解析发布日期
+            publish_date, date_source = resolve_publish_date(url, soup, content)
             
-            # 创建带有标题和网址的完整内容
-            full_content = f"标题: {title}\n网址: {url}\n\n{content}"
+            # 创建带有标题和网址的完整内容；来自网站结构化信息的发布日期写入头部，正文中的日期读取时会重新解析
+            full_content = f"标题: {title}\n网址: {url}\n"
+            if publish_date and date_source != 'text':
+                full_content += f"日期: {publish_date}\n"
+            full_content += f"\n{content}"
             
             # 如果有保存的图片列表，添加到文本末尾
             if saved_images and len(saved_images) > 0:
@@ -196,17 +491,102 @@ class WebCrawler:
                 for i, video_info in enumerate(saved_videos):
                     full_content += f"{i+1}. {video_info['file_name']}\n"
             
-            # 保存文本文件
-            file_path = os.path.join(self.text_folder, f"{safe_title}.txt")
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(full_content)
+            # 用正文和资源列表计算指纹，内容未变化时不重写文件
+            article_id = make_article_id(url)
+            file_path = self.layout.text_path(article_id)
+            fingerprint = self.content_fingerprint(full_content, saved_images, saved_videos)
             
-            logging.info(f"已保存文本: {file_path}")
+            previous = self.layout.get_article(article_id)
+            if previous is None or not os.path.exists(file_path):
+                status = 'added'
+            elif previous.get('fingerprint') != fingerprint:
+                status = 'modified'
+            else:
+                status = 'unchanged'
+            self.stats[status] += 1
+            
+            if status == 'unchanged':
+                logging.info(f"内容未变化，跳过写入: {file_path}")
+                # 之前爬取的文章还没有元数据文件（或是旧版本）时补写
+                if read_sidecar(file_path) is None:
+                    write_sidecar(file_path, self.build_article_record(
+                        article_id, title, url, full_content, saved_images, saved_videos,
+                        publish_date, date_source))
+                if page_fingerprint and previous.get('page_fingerprint') != page_fingerprint:
+                    self.layout.register_article(article_id, title, url, page_fingerprint=page_fingerprint)
+            else:
+                with open(self.layout.prepare_path(file_path), 'w', encoding='utf-8') as f:
+                    f.write(full_content)
+                # 元数据文件在文本之后写入，下游读取时优先使用
+                write_sidecar(file_path, self.build_article_record(
+                    article_id, title, url, full_content, saved_images, saved_videos,
+                    publish_date, date_source))
+                
+                # 在清单中记录ID与标题、网址、指纹的对应关系
+                self.layout.register_article(
+                    article_id, title, url,
+                    text_file=file_path,
+                    images=[img_info['file_name'] for img_info in saved_images or []],
+                    videos=[video_info['file_name'] for video_info in saved_videos or []],
+                    publish_date=publish_date,
+                    fingerprint=fingerprint,
+                    page_fingerprint=page_fingerprint
+                )
+                logging.info(f"已保存文本: {file_path}")
+            
+            self.layout.append_change(article_id, url, status, title=title, text_file=file_path)
             return True, article_container
+        except requests.exceptions.RequestException:
+            # 网络错误交给start_crawling的重试队列处理
+            raise
         except Exception as e:
             logging.error(f"下载文本失败 - {url}: {str(e)}")
             return False, None
     
+    @staticmethod
+    def build_article_record(article_id, title, url, full_content, saved_images=None, saved_videos=None,
+                             publish_date=None, date_source=None):
+        """
+        生成文章的元数据记录（见article_reader.py），正文按与读取文本时相同的规则切分
+        :param publish_date: 抓取时解析出的发布日期（ISO格式），没有时按文本解析
+        :param date_source: 发布日期的来源（url、meta、json-ld、text）
+        :return: 包含 id、title、url、body、publish_date、date_source、images、videos 的字典
+        """
+        record = parse_article_text(full_content)
+        if publish_date:
+            record.update({'publish_date': publish_date, 'date_source': date_source})
+        record.update({
+            'id': article_id,
+            'title': title,
+            'url': url,
+            'images': [
+                {
+                    'file_name': info['file_name'],
+                    'width': info.get('display_width'),
+                    'height': info.get('display_height'),
+                    'url': info.get('url'),
+                }
+                for info in saved_images or []
+            ],
+            'videos': [
+                {'file_name': info['file_name'], 'url': info.get('url')}
+                for info in saved_videos or []
+            ],
+            'crawled': datetime.now().isoformat(timespec='seconds'),
+        })
+        return record
+    
+    @staticmethod
+    def content_fingerprint(full_content, saved_images=None, saved_videos=None):
+        """
+        计算文章指纹：文本内容加上图片和视频的来源URL
+        :return: SHA256十六进制字符串
+        """
+        digest = hashlib.sha256(full_content.encode('utf-8'))
+        for info in (saved_images or []) + (saved_videos or []):
+            digest.update(b'\0' + info.get('url', '').encode('utf-8'))
+        return digest.hexdigest()
+    
     def get_display_size(self, img_tag):
         """
         获取图片在HTML中的显示尺寸
@@ -278,9 +658,7 @@ class WebCrawler:
         try:
             # 如果没有提供文章容器，需要先获取网页内容
             if not article_container:
-                response = requests.get(url, headers=self.headers, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = BeautifulSoup(self.fetch_page(url), 'html.parser')
                 # 提取文章正文内容和容器
                 _, article_container = self.extract_article_content(soup)
             
@@ -296,9 +674,7 @@ class WebCrawler:
                 background_images = self.find_background_images(article_container)
             else:
                 # 如果没有找到文章容器，从整个网页提取图片
-                response = requests.get(url, headers=self.headers, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = BeautifulSoup(self.fetch_page(url), 'html.parser')
                 img_tags = soup.find_all('img')
                 img_tags.extend(soup.find_all(attrs={"data-original-src": True}))
                 img_tags.extend(soup.find_all(attrs={"data-lazy-src": True}))
@@ -306,8 +682,7 @@ class WebCrawler:
                 # 查找背景图片
                 background_images = self.find_background_images(soup)
             
-            # 清理文件名
-            safe_title = re.sub(r'[\\/*?:"<>|]', "", title)
+            article_id = make_article_id(url)
             
             count = 0
             saved_images = []  # 保存图片信息的列表
@@ -339,11 +714,10 @@ class WebCrawler:
                     # 如果没有获取到显示尺寸，尝试通过下载图片获取实际尺寸
                     if display_width == 0 or display_height == 0:
                         # 下载图片以检查实际尺寸
-                        img_response = requests.get(img_url, headers=self.headers, timeout=10)
-                        img_response.raise_for_status()
+                        img_response, img_content = self.fetch_bytes(img_url, 'image')
                         
                         try:
-                            img_data = BytesIO(img_response.content)
+                            img_data = BytesIO(img_content)
                             img_obj = Image.open(img_data)
                             display_width, display_height = img_obj.size
                         except Exception:
@@ -352,8 +726,7 @@ class WebCrawler:
                             continue
                     else:
                         # 如果已经获取到显示尺寸，直接下载图片
-                        img_response = requests.get(img_url, headers=self.headers, timeout=10)
-                        img_response.raise_for_status()
+                        img_response, img_content = self.fetch_bytes(img_url, 'image')
                     
                     # 过滤小图片（通常是图标或广告）
                     if display_width < self.min_image_width or display_height < self.min_image_height:
@@ -362,15 +735,15 @@ class WebCrawler:
                     
                     # 保存图片
                     try:
-                        img_data = BytesIO(img_response.content)
+                        img_data = BytesIO(img_content)
                         img_obj = Image.open(img_data)
                         img_format = img_obj.format.lower() if img_obj.format else 'jpg'
                         
-                        img_filename = f"{safe_title}_{i+1}.{img_format}"
-                        img_path = os.path.join(self.image_folder, img_filename)
+                        img_filename = self.layout.media_file_name(article_id, i+1, img_format)
+                        img_path = self.layout.media_path('image', img_filename)
                         
-                        with open(img_path, 'wb') as f:
-                            f.write(img_response.content)
+                        # 重新爬取时，图片内容未变则不重写
+                        self.layout.write_if_changed(img_path, img_content)
                         
                         # 将图片信息添加到保存列表
                         img_info = {
@@ -382,10 +755,16 @@ class WebCrawler:
                         saved_images.append(img_info)
                         
                         count += 1
+                        self.stats['images'] += 1
                         logging.info(f"已保存图片: {img_path} (显示尺寸: {display_width}x{display_height})")
                     except Exception as e:
                         logging.error(f"保存图片失败: {str(e)}")
                         
+                        # 无法识别的内容如果是HTML（如错误页），不能当作图片保存
+                        if img_content.lstrip()[:1] == b'<':
+                            self.record_abort(img_url, 'image', "内容不是图片")
+                            continue
+                        
                         # 如果保存失败，尝试根据Content-Type确定类型并保存
                         content_type = img_response.headers.get('Content-Type', '')
                         if 'jpeg' in content_type or 'jpg' in content_type:
@@ -399,11 +778,11 @@ class WebCrawler:
                         else:
                             ext = 'jpg'  # 默认使用jpg
                         
-                        img_filename = f"{safe_title}_{i+1}.{ext}"
-                        img_path = os.path.join(self.image_folder, img_filename)
+                        img_filename = self.layout.media_file_name(article_id, i+1, ext)
+                        img_path = self.layout.media_path('image', img_filename)
                         
-                        with open(img_path, 'wb') as f:
-                            f.write(img_response.content)
+                        # 重新爬取时，图片内容未变则不重写
+                        self.layout.write_if_changed(img_path, img_content)
                         
                         # 将图片信息添加到保存列表
                         img_info = {
@@ -415,6 +794,7 @@ class WebCrawler:
                         saved_images.append(img_info)
                         
                         count += 1
+                        self.stats['images'] += 1
                         logging.info(f"已保存图片(备用方法): {img_path} (显示尺寸: {display_width}x{display_height})")
                     
                     # 随机延迟，避免请求过快
@@ -430,11 +810,10 @@ class WebCrawler:
                     bg_url = urljoin(url, bg_url)
                     
                     # 下载图片
-                    img_response = requests.get(bg_url, headers=self.headers, timeout=10)
-                    img_response.raise_for_status()
+                    img_response, img_content = self.fetch_bytes(bg_url, 'image')
                     
                     try:
-                        img_data = BytesIO(img_response.content)
+                        img_data = BytesIO(img_content)
                         img_obj = Image.open(img_data)
                         width, height = img_obj.size
                         
@@ -445,11 +824,11 @@ class WebCrawler:
                         
                         img_format = img_obj.format.lower() if img_obj.format else 'jpg'
                         
-                        img_filename = f"{safe_title}_bg_{len(img_tags) + i + 1}.{img_format}"
-                        img_path = os.path.join(self.image_folder, img_filename)
+                        img_filename = self.layout.media_file_name(article_id, f"bg_{len(img_tags) + i + 1}", img_format)
+                        img_path = self.layout.media_path('image', img_filename)
                         
-                        with open(img_path, 'wb') as f:
-                            f.write(img_response.content)
+                        # 重新爬取时，图片内容未变则不重写
+                        self.layout.write_if_changed(img_path, img_content)
                         
                         # 将图片信息添加到保存列表
                         img_info = {
@@ -461,6 +840,7 @@ class WebCrawler:
                         saved_images.append(img_info)
                         
                         count += 1
+                        self.stats['images'] += 1
                         logging.info(f"已保存背景图片: {img_path} (尺寸: {width}x{height})")
                     except Exception:
                         logging.warning(f"无法处理背景图片: {bg_url}")
@@ -515,9 +895,7 @@ class WebCrawler:
         try:
             # 如果没有提供文章容器，需要先获取网页内容
             if not article_container:
-                response = requests.get(url, headers=self.headers, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = BeautifulSoup(self.fetch_page(url), 'html.parser')
                 # 提取文章正文内容和容器
                 _, article_container = self.extract_article_content(soup)
             
@@ -529,9 +907,7 @@ class WebCrawler:
                 additional_sources = self.find_additional_video_sources(article_container)
             else:
                 # 如果没有找到文章容器，从整个网页提取视频
-                response = requests.get(url, headers=self.headers, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = BeautifulSoup(self.fetch_page(url), 'html.parser')
                 video_tags = soup.find_all('video')
                 iframes = soup.find_all('iframe')
                 # 查找其他可能的视频源
@@ -561,8 +937,7 @@ class WebCrawler:
             # 添加其他找到的视频源
             video_sources.extend(additional_sources)
             
-            # 清理文件名
-            safe_title = re.sub(r'[\\/*?:"<>|]', "", title)
+            article_id = make_article_id(url)
             
             count = 0
             saved_videos = []  # 保存视频信息的列表
@@ -575,12 +950,11 @@ class WebCrawler:
                     # 下载视频或获取视频信息
                     # 对于嵌入式视频，我们可能无法直接下载，只记录URL
                     if 'youtube.com' in video_url or 'vimeo.com' in video_url or 'player' in video_url:
-                        video_filename = f"{safe_title}_{i+1}_link.txt"
-                        video_path = os.path.join(self.video_folder, video_filename)
+                        video_filename = self.layout.media_file_name(article_id, f"{i+1}_link", 'txt')
+                        video_path = self.layout.prepare_path(self.layout.media_path('video', video_filename))
                         
                         # 保存视频链接
-                        with open(video_path, 'w', encoding='utf-8') as f:
-                            f.write(f"视频链接: {video_url}")
+                        self.layout.write_if_changed(video_path, f"视频链接: {video_url}".encode('utf-8'))
                         
                         video_info = {
                             'file_name': video_filename,
@@ -593,8 +967,7 @@ class WebCrawler:
                         logging.info(f"已保存视频链接: {video_path}")
                     else:
                         # 下载直接的视频文件
-                        video_response = requests.get(video_url, headers=self.headers, timeout=30, stream=True)
-                        video_response.raise_for_status()
+                        video_response = self.open_stream(video_url, 'video', timeout=30)
                         
                         # 确定视频扩展名
                         content_type = video_response.headers.get('Content-Type', '')
@@ -613,13 +986,28 @@ class WebCrawler:
                         else:
                             ext = 'mp4'  # 默认使用mp4
                         
-                        video_filename = f"{safe_title}_{i+1}.{ext}"
-                        video_path = os.path.join(self.video_folder, video_filename)
+                        video_filename = self.layout.media_file_name(article_id, i+1, ext)
+                        video_path = self.layout.prepare_path(self.layout.media_path('video', video_filename))
+                        
+                        # 已有同样大小的视频文件时不再重新下载
+                        if self.same_size(video_path, video_response):
+                            video_response.close()
+                            saved_videos.append({'file_name': video_filename, 'url': video_url, 'type': 'file'})
+                            count += 1
+                            logging.info(f"视频未变化，跳过下载: {video_path}")
+                            continue
                         
-                        with open(video_path, 'wb') as f:
-                            for chunk in video_response.iter_content(chunk_size=8192):
-                                if chunk:
+                        try:
+                            with open(video_path, 'wb') as f:
+                                for chunk in self.iter_limited(video_response, 'video'):
                                     f.write(chunk)
+                        except TransferAborted as e:
+                            # 删除不完整的视频文件
+                            self.record_abort(video_url, 'video', e)
+                            os.remove(video_path)
+                            continue
+                        finally:
+                            video_response.close()
                         
                         video_info = {
                             'file_name': video_filename,
@@ -629,6 +1017,7 @@ class WebCrawler:
                         saved_videos.append(video_info)
                         
                         count += 1
+                        self.stats['videos'] += 1
                         logging.info(f"已保存视频: {video_path}")
                     
                     # 随机延迟，避免请求过快
@@ -642,6 +1031,69 @@ class WebCrawler:
             logging.error(f"下载视频过程失败 - {url}: {str(e)}")
             return 0, []
     
+    @staticmethod
+    def same_size(path, response):
+        """已有文件的大小与响应的Content-Length相同时认为内容未变化"""
+        content_length = response.headers.get('Content-Length', '')
+        try:
+            return content_length.isdigit() and os.path.getsize(path) == int(content_length)
+        except OSError:
+            return False
+    
+    @staticmethod
+    def page_fingerprint(title, article_container):
+        """
+        计算网页指纹：标题加上文章容器的HTML（包含图片和视频的来源地址）
+        :return: SHA256十六进制字符串
+        """
+        digest = hashlib.sha256(title.encode('utf-8'))
+        digest.update(b'\0' + str(article_container).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def is_page_unchanged(self, article_id, page_fingerprint):
+        """清单中的网页指纹相同，且文本、图片和视频文件都还在时，不必重新下载"""
+        previous = self.layout.get_article(article_id)
+        if not previous or previous.get('page_fingerprint') != page_fingerprint:
+            return False
+        files = [previous.get('text_file') or self.layout.text_path(article_id)]
+        files += [self.layout.media_path('image', name) for name in previous.get('images', [])]
+        files += [self.layout.media_path('video', name) for name in previous.get('videos', [])]
+        return all(os.path.exists(path) for path in files)
+    
+    def crawl_article(self, url, title):
+        """
+        爬取单篇文章的文本、图片和视频
+        :param url: 网页URL
+        :param title: 文章标题
+        """
+        # 首先获取网页内容和文章容器
+        soup = BeautifulSoup(self.fetch_page(url), 'html.parser')
+        _, article_container = self.extract_article_content(soup)
+        
+        # 重新爬取时，网页没有变化的文章不再下载图片和视频
+        article_id = make_article_id(url)
+        page_fingerprint = self.page_fingerprint(title, article_container)
+        if self.is_page_unchanged(article_id, page_fingerprint):
+            self.stats['unchanged'] += 1
+            logging.info(f"网页未变化，跳过下载: {url}")
+            self.layout.append_change(article_id, url, 'unchanged', title=title,
+                                      text_file=self.layout.text_path(article_id))
+            return
+        
+        # 使用同一个文章容器处理文本、图片和视频，确保内容一致性
+        # 下载图片
+        img_count, saved_images = self.download_images(url, title, article_container)
+        logging.info(f"已下载 {img_count} 张图片")
+        
+        # 下载视频
+        video_count, saved_videos = self.download_videos(url, title, article_container)
+        logging.info(f"已下载 {video_count} 个视频")
+        
+        # 下载并保存文本，包含图片和视频列表
+        success, _ = self.download_text(url, title, saved_images, saved_videos, page_fingerprint, soup)
+        if not success:
+            raise RuntimeError("保存文本失败")
+    
     def start_crawling(self):
         """
         开始爬取流程
@@ -681,6 +1133,8 @@ class WebCrawler:
         completed = len(self.completed_urls)
         logging.info(f"开始爬取，共 {total} 篇文章，已完成 {completed} 篇")
         
+        # 待爬取的URL按表格顺序排队，失败的URL进入延迟重试队列
+        pending = deque()
         for index, row in df.iterrows():
             title = str(row[title_col])
             url = str(row[url_col])
@@ -690,30 +1144,34 @@ class WebCrawler:
                 logging.warning(f"跳过无效URL: {url}")
                 continue
             
-            # 检查是否已经爬取过该URL
-            if url in self.completed_urls:
+            # 检查是否已经爬取过该URL（重新爬取模式下不跳过）
+            if url in self.completed_urls and not self.recrawl:
                 logging.info(f"跳过已爬取的URL [{index+1}/{total}]: {title}")
                 continue
             
-            logging.info(f"正在处理 [{index+1}/{total}]: {title}")
+            pending.append((index, title, url))
+        
+        retry_queue = []  # 堆：(可重试时间, 序号, 行号, 标题, URL, 已尝试次数)
+        retry_seq = 0
+        dead_letters = []
+        
+        while pending or retry_queue:
+            now = time.monotonic()
+            if retry_queue and retry_queue[0][0] <= now:
+                _, _, index, title, url, attempt = heapq.heappop(retry_queue)
+                logging.info(f"重试 [{index+1}/{total}] 第{attempt + 1}次: {title}")
+            elif pending:
+                index, title, url = pending.popleft()
+                attempt = 0
+                logging.info(f"正在处理 [{index+1}/{total}]: {title}")
+            else:
+                # 只剩等待重试的URL，等到最早的一个到期
+                time.sleep(retry_queue[0][0] - now)
+                continue
             
+            attempt += 1
             try:
-                # 首先获取网页内容和文章容器
-                response = requests.get(url, headers=self.headers, timeout=10)
-                soup = BeautifulSoup(response.text, 'html.parser')
-                _, article_container = self.extract_article_content(soup)
-                
-                # 使用同一个文章容器处理文本、图片和视频，确保内容一致性
-                # 下载图片
-                img_count, saved_images = self.download_images(url, title, article_container)
-                logging.info(f"已下载 {img_count} 张图片")
-                
-                # 下载视频
-                video_count, saved_videos = self.download_videos(url, title, article_container)
-                logging.info(f"已下载 {video_count} 个视频")
-                
-                # 下载并保存文本，包含图片和视频列表
-                self.download_text(url, title, saved_images, saved_videos)
+                self.crawl_article(url, title)
                 
                 # 保存进度
                 self.save_progress(url)
@@ -723,17 +1181,47 @@ class WebCrawler:
             
             except requests.exceptions.RequestException as e:
                 logging.error(f"请求失败 - {url}: {str(e)}")
-                logging.info(f"将在下次运行时重试该URL")
-                # 网络错误时，不将URL加入已完成列表，以便下次重试
-                time.sleep(10)  # 网络错误后较长时间等待
-                continue
+                status = e.response.status_code if e.response is not None else None
+                # 4xx错误（429除外）重试也不会成功
+                permanent = status is not None and 400 <= status < 500 and status != 429
+                if permanent or attempt >= self.max_attempts:
+                    dead_letters.append({
+                        'url': url,
+                        'title': title,
+                        'attempts': attempt,
+                        'error': str(e),
+                        'time': datetime.now().isoformat(timespec='seconds'),
+                    })
+                    logging.error(f"放弃该URL（已尝试{attempt}次），已写入死信列表: {url}")
+                else:
+                    delay = self.retry_delay(attempt)
+                    heapq.heappush(retry_queue, (time.monotonic() + delay, retry_seq, index, title, url, attempt))
+                    retry_seq += 1
+                    logging.info(f"将在 {delay:.0f} 秒后重试该URL，期间继续处理其他URL")
             except Exception as e:
                 logging.error(f"处理文章失败 - {url}: {str(e)}")
-                # 其他错误时，也不将URL加入已完成列表
-                time.sleep(5)
-                continue
+                # 非网络错误重试也无济于事，不将URL加入已完成列表，下次运行时再处理
+                dead_letters.append({
+                    'url': url,
+                    'title': title,
+                    'attempts': attempt,
+                    'error': str(e),
+                    'time': datetime.now().isoformat(timespec='seconds'),
+                })
+        
+        if dead_letters:
+            self.save_dead_letters(dead_letters)
+            logging.warning(f"{len(dead_letters)} 个URL最终失败，详见 {self.dead_letter_file}")
         
         logging.info(f"爬取任务完成！共完成 {len(self.completed_urls)} 篇文章")
+        logging.info(
+            f"下载统计: 网页 {self.stats['pages']}, 图片 {self.stats['images']}, 视频 {self.stats['videos']}, "
+            f"中止传输 {self.stats['aborted_transfers']} {self.stats['aborted_by_kind']}"
+        )
+        logging.info(
+            f"内容变更: 新增 {self.stats['added']}, 修改 {self.stats['modified']}, 未变 {self.stats['unchanged']}，"
+            f"变更记录见 {self.layout.change_feed_path}"
+        )
 
 if __name__ == "__main__":
     # 使用示例
@@ -9,10 +9,15 @@ import os
 import re
 import json
 import mysql.connector
-from datetime import datetime, date
+from datetime import date
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from storage_layout import StorageLayout
+from article_reader import read_article
+from date_resolver import find_date
+from db_access import Database, load_db_config
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -20,14 +25,15 @@ logger = logging.getLogger(__name__)
 class DataProcessor:
     def __init__(self, db_config: Dict):
         """初始化数据处理器"""
-        self.db_config = db_config
+        self.db = Database(db_config)
+        self.layout = StorageLayout()
         self.conn = None
         self.cursor = None
 
     def connect_db(self):
         """连接数据库"""
         try:
-            self.conn = mysql.connector.connect(**self.db_config)
+            self.conn = self.db.get_connection()
             self.cursor = self.conn.cursor()
             logger.info("数据库连接成功")
         except mysql.connector.Error as e:
@@ -45,43 +51,21 @@ class DataProcessor:
     def parse_text_file(self, file_path: str) -> Optional[Dict]:
         """解析文本文件内容"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # 提取标题
-            title_match = re.search(r'标题: (.+)', content)
-            title = title_match.group(1).strip() if title_match else os.path.basename(file_path)
-
-            # 提取URL
-            url_match = re.search(r'网址: (.+)', content)
-            url = url_match.group(1).strip() if url_match else ""
-
-            # 提取正文内容（移除标题、网址等元信息）
-            text_content = content
-
-            # 移除标题和网址行
-            text_content = re.sub(r'标题: .+\n网址: .+\n\n', '', text_content)
-
-            # 移除图片列表部分
-            text_content = re.sub(r'图片列表:.*$', '', text_content, flags=re.DOTALL)
-
-            # 移除特殊部分（如Specials, Videos等）
-            text_content = re.sub(r'\n(?:Specials|Videos)\n.*$', '', text_content, flags=re.DOTALL)
-
-            # 提取发布日期（尝试从内容中提取）
-            publish_date = self.extract_date_from_content(text_content)
-
-            # 检查是否包含图片
-            has_images = '图片列表:' in content
+            # 标题、网址、正文、发布日期和图片列表由article_reader统一解析
+            article = read_article(file_path)
+            title = article['title']
+            text_content = article['body']
+            publish_date = date.fromisoformat(article['publish_date'][:10]) if article.get('publish_date') else None
+            first_image = article['images'][0]['file_name'] if article['images'] else None
 
             return {
                 'title': title,
-                'content': text_content.strip(),
+                'content': text_content,
                 'source': 'china',  # 默认为中国
                 'media_name': 'China Daily',  # 默认媒体
                 'type': 'text',
                 'file_path': file_path,
-                'image_url': f"images/{title}_1.jpg" if has_images else None,
+                'image_url': self.layout.media_path('image', first_image) if first_image else None,
                 'video_url': None,
                 'publish_date': publish_date
             }
@@ -91,28 +75,9 @@ class DataProcessor:
             return None
 
     def extract_date_from_content(self, content: str) -> Optional[date]:
-        """从内容中提取日期"""
-        # 尝试匹配日期格式
-        date_patterns = [
-            r'(\d{4})年(\d{1,2})月(\d{1,2})日',
-            r'(\d{4}-\d{1,2}-\d{1,2})',
-            r'(\d{1,2}/\d{1,2}/\d{4})',
-            r'(\d{4}\.\d{1,2}\.\d{1,2})'
-        ]
-
-        for pattern in date_patterns:
-            match = re.search(pattern, content)
-            if match:
-                try:
-                    if len(match.groups()) == 3:
-                        year, month, day = match.groups()
-                        return date(int(year), int(month), int(day))
-                    elif '-' in match.group(1):
-                        return datetime.strptime(match.group(1), '%Y-%m-%d').date()
-                except ValueError:
-                    continue
-
-        return None
+        """从内容中提取日期（规则见date_resolver.find_date）"""
+        found = find_date(content)
+        return date.fromisoformat(found) if found else None
 
     def parse_sentiment_results(self, results_file: str) -> List[Dict]:
         """解析情感分析结果"""
@@ -247,27 +212,28 @@ class DataProcessor:
         processed_count = 0
         error_count = 0
 
-        for filename in os.listdir(texts_dir):
-            if filename.endswith('.txt'):
-                file_path = os.path.join(texts_dir, filename)
-
-                try:
-                    corpus_data = self.parse_text_file(file_path)
-                    if corpus_data:
-                        corpus_id = self.insert_corpus_data(corpus_data)
-                        if corpus_id:
-                            processed_count += 1
-                            logger.info(f"处理成功: {filename} (ID: {corpus_id})")
-                        else:
-                            error_count += 1
-                            logger.error(f"插入失败: {filename}")
+        # 通过存储布局遍历，兼容旧版平铺文件和分片目录
+        self.layout = StorageLayout(os.path.dirname(texts_dir) or '.')
+        for file_path in self.layout.iter_text_files():
+            filename = os.path.basename(file_path)
+
+            try:
+                corpus_data = self.parse_text_file(file_path)
+                if corpus_data:
+                    corpus_id = self.insert_corpus_data(corpus_data)
+                    if corpus_id:
+                        processed_count += 1
+                        logger.info(f"处理成功: {filename} (ID: {corpus_id})")
                     else:
                         error_count += 1
-                        logger.error(f"解析失败: {filename}")
-
-                except Exception as e:
+                        logger.error(f"插入失败: {filename}")
+                else:
                     error_count += 1
-                    logger.error(f"处理文件 {filename} 时发生错误: {e}")
+                    logger.error(f"解析失败: {filename}")
+
+            except Exception as e:
+                error_count += 1
+                logger.error(f"处理文件 {filename} 时发生错误: {e}")
 
         logger.info(f"文本文件处理完成。成功: {processed_count}, 失败: {error_count}")
 
@@ -323,14 +289,8 @@ class DataProcessor:
 
 def main():
     """主函数"""
-    # 数据库配置（需要根据实际情况修改）
-    db_config = {
-        'host': 'localhost',
-        'user': 'root',
-        'password': '1234',
-        'database': 'public-opinion-analysis-system',
-        'charset': 'utf8mb4'
-    }
+    # 数据库配置（通过环境变量或db_config.json修改，见db_access.py）
+    db_config = load_db_config()
 
     # 创建数据处理器
     processor = DataProcessor(db_config)
@@ -9,36 +9,163 @@ import os
 import re
 import json
 import sys
+import hashlib
+import argparse
+import tempfile
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
 from typing import Dict, List, Optional, Tuple
 import logging
 
-# 尝试导入MySQL连接器
-try:
-    import mysql.connector
-    from mysql.connector import Error
-except ImportError:
-    print("错误: 未找到mysql-connector-python包")
-    print("请运行: pip install mysql-connector-python")
-    sys.exit(1)
+from storage_layout import StorageLayout, make_safe_title
+from article_reader import read_article
+from date_resolver import find_date
+
+from storage_backends import DB_ERRORS as Error, create_backend
+from statistics_aggregator import StatisticsAggregator
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# corpus表和sentiment_analysis表的插入列（顺序与批量插入的元组一致）
+CORPUS_COLUMNS = (
+    'title', 'content', 'source', 'media_name', 'type',
+    'file_path', 'image_url', 'video_url', 'publish_date', 'publish_year',
+    'url', 'url_hash', 'content_hash'
+)
+SENTIMENT_COLUMNS = (
+    'corpus_id', 'publish_year', 'sentiment', 'sentiment_score', 'confidence',
+    'positive_rate', 'negative_rate', 'neutral_rate',
+    'emotion_joy', 'emotion_trust', 'emotion_fear', 'emotion_surprise'
+)
+
+# 重复导入时按唯一键更新的列（corpus以url_hash、sentiment_analysis以corpus_id为唯一键）
+CORPUS_UPDATE_COLUMNS = tuple(col for col in CORPUS_COLUMNS if col != 'url_hash')
+SENTIMENT_UPDATE_COLUMNS = SENTIMENT_COLUMNS[1:]
+
+# 批量导入的文件数不少于该值时才延迟维护索引；文件少时正常维护索引比重建整张表的索引快得多
+DEFER_INDEX_MIN_FILES = 2000
+
+# LOAD DATA默认格式中需要转义的字符
+TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+TSV_UNESCAPES = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r', '0': '\0'}
+
+
+def tsv_field(value) -> str:
+    """把字段值转换为LOAD DATA默认格式（NULL写作\\N）"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value).translate(TSV_ESCAPES)
+
+
+def make_url_hash(url: str, title: str) -> str:
+    """文章的唯一键：网址的SHA-1，没有网址的旧文件用标题代替（与存储布局的ID规则一致）"""
+    return hashlib.sha1((url.strip() or f"title:{title}").encode('utf-8')).hexdigest()
+
+
+def parse_tsv_field(field: str):
+    """tsv_field的逆操作，用于退回批量INSERT时读回临时文件"""
+    if field == '\\N':
+        return None
+    return re.sub(r'\\(.)', lambda m: TSV_UNESCAPES.get(m.group(1), m.group(1)), field)
+
+
+# 每个进程按根目录缓存一个只用于解析路径的存储布局
+_path_layouts: Dict[str, StorageLayout] = {}
+
+
+def _path_layout(base_dir: str) -> StorageLayout:
+    if base_dir not in _path_layouts:
+        _path_layouts[base_dir] = StorageLayout(base_dir, load_manifest=False)
+    return _path_layouts[base_dir]
+
+
+def parse_text_file(file_path: str, base_dir: str = '.') -> Optional[Dict]:
+    """解析文本文件内容（模块级函数，可在子进程中运行）"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+            file_stat = os.fstat(f.fileno())
+
+        # 标题、网址、正文和图片列表由article_reader统一解析（优先使用爬虫写的元数据文件）
+        article = read_article(file_path, content)
+        title = article['title']
+        url = article['url']
+        text_content = article['body']
+
+        # 发布日期：爬虫解析的日期（元数据文件或文本头部），旧文件依次取网址、正文中的日期
+        publish_date = date.fromisoformat(article['publish_date'][:10]) if article.get('publish_date') else None
+
+        # 取图片列表中的第一张图片
+        first_image = article['images'][0]['file_name'] if article['images'] else None
+
+        return {
+            'title': title,
+            'content': text_content,
+            'source': 'china',  # 默认为中国
+            'media_name': 'China Daily',  # 默认媒体
+            'type': 'text',
+            'file_path': file_path,
+            'image_url': _path_layout(base_dir).media_path('image', first_image) if first_image else None,
+            'video_url': None,
+            'publish_date': publish_date,
+            # 分区键：按年分区时决定记录所在的分区（见partition_manager.py）
+            'publish_year': publish_date.year if publish_date else 0,
+            'url': url or None,
+            'url_hash': make_url_hash(url, title),
+            # 哈希包含解析出的发布日期，日期解析规则改进后重新导入（--full）能更新已有记录
+            'content_hash': hashlib.sha256(f"{content}\0{publish_date or ''}".encode('utf-8')).hexdigest(),
+            # 以下两项只用于导入清单，不写入数据库
+            'file_size': file_stat.st_size,
+            'file_mtime': file_stat.st_mtime
+        }
+
+    except Exception as e:
+        logger.error(f"解析文件 {file_path} 失败: {e}")
+        return None
+
+
+def extract_date_from_content(content: str) -> Optional[date]:
+    """从内容中提取日期（规则见date_resolver.find_date）"""
+    found = find_date(content)
+    return date.fromisoformat(found) if found else None
+
+
 class DataProcessor:
-    def __init__(self, db_config: Dict):
-        """初始化数据处理器"""
-        self.db_config = db_config
+    def __init__(self, db_config: Optional[Dict] = None, batch_size: int = 500, workers: int = 1, backend=None):
+        """
+        初始化数据处理器
+        :param db_config: MySQL连接配置，默认由db_access读取
+        :param workers: 大于1时用多进程解析文本文件
+        :param backend: 存储后端（见storage_backends），默认为MySQL
+        """
+        self.backend = backend or create_backend('mysql', db_config)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.layout = StorageLayout()
+        # 导入清单：记录已导入文件的大小、修改时间和内容哈希，文件名由存储后端决定
+        self.import_manifest_path = self.backend.import_manifest_name
         self.conn = None
         self.cursor = None
+        # corpus记录的ID映射，键为标题、去掉非法字符的标题、网址和文件名，供情感分析步骤使用
+        self.corpus_id_cache: Dict[str, int] = {}
+        self.corpus_dates: Dict[int, Optional[date]] = {}
+        self.corpus_years: Dict[int, int] = {}
+        # 本次导入影响到的发布日期（新旧日期都算），导入结束后只重算这些日期的汇总
+        self.changed_dates: set = set()
 
     def connect_db(self):
         """连接数据库"""
         try:
-            logger.info(f"正在连接数据库 {self.db_config['database']}...")
-            self.conn = mysql.connector.connect(**self.db_config)
-            self.cursor = self.conn.cursor()
+            logger.info(f"正在连接数据库 {self.backend.database}（{self.backend.name}）...")
+            self.conn = self.backend.connect()
+            self.cursor = self.backend.cursor(self.conn)
             logger.info("数据库连接成功")
 
             # 测试连接
@@ -53,81 +180,132 @@ class DataProcessor:
         """断开数据库连接"""
         if self.cursor:
             self.cursor.close()
-        if self.conn and self.conn.is_connected():
+        if self.conn:
+            # 连接池中的连接close()即归还
             self.conn.close()
+        self.conn = self.cursor = None
         logger.info("数据库连接已断开")
 
-    def parse_text_file(self, file_path: str) -> Optional[Dict]:
-        """解析文本文件内容"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # 提取标题
-            title_match = re.search(r'标题: (.+)', content)
-            title = title_match.group(1).strip() if title_match else os.path.basename(file_path)
-
-            # 提取URL
-            url_match = re.search(r'网址: (.+)', content)
-            url = url_match.group(1).strip() if url_match else ""
-
-            # 提取正文内容（移除标题、网址等元信息）
-            text_content = content
-
-            # 移除标题和网址行
-            text_content = re.sub(r'标题: .+\n网址: .+\n\n', '', text_content)
+    def ensure_schema(self):
+        """
+        为旧库补充幂等导入需要的列和唯一索引
+        已有记录按文件中的网址回填url_hash；重复的记录只保留ID最小的一条参与去重，
+        其余的url_hash留空（不删除数据，可用data_validation.py检查）
+        补充按年分区需要的publish_year列；统计视图改为读取物化汇总表，旧库缺少汇总表时一并创建
+        SQLite后端直接创建完整的表结构
+        """
+        if self.backend.name == 'sqlite':
+            self.backend.create_schema(self.conn)
+            return
 
-            # 移除图片列表部分
-            text_content = re.sub(r'图片列表:.*$', '', text_content, flags=re.DOTALL)
+        self.cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'corpus'"
+        )
+        if 'url_hash' not in {row[0] for row in self.cursor.fetchall()}:
+            logger.info("corpus表缺少url_hash列，正在升级表结构...")
+            self.cursor.execute(
+                "ALTER TABLE corpus "
+                "ADD COLUMN url VARCHAR(1000) COMMENT '原始网址' AFTER file_path, "
+                "ADD COLUMN url_hash CHAR(40) COMMENT '网址哈希（无网址时为标题哈希），用于幂等导入' AFTER url, "
+                "ADD COLUMN content_hash CHAR(64) COMMENT '文件内容哈希' AFTER url_hash"
+            )
 
-            # 移除特殊部分（如Specials, Videos等）
-            text_content = re.sub(r'\n(?:Specials|Videos)\n.*$', '', text_content, flags=re.DOTALL)
+            self.cursor.execute("SELECT id, title, file_path FROM corpus ORDER BY id")
+            seen = set()
+            updates = []
+            duplicates = 0
+            for corpus_id, title, file_path in self.cursor.fetchall():
+                url = ""
+                if file_path and os.path.exists(file_path):
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        url_match = re.search(r'^网址: (.+)$', f.read(), re.MULTILINE)
+                    url = url_match.group(1).strip() if url_match else ""
+                url_hash = make_url_hash(url, title)
+                if url_hash in seen:
+                    duplicates += 1
+                    continue
+                seen.add(url_hash)
+                updates.append((url or None, url_hash, corpus_id))
+
+            for start in range(0, len(updates), self.batch_size):
+                self.cursor.executemany(
+                    "UPDATE corpus SET url = %s, url_hash = %s WHERE id = %s",
+                    updates[start:start + self.batch_size]
+                )
+            self.cursor.execute("ALTER TABLE corpus ADD UNIQUE KEY uk_url_hash (url_hash)")
+            self.conn.commit()
+            logger.info(f"已回填 {len(updates)} 条记录的url_hash")
+            if duplicates:
+                logger.warning(f"corpus表中有 {duplicates} 条重复记录未参与去重，请运行data_validation.py检查")
+
+        self.cursor.execute(
+            "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+            "AND TABLE_NAME = 'sentiment_analysis' AND INDEX_NAME = 'uk_corpus_id' LIMIT 1"
+        )
+        if not self.cursor.fetchall():
+            logger.info("sentiment_analysis表缺少corpus_id唯一键，删除旧的重复结果后添加...")
+            self.cursor.execute(
+                "DELETE older FROM sentiment_analysis older "
+                "JOIN sentiment_analysis newer ON older.corpus_id = newer.corpus_id AND older.id < newer.id"
+            )
+            logger.info(f"删除了 {self.cursor.rowcount} 条重复的情感分析结果")
+            self.cursor.execute("ALTER TABLE sentiment_analysis ADD UNIQUE KEY uk_corpus_id (corpus_id)")
+            self.conn.commit()
 
-            # 提取发布日期（尝试从内容中提取）
-            publish_date = self.extract_date_from_content(text_content)
+        self.cursor.execute(
+            "SELECT TABLE_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+            "AND TABLE_NAME IN ('corpus', 'sentiment_analysis') AND COLUMN_NAME = 'publish_year'"
+        )
+        has_year = {row[0] for row in self.cursor.fetchall()}
+        if 'corpus' not in has_year:
+            logger.info("corpus表缺少publish_year分区键列，正在升级表结构...")
+            self.cursor.execute(
+                "ALTER TABLE corpus ADD COLUMN publish_year SMALLINT NOT NULL DEFAULT 0 "
+                "COMMENT '发布年份（分区键，无日期为0）' AFTER publish_date"
+            )
+            self.cursor.execute("UPDATE corpus SET publish_year = YEAR(publish_date) WHERE publish_date IS NOT NULL")
+            self.conn.commit()
+        if 'sentiment_analysis' not in has_year:
+            logger.info("sentiment_analysis表缺少publish_year分区键列，正在升级表结构...")
+            self.cursor.execute(
+                "ALTER TABLE sentiment_analysis ADD COLUMN publish_year SMALLINT NOT NULL DEFAULT 0 "
+                "COMMENT '语料发布年份（分区键，与corpus一致）' AFTER corpus_id"
+            )
+            self.cursor.execute(
+                "UPDATE sentiment_analysis sa JOIN corpus c ON c.id = sa.corpus_id SET sa.publish_year = c.publish_year"
+            )
+            self.conn.commit()
 
-            # 检查是否包含图片
-            has_images = '图片列表:' in content
+        StatisticsAggregator(self.backend, self.conn).ensure_summary_schema()
 
-            return {
-                'title': title,
-                'content': text_content.strip(),
-                'source': 'china',  # 默认为中国
-                'media_name': 'China Daily',  # 默认媒体
-                'type': 'text',
-                'file_path': file_path,
-                'image_url': f"images/{title}_1.jpg" if has_images else None,
-                'video_url': None,
-                'publish_date': publish_date
-            }
+    def load_import_manifest(self) -> Dict[str, Dict]:
+        """加载导入清单，键为文件路径，值为 size/mtime/hash"""
+        if not self.import_manifest_path or not os.path.exists(self.import_manifest_path):
+            return {}
+        try:
+            with open(self.import_manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError as e:
+            logger.warning(f"导入清单无法解析（{e}），将重新导入所有文件")
+            return {}
+
+    def save_import_manifest(self, manifest: Dict[str, Dict]):
+        """写入导入清单（先写临时文件再替换，中途失败不会损坏旧清单）"""
+        if not self.import_manifest_path:
+            return
+        tmp_path = self.import_manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.import_manifest_path)
 
-        except Exception as e:
-            logger.error(f"解析文件 {file_path} 失败: {e}")
-            return None
+    def parse_text_file(self, file_path: str) -> Optional[Dict]:
+        """解析文本文件内容"""
+        return parse_text_file(file_path, self.layout.base_dir)
 
     def extract_date_from_content(self, content: str) -> Optional[date]:
         """从内容中提取日期"""
-        # 尝试匹配日期格式
-        date_patterns = [
-            r'(\d{4})年(\d{1,2})月(\d{1,2})日',
-            r'(\d{4}-\d{1,2}-\d{1,2})',
-            r'(\d{1,2}/\d{1,2}/\d{4})',
-            r'(\d{4}\.\d{1,2}\.\d{1,2})'
-        ]
-
-        for pattern in date_patterns:
-            match = re.search(pattern, content)
-            if match:
-                try:
-                    if len(match.groups()) == 3:
-                        year, month, day = match.groups()
-                        return date(int(year), int(month), int(day))
-                    elif '-' in match.group(1):
-                        return datetime.strptime(match.group(1), '%Y-%m-%d').date()
-                except ValueError:
-                    continue
-
-        return None
+        return extract_date_from_content(content)
 
     def parse_sentiment_results(self, results_file: str) -> List[Dict]:
         """解析情感分析结果"""
@@ -175,116 +353,396 @@ class DataProcessor:
 
         return sentiment_data
 
-    def find_corpus_id_by_title(self, title: str) -> Optional[int]:
-        """通过标题查找corpus表中的ID"""
-        try:
-            query = "SELECT id FROM corpus WHERE title = %s LIMIT 1"
-            self.cursor.execute(query, (title,))
-            result = self.cursor.fetchone()
-            return result[0] if result else None
-        except Error as e:
-            logger.error(f"查找corpus ID失败: {e}")
-            return None
-
-    def insert_corpus_data(self, corpus_data: Dict) -> Optional[int]:
-        """插入corpus表数据"""
+    def insert_rows(self, table: str, columns: Tuple[str, ...], rows: List[Tuple],
+                    update_columns: Tuple[str, ...] = (), failed: Optional[List[Tuple]] = None) -> int:
+        """
+        批量插入多行数据，每批只提交一次
+        批次失败时二分重试，单个坏行不会导致整批丢失
+        update_columns非空时按唯一键upsert，重复导入不会产生重复行
+        failed不为None时收集写入失败的行
+        返回成功写入的行数
+        """
+        if not rows:
+            return 0
+
+        query = self.backend.upsert_sql(table, columns, update_columns)
         try:
-            query = """
-            INSERT INTO corpus (
-                title, content, source, media_name, type,
-                file_path, image_url, video_url, publish_date
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-
-            values = (
-                corpus_data['title'],
-                corpus_data['content'],
-                corpus_data['source'],
-                corpus_data['media_name'],
-                corpus_data['type'],
-                corpus_data['file_path'],
-                corpus_data['image_url'],
-                corpus_data['video_url'],
-                corpus_data['publish_date']
-            )
-
-            self.cursor.execute(query, values)
+            # mysql-connector会把executemany的INSERT改写为多行VALUES
+            self.cursor.executemany(query, rows)
             self.conn.commit()
-
-            # 获取插入的ID
-            return self.cursor.lastrowid
-
+            return len(rows)
         except Error as e:
-            logger.error(f"插入corpus数据失败: {e}")
             self.conn.rollback()
-            return None
-
-    def insert_sentiment_data(self, sentiment_data: Dict, corpus_id: int):
-        """插入sentiment_analysis表数据"""
+            if len(rows) == 1:
+                logger.error(f"插入{table}数据失败: {e} (行: {str(rows[0][:2])[:100]})")
+                if failed is not None:
+                    failed.append(rows[0])
+                return 0
+
+            mid = len(rows) // 2
+            return (self.insert_rows(table, columns, rows[:mid], update_columns, failed)
+                    + self.insert_rows(table, columns, rows[mid:], update_columns, failed))
+
+    def track_changed_dates(self, records: List[Dict]):
+        """记录一批记录的新发布日期，以及库中同一文章原来的发布日期（日期被修改时旧日期的汇总也要重算）"""
+        self.changed_dates.update(record['publish_date'] for record in records)
+        self.move_changed_years({record['url_hash']: record['publish_year'] for record in records})
+
+    def move_changed_years(self, years: Dict[str, int]):
+        """
+        记录库中已有文章原来的发布日期；发布年份变了的文章先改为新年份
+        分区表的唯一键是(url_hash, publish_year)，先把旧行移到新年份的分区（ID不变），
+        之后的upsert才会更新这一行而不是在新分区插入重复行；sentiment_analysis同步移动
+        :param years: url_hash到新发布年份的字典
+        """
+        url_hashes = list(years)
+        moved = []
+        for start in range(0, len(url_hashes), self.batch_size):
+            chunk = url_hashes[start:start + self.batch_size]
+            self.cursor.execute(
+                f"SELECT url_hash, publish_date, publish_year FROM corpus WHERE url_hash IN ({', '.join(['%s'] * len(chunk))})",
+                chunk
+            )
+            for url_hash, publish_date, publish_year in self.cursor.fetchall():
+                self.changed_dates.add(publish_date)
+                if publish_year != years[url_hash]:
+                    moved.append((years[url_hash], url_hash))
+
+        if moved:
+            self.cursor.executemany("UPDATE corpus SET publish_year = %s WHERE url_hash = %s", moved)
+            self.cursor.executemany(
+                "UPDATE sentiment_analysis SET publish_year = %s "
+                "WHERE corpus_id IN (SELECT id FROM corpus WHERE url_hash = %s)",
+                moved
+            )
+            self.conn.commit()
+            logger.info(f"{len(moved)} 条记录的发布年份有变化，已移到新的年份分区")
+
+    def insert_corpus_batch(self, records: List[Dict], failed_paths: Optional[set] = None) -> int:
+        """
+        批量upsert corpus表数据，返回成功写入的行数
+        failed_paths不为None时收集写入失败的文件路径
+        """
+        rows = [tuple(record[col] for col in CORPUS_COLUMNS) for record in records]
+        self.track_changed_dates(records)
+        return self.insert_corpus_rows(rows, failed_paths)
+
+    def insert_corpus_rows(self, rows: List[Tuple], failed_paths: Optional[set] = None) -> int:
+        """按CORPUS_COLUMNS顺序的元组upsert corpus表，写入失败的行的文件路径收集到failed_paths"""
+        failed = []
+        written = self.insert_rows('corpus', CORPUS_COLUMNS, rows, CORPUS_UPDATE_COLUMNS, failed)
+        if failed_paths is not None:
+            path_index = CORPUS_COLUMNS.index('file_path')
+            failed_paths.update(row[path_index] for row in failed)
+        return written
+
+    def insert_sentiment_batch(self, items: List[Tuple[Dict, int]]) -> int:
+        """批量upsert sentiment_analysis表数据，items为(情感数据, corpus_id)列表"""
+        rows = [
+            (corpus_id, self.corpus_years.get(corpus_id, 0)) + tuple(data[col] for col in SENTIMENT_COLUMNS[2:])
+            for data, corpus_id in items
+        ]
+        return self.insert_rows('sentiment_analysis', SENTIMENT_COLUMNS, rows, SENTIMENT_UPDATE_COLUMNS)
+
+    def bulk_load_corpus(self, records, failed_paths: Optional[set] = None) -> int:
+        """
+        使用LOAD DATA LOCAL INFILE批量导入corpus表
+        解析结果流式写入临时TSV文件，服务器不允许LOCAL INFILE时退回批量INSERT
+        LOAD DATA会跳过url_hash已存在的行，导入后对内容已变化的行再做一次upsert
+        返回成功导入的行数
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix='corpus_', suffix='.tsv')
+        row_count = 0
+        content_hashes = {}
+        years = {}
         try:
-            query = """
-            INSERT INTO sentiment_analysis (
-                corpus_id, sentiment, sentiment_score, confidence,
-                positive_rate, negative_rate, neutral_rate,
-                emotion_joy, emotion_trust, emotion_fear, emotion_surprise
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-
-            values = (
-                corpus_id,
-                sentiment_data['sentiment'],
-                sentiment_data['sentiment_score'],
-                sentiment_data['confidence'],
-                sentiment_data['positive_rate'],
-                sentiment_data['negative_rate'],
-                sentiment_data['neutral_rate'],
-                sentiment_data['emotion_joy'],
-                sentiment_data['emotion_trust'],
-                sentiment_data['emotion_fear'],
-                sentiment_data['emotion_surprise']
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as f:
+                for record in records:
+                    f.write('\t'.join(tsv_field(record[col]) for col in CORPUS_COLUMNS) + '\n')
+                    row_count += 1
+                    self.changed_dates.add(record['publish_date'])
+                    content_hashes[record['url_hash']] = (record['file_path'], record['content_hash'])
+                    years[record['url_hash']] = record['publish_year']
+
+            if not row_count:
+                return 0
+            # LOAD DATA ... IGNORE只按唯一键跳过，年份变了的旧行要先移到新分区，否则会插入重复行
+            self.move_changed_years(years)
+            logger.info(f"已生成临时文件 {tmp_path}，共 {row_count} 行，开始LOAD DATA")
+
+            query = (
+                "LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE corpus CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                f"({', '.join(CORPUS_COLUMNS)})"
             )
+            try:
+                self.cursor.execute(query, (tmp_path,))
+                loaded = self.cursor.rowcount
+                self.conn.commit()
+                logger.info(f"LOAD DATA完成，导入 {loaded} 行")
+            except Error as e:
+                self.conn.rollback()
+                logger.warning(f"LOAD DATA LOCAL INFILE不可用（{e}），退回批量INSERT")
+                loaded = 0
+                with open(tmp_path, 'r', encoding='utf-8', newline='\n') as f:
+                    rows = []
+                    for line in f:
+                        rows.append(tuple(parse_tsv_field(field) for field in line.rstrip('\n').split('\t')))
+                        if len(rows) >= self.batch_size:
+                            loaded += self.insert_corpus_rows(rows, failed_paths)
+                            rows = []
+                    loaded += self.insert_corpus_rows(rows, failed_paths)
+
+            if loaded < row_count:
+                logger.info(f"{row_count - loaded} 行未由LOAD DATA写入（已存在或写入失败），逐条核对")
+            missing_paths = []
+            stale_paths = self.find_stale_rows(content_hashes, missing_paths)
+            if missing_paths:
+                # LOAD DATA ... IGNORE除重复键外还会静默丢弃出错的行，这些文件不进入导入清单，下次重试
+                logger.error(f"{len(missing_paths)} 个文件的记录未写入corpus表，下次导入时重试")
+                if failed_paths is not None:
+                    failed_paths.update(missing_paths)
+            if stale_paths:
+                logger.info(f"{len(stale_paths)} 条已有记录的内容有变化，改用upsert更新")
+                base_dir = self.layout.base_dir
+                for start in range(0, len(stale_paths), self.batch_size):
+                    stale_records = [parse_text_file(path, base_dir) for path in stale_paths[start:start + self.batch_size]]
+                    loaded += self.insert_corpus_batch([r for r in stale_records if r], failed_paths)
+
+            return loaded
+        finally:
+            os.remove(tmp_path)
+
+    def find_stale_rows(self, content_hashes: Dict[str, Tuple[str, str]],
+                        missing: Optional[List[str]] = None) -> List[str]:
+        """
+        比较库中记录与本次解析结果的内容哈希
+        :param content_hashes: url_hash到(文件路径, 内容哈希)的字典
+        :param missing: 不为None时收集库中没有记录的文件路径
+        :return: 库中内容与文件不一致的文件路径
+        """
+        stale = []
+        found = set()
+        url_hashes = list(content_hashes)
+        for start in range(0, len(url_hashes), self.batch_size):
+            chunk = url_hashes[start:start + self.batch_size]
+            query = f"SELECT url_hash, content_hash FROM corpus WHERE url_hash IN ({', '.join(['%s'] * len(chunk))})"
+            self.cursor.execute(query, chunk)
+            for url_hash, content_hash in self.cursor.fetchall():
+                found.add(url_hash)
+                file_path, new_hash = content_hashes[url_hash]
+                if content_hash != new_hash:
+                    stale.append(file_path)
+        if missing is not None:
+            missing.extend(file_path for url_hash, (file_path, _) in content_hashes.items() if url_hash not in found)
+        return stale
+
+    def load_corpus_id_map(self):
+        """
+        一次流式查询corpus表，建立标题到ID的映射
+        除原标题外还登记去掉非法字符后的标题和文件名：情感分析结果中旧版文件的标题
+        来自按标题命名的文件名，分片布局的文件名则是文章ID
+        """
+        self.corpus_id_cache.clear()
+        cursor = self.backend.cursor(self.conn)
+        try:
+            # 不缓冲的游标逐行读取，不会一次把整张表取到内存
+            cursor.execute("SELECT id, title, url, file_path, publish_date, publish_year FROM corpus ORDER BY id")
+            for corpus_id, title, url, file_path, publish_date, publish_year in cursor:
+                self.corpus_dates[corpus_id] = publish_date
+                self.corpus_years[corpus_id] = publish_year
+                for key in (title, make_safe_title(title), url):
+                    if key:
+                        self.corpus_id_cache.setdefault(key, corpus_id)
+                if file_path:
+                    self.corpus_id_cache.setdefault(os.path.splitext(os.path.basename(file_path))[0], corpus_id)
+        finally:
+            cursor.close()
+        logger.info(f"已加载 {len(self.corpus_id_cache)} 个corpus ID映射")
+
+    def load_existing_sentiment(self) -> Dict[int, Tuple[str, float]]:
+        """一次查询已有的情感分析结果，键为corpus_id，值为(情感倾向, 得分)"""
+        self.cursor.execute("SELECT corpus_id, sentiment, sentiment_score FROM sentiment_analysis")
+        return {
+            corpus_id: (sentiment, round(float(score), 2) if score is not None else None)
+            for corpus_id, sentiment, score in self.cursor.fetchall()
+        }
+
+    def lookup_corpus_id(self, title: str) -> Optional[int]:
+        """在ID映射中查找标题，依次尝试原标题和去掉非法字符后的标题"""
+        return self.corpus_id_cache.get(title) or self.corpus_id_cache.get(make_safe_title(title))
+
+    def iter_changed_files(self, file_paths, manifest: Dict[str, Dict], seen: set, stats: Dict):
+        """跳过大小和修改时间都与导入清单一致的文件，seen收集遍历到的所有路径"""
+        for file_path in file_paths:
+            seen.add(file_path)
+            entry = manifest.get(file_path)
+            if entry:
+                file_stat = os.stat(file_path)
+                if entry.get('size') == file_stat.st_size and entry.get('mtime') == file_stat.st_mtime:
+                    stats['skipped'] += 1
+                    continue
+            yield file_path
+
+    def iter_new_content(self, records, manifest: Dict[str, Dict], pending: Dict[str, Dict], stats: Dict):
+        """
+        过滤掉内容哈希与清单一致的记录（只是修改时间变了），清单中直接更新其时间戳
+        需要写入的记录的新清单项放入pending，写入成功后再并入清单
+        """
+        for record in records:
+            entry = {'size': record['file_size'], 'mtime': record['file_mtime'], 'hash': record['content_hash']}
+            file_path = record['file_path']
+            if manifest.get(file_path, {}).get('hash') == entry['hash']:
+                manifest[file_path] = entry
+                stats['skipped'] += 1
+                continue
+            pending[file_path] = entry
+            yield record
+
+    def iter_parsed_records(self, file_paths, stats: Dict):
+        """
+        按文件顺序产出解析结果，解析失败的文件计入stats['errors']
+        workers大于1时在进程池中解析，同时在途的任务数有上限，避免结果堆积在内存中
+        """
+        base_dir = self.layout.base_dir
+
+        def handle(file_path, corpus_data):
+            if corpus_data:
+                return corpus_data
+            stats['errors'] += 1
+            logger.error(f"解析失败: {os.path.basename(file_path)}")
+            return None
 
-            self.cursor.execute(query, values)
-            self.conn.commit()
+        if self.workers <= 1:
+            for file_path in file_paths:
+                corpus_data = handle(file_path, parse_text_file(file_path, base_dir))
+                if corpus_data:
+                    yield corpus_data
+            return
 
-        except Error as e:
-            logger.error(f"插入sentiment数据失败: {e}")
-            self.conn.rollback()
+        max_in_flight = self.workers * 8
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = deque()
+            for file_path in file_paths:
+                in_flight.append((file_path, pool.submit(parse_text_file, file_path, base_dir)))
+                if len(in_flight) >= max_in_flight:
+                    done_path, future = in_flight.popleft()
+                    corpus_data = handle(done_path, future.result())
+                    if corpus_data:
+                        yield corpus_data
+            while in_flight:
+                done_path, future = in_flight.popleft()
+                corpus_data = handle(done_path, future.result())
+                if corpus_data:
+                    yield corpus_data
+
+    def write_corpus_from_queue(self, record_queue: queue.Queue, stats: Dict):
+        """
+        写入线程：独占数据库连接，从队列中取解析结果并批量插入，遇到None时结束
+        """
+        batch = []
+
+        def flush():
+            inserted = self.insert_corpus_batch(batch, stats['failed_paths'])
+            stats['processed'] += inserted
+            stats['errors'] += len(batch) - inserted
+            logger.info(f"已写入 {inserted}/{len(batch)} 条记录 (累计成功: {stats['processed']})")
+            batch.clear()
+
+        while True:
+            record = record_queue.get()
+            if record is None:
+                break
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                try:
+                    flush()
+                except Exception as e:
+                    stats['errors'] += len(batch)
+                    stats['failed_paths'].update(record['file_path'] for record in batch)
+                    logger.error(f"写入批次时发生错误: {e}")
+                    batch.clear()
 
-    def process_text_files(self, texts_dir: str = "texts"):
-        """处理所有文本文件"""
+        if batch:
+            try:
+                flush()
+            except Exception as e:
+                stats['errors'] += len(batch)
+                stats['failed_paths'].update(record['file_path'] for record in batch)
+                logger.error(f"写入批次时发生错误: {e}")
+
+    def process_text_files(self, texts_dir: str = "texts", bulk: bool = False, full: bool = False):
+        """
+        处理所有文本文件
+        导入清单中大小、修改时间或内容哈希未变的文件直接跳过，只导入新增和修改的文件；
+        解析（可多进程）产生的记录经有界队列交给单个写入线程批量upsert；
+        bulk为True时使用LOAD DATA批量导入，full为True时忽略导入清单全部重新导入
+        """
         logger.info(f"开始处理文本文件目录: {texts_dir}")
 
         if not os.path.exists(texts_dir):
             logger.error(f"文本文件目录不存在: {texts_dir}")
             return
 
-        processed_count = 0
-        error_count = 0
+        stats = {'processed': 0, 'errors': 0, 'skipped': 0, 'failed_paths': set()}
+        if bulk and not self.backend.supports_load_data:
+            logger.info(f"{self.backend.name}后端不支持LOAD DATA，使用批量写入")
+            bulk = False
 
-        for filename in os.listdir(texts_dir):
-            if filename.endswith('.txt'):
-                file_path = os.path.join(texts_dir, filename)
+        self.use_texts_dir(texts_dir)
+        manifest = {} if full else self.load_import_manifest()
+        seen = set()
+        pending = {}
+        file_paths = self.iter_changed_files(self.layout.iter_text_files(), manifest, seen, stats)
+        records = self.iter_new_content(self.iter_parsed_records(file_paths, stats), manifest, pending, stats)
 
-                try:
-                    corpus_data = self.parse_text_file(file_path)
-                    if corpus_data:
-                        corpus_id = self.insert_corpus_data(corpus_data)
-                        if corpus_id:
-                            processed_count += 1
-                            logger.info(f"处理成功: {filename} (ID: {corpus_id})")
-                        else:
-                            error_count += 1
-                            logger.error(f"插入失败: {filename}")
-                    else:
-                        error_count += 1
-                        logger.error(f"解析失败: {filename}")
+        try:
+            if bulk:
+                stats['processed'] = self.bulk_load_corpus(records, stats['failed_paths'])
+            else:
+                self.write_records(records, stats)
+        except Exception:
+            # 中途失败时不确定哪些记录已写入，只保存时间戳的更新，下次重新导入
+            self.save_import_manifest(manifest)
+            raise
 
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"处理文件 {filename} 时发生错误: {e}")
+        # 只有写入成功的文件进入清单，失败的下次重试；已删除的文件从清单中移除
+        for file_path, entry in pending.items():
+            if file_path not in stats['failed_paths']:
+                manifest[file_path] = entry
+        self.save_import_manifest({path: entry for path, entry in manifest.items() if path in seen})
+
+        logger.info(f"文本文件{'批量导入' if bulk else '处理'}完成。成功: {stats['processed']}, "
+                    f"未变跳过: {stats['skipped']}, 失败: {stats['errors']}")
 
-        logger.info(f"文本文件处理完成。成功: {processed_count}, 失败: {error_count}")
+    def use_texts_dir(self, texts_dir: str):
+        """按文本目录设置存储布局（兼容旧版平铺文件和分片目录）和导入清单路径"""
+        base_dir = os.path.dirname(texts_dir) or '.'
+        self.layout = StorageLayout(base_dir)
+        if self.backend.import_manifest_name:
+            self.import_manifest_path = os.path.join(base_dir, self.backend.import_manifest_name)
+
+    def count_changed_files(self, texts_dir: str = "texts", full: bool = False) -> int:
+        """只比较大小和修改时间，统计需要导入的文件数（不读取文件内容）"""
+        if not os.path.exists(texts_dir):
+            return 0
+        self.use_texts_dir(texts_dir)
+        manifest = {} if full else self.load_import_manifest()
+        stats = {'skipped': 0}
+        return sum(1 for _ in self.iter_changed_files(self.layout.iter_text_files(), manifest, set(), stats))
+
+    def write_records(self, records, stats: Dict):
+        """把解析结果经有界队列交给写入线程"""
+        # 有界队列：写入跟不上时解析端会等待，数据库得到平稳的写入流
+        record_queue = queue.Queue(maxsize=self.batch_size * 2)
+        writer = threading.Thread(target=self.write_corpus_from_queue, args=(record_queue, stats), daemon=True)
+        writer.start()
+        try:
+            for corpus_data in records:
+                record_queue.put(corpus_data)
+        finally:
+            record_queue.put(None)
+            writer.join()
 
     def process_sentiment_results(self, results_file: str = "text_sentiment_analysis_results.txt"):
         """处理情感分析结果"""
@@ -297,14 +755,22 @@ class DataProcessor:
         sentiment_data = self.parse_sentiment_results(results_file)
         processed_count = 0
         error_count = 0
+        batch = []
+
+        # 一次性加载ID映射，避免每条结果都按标题查询一次数据库
+        self.load_corpus_id_map()
+        existing = self.load_existing_sentiment()
+        unchanged_count = 0
 
         for data in sentiment_data:
             try:
-                corpus_id = self.find_corpus_id_by_title(data['title'])
-                if corpus_id:
-                    self.insert_sentiment_data(data, corpus_id)
-                    processed_count += 1
-                    logger.info(f"情感数据插入成功: {data['title']} (corpus_id: {corpus_id})")
+                corpus_id = self.lookup_corpus_id(data['title'])
+                if corpus_id and existing.get(corpus_id) == (data['sentiment'], data['sentiment_score']):
+                    # 与库中结果相同，不必重写，也不影响汇总
+                    unchanged_count += 1
+                elif corpus_id:
+                    batch.append((data, corpus_id))
+                    self.changed_dates.add(self.corpus_dates.get(corpus_id))
                 else:
                     error_count += 1
                     logger.warning(f"未找到对应的corpus记录: {data['title']}")
@@ -313,56 +779,126 @@ class DataProcessor:
                 error_count += 1
                 logger.error(f"处理情感数据 {data['title']} 时发生错误: {e}")
 
-        logger.info(f"情感分析结果处理完成。成功: {processed_count}, 失败: {error_count}")
-
-    def process_all_data(self):
-        """处理所有数据"""
+            if len(batch) >= self.batch_size:
+                inserted = self.insert_sentiment_batch(batch)
+                processed_count += inserted
+                error_count += len(batch) - inserted
+                batch = []
+
+        if batch:
+            inserted = self.insert_sentiment_batch(batch)
+            processed_count += inserted
+            error_count += len(batch) - inserted
+
+        logger.info(f"情感分析结果处理完成。成功: {processed_count}, 未变跳过: {unchanged_count}, 失败: {error_count}")
+
+    def deferred_indexes(self):
+        """批量导入时延迟维护的索引（仅MySQL），重建时每张表各用一个连接"""
+        from db_access import Database
+        from index_manager import DeferredIndexes
+
+        return DeferredIndexes(Database(self.backend.db.config, pool_size=4, pool_name='opinion_index'))
+
+    def process_all_data(self, bulk: bool = False, full: bool = False, defer_indexes: bool = True,
+                         defer_min_files: int = DEFER_INDEX_MIN_FILES):
+        """
+        处理所有数据，bulk为True时用LOAD DATA导入语料（适合首次大批量导入），
+        full为True时忽略导入清单重新导入全部文件
+        MySQL批量导入且要导入的文件不少于defer_min_files个时，先删除二级索引和全文索引，
+        语料导入后立即并行重建，情感结果的ID查询和汇总表刷新都在有索引的表上进行；导入失败时在最后重建
+        """
         logger.info("开始数据处理流程")
+        deferred = self.deferred_indexes() if self.backend.name == 'mysql' else None
 
         try:
+            if bulk and self.backend.supports_load_data:
+                self.backend.enable_local_infile()
             self.connect_db()
+            self.ensure_schema()
+
+            # 上次导入中断时留下了被删除的索引，先恢复表结构
+            if deferred and deferred.pending():
+                logger.warning("检测到上次批量导入未完成的索引重建，先恢复索引")
+                deferred.rebuild()
+            if bulk and defer_indexes and deferred:
+                changed = self.count_changed_files(full=full)
+                if changed >= defer_min_files:
+                    deferred.drop(self.conn)
+                else:
+                    logger.info(f"只有 {changed} 个文件需要导入（少于 {defer_min_files}），不删除索引")
 
             # 1. 处理文本文件
-            self.process_text_files()
+            self.process_text_files(bulk=bulk, full=full)
+            if deferred and deferred.pending():
+                deferred.rebuild()
 
             # 2. 处理情感分析结果
             self.process_sentiment_results()
 
+            # 3. 增量更新汇总表（只重算受影响的日期）
+            StatisticsAggregator(self.backend, self.conn).refresh(self.changed_dates)
+
             logger.info("数据处理流程完成")
 
         except Exception as e:
             logger.error(f"数据处理流程失败: {e}")
         finally:
             self.disconnect_db()
+            # 语料导入失败时在这里重建索引，保证表结构恢复原样
+            if deferred and deferred.pending():
+                deferred.rebuild()
 
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='将爬取的数据导入MySQL（或嵌入式SQLite）数据库')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批插入并提交的行数（默认500）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='解析文本文件的进程数（默认等于CPU核数）')
+    parser.add_argument('--bulk', action='store_true',
+                        help='首次大批量导入：用LOAD DATA LOCAL INFILE导入语料，不可用时退回批量INSERT')
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help='批量导入时不删除二级索引和全文索引（默认导入前删除、导入后并行重建）')
+    parser.add_argument('--defer-index-min-files', type=int, default=DEFER_INDEX_MIN_FILES,
+                        help=f'批量导入的文件数不少于该值时才删除并重建索引（默认{DEFER_INDEX_MIN_FILES}）')
+    parser.add_argument('--full', action='store_true',
+                        help='忽略导入清单，重新解析并upsert全部文本文件')
+    parser.add_argument('--backend', choices=('mysql', 'sqlite'), default='mysql',
+                        help='存储后端：mysql（默认）或不需要数据库服务器的嵌入式sqlite')
+    parser.add_argument('--sqlite-path', default='corpus.db', help='sqlite数据库文件（默认corpus.db）')
+    args = parser.parse_args()
+
     print("数据处理器启动...")
 
-    # 数据库配置（根据您的设置修改）
-    db_config = {
-        'host': 'localhost',
-        'user': 'root',
-        'password': '1234',
-        'database': 'public-opinion-analysis-system',
-        'charset': 'utf8mb4'
-    }
+    if args.backend == 'sqlite':
+        backend = create_backend('sqlite', sqlite_path=args.sqlite_path)
+        print(f"SQLite数据库: {args.sqlite_path}")
+    else:
+        try:
+            backend = create_backend('mysql')
+        except ImportError:
+            print("错误: 未找到mysql-connector-python包")
+            print("请运行: pip install mysql-connector-python，或使用 --backend sqlite")
+            sys.exit(1)
+
+        # 数据库配置（通过环境变量或db_config.json修改，见db_access.py）
+        db_config = backend.db.config
 
-    # 验证配置
-    if not db_config['password']:
-        print("警告: 数据库密码为空")
+        # 验证配置
+        if not db_config['password']:
+            print("警告: 数据库密码为空")
 
-    print(f"数据库: {db_config['database']}")
-    print(f"主机: {db_config['host']}")
-    print(f"用户: {db_config['user']}")
+        print(f"数据库: {db_config['database']}")
+        print(f"主机: {db_config['host']}")
+        print(f"用户: {db_config['user']}")
 
     # 创建数据处理器
-    processor = DataProcessor(db_config)
+    processor = DataProcessor(batch_size=args.batch_size, workers=args.workers, backend=backend)
 
     # 处理所有数据
     try:
-        processor.process_all_data()
+        processor.process_all_data(bulk=args.bulk, full=args.full, defer_indexes=not args.keep_indexes,
+                                   defer_min_files=args.defer_index_min_files)
         print("数据处理完成!")
     except Exception as e:
         print(f"处理失败: {e}")
@@ -4,25 +4,17 @@
 数据验证脚本：检查数据导入结果
 """
 
-import mysql.connector
 from mysql.connector import Error
 import sys
 
+from db_access import get_database
+
 def validate_data():
     """验证数据导入结果"""
 
     try:
-        # 数据库配置
-        config = {
-            'host': 'localhost',
-            'user': 'root',
-            'password': '1234',
-            'database': 'public-opinion-analysis-system',
-            'charset': 'utf8mb4'
-        }
-
-        # 连接数据库
-        connection = mysql.connector.connect(**config)
+        # 从共享连接池借用连接，配置见db_access.py
+        connection = get_database().get_connection()
         cursor = connection.cursor()
 
         print("=== 数据导入验证报告 ===\n")
@@ -166,8 +158,9 @@ def validate_data():
         print(f"❌ 验证失败: {e}")
         return False
     finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals():
+            if 'cursor' in locals():
+                cursor.close()
             connection.close()
 
     return True
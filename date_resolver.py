@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布日期解析：按代价从低到高依次尝试
+1. 网址中的日期（China Daily 的 /a/202206/06/、/2017-04/05/ 等）
+2. 网页 <meta> 中的 article:published_time 等标签
+3. JSON-LD 中的 datePublished
+4. 正文中的日期（“2024年10月25日”或“2024-10-25”）
+前三种来自网站的结构化信息，比较可靠；正文中的日期可能是文章提到的其他日期，只作为最后的手段。
+爬虫在抓取时解析并写入文本头部的“日期:”行和元数据文件，读取旧文件时也按网址、正文的顺序补全。
+"""
+
+import re
+import json
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+# 网址中的日期，按常见程度排列
+URL_DATE_PATTERNS = [
+    re.compile(r'/(\d{4})(\d{2})/(\d{2})/'),                  # /a/202206/06/WS...html
+    re.compile(r'/(\d{4})-(\d{2})/(\d{2})/'),                 # /cndy/2017-04/05/content_...htm
+    re.compile(r'/(\d{4})[/-](\d{1,2})[/-](\d{1,2})/'),       # /2024/06/06/、/2024-06-06/
+    re.compile(r'/t(\d{4})(\d{2})(\d{2})_\d+'),               # /t20220606_123456.html
+]
+# <meta> 中表示发布时间的属性，按优先级排列
+META_DATE_ATTRS = [
+    ('property', 'article:published_time'),
+    ('itemprop', 'datePublished'),
+    ('name', 'pubdate'),
+    ('name', 'publishdate'),
+    ('name', 'publish_date'),
+    ('name', 'PubDate'),
+    ('property', 'og:release_date'),
+]
+# 结构化信息中的日期或时间戳，只取日期部分（发布方的本地日期）
+STRUCTURED_DATE_PATTERN = re.compile(r'(\d{4})[-/.年](\d{1,2})[-/.月](\d{1,2})')
+# 正文中的日期：“2024年10月25日”或“2024-10-25”
+DATE_PATTERN = re.compile(r'(\d{4})年(\d{1,2})月(\d{1,2})日|(\d{4})-(\d{1,2})-(\d{1,2})')
+
+# 早于该年份的日期视为误识别
+MIN_YEAR = 1990
+
+
+def _iso_date(year: str, month: str, day: str) -> Optional[str]:
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def is_plausible(iso_date: Optional[str]) -> bool:
+    """日期是否可能是发布日期：不早于MIN_YEAR，不晚于明天（时区差）"""
+    if not iso_date:
+        return False
+    return date(MIN_YEAR, 1, 1).isoformat() <= iso_date <= (date.today() + timedelta(days=1)).isoformat()
+
+
+def find_date(text: str, pos: int = 0, endpos: Optional[int] = None) -> Optional[str]:
+    """
+    一次扫描从正文中找发布日期：优先第一个“YYYY年M月D日”，没有（或不是合法日期）时取第一个“YYYY-M-D”
+    :param pos: 扫描起点
+    :param endpos: 扫描终点，默认到文本末尾
+    :return: ISO格式日期字符串，没有找到时返回None
+    """
+    endpos = len(text) if endpos is None else endpos
+    first_iso = None
+    cjk_checked = False
+    for match in DATE_PATTERN.finditer(text, pos, endpos):
+        if match.group(1) is not None:
+            if not cjk_checked:
+                cjk_checked = True
+                found = _iso_date(match.group(1), match.group(2), match.group(3))
+                if found:
+                    return found
+        elif first_iso is None:
+            first_iso = match
+        if cjk_checked and first_iso is not None:
+            break
+    return _iso_date(first_iso.group(4), first_iso.group(5), first_iso.group(6)) if first_iso else None
+
+
+def parse_structured_date(value: Optional[str]) -> Optional[str]:
+    """解析meta/JSON-LD中的日期或时间戳（如 2024-06-06T10:00:00+08:00），返回ISO格式日期"""
+    if not value:
+        return None
+    match = STRUCTURED_DATE_PATTERN.search(value)
+    if not match:
+        return None
+    found = _iso_date(*match.groups())
+    return found if is_plausible(found) else None
+
+
+def date_from_url(url: Optional[str]) -> Optional[str]:
+    """从网址中提取发布日期，返回ISO格式日期"""
+    if not url:
+        return None
+    for pattern in URL_DATE_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            found = _iso_date(*match.groups())
+            if is_plausible(found):
+                return found
+    return None
+
+
+def date_from_meta(soup) -> Optional[str]:
+    """从<meta>标签中提取发布日期，soup为BeautifulSoup对象"""
+    for attr, value in META_DATE_ATTRS:
+        tag = soup.find('meta', attrs={attr: value})
+        if tag is not None:
+            found = parse_structured_date(tag.get('content'))
+            if found:
+                return found
+    return None
+
+
+def _json_ld_date(data) -> Optional[str]:
+    """在JSON-LD对象（可能是列表或带@graph）中查找datePublished"""
+    if isinstance(data, list):
+        for item in data:
+            found = _json_ld_date(item)
+            if found:
+                return found
+    elif isinstance(data, dict):
+        if isinstance(data.get('datePublished'), str):
+            found = parse_structured_date(data['datePublished'])
+            if found:
+                return found
+        if '@graph' in data:
+            return _json_ld_date(data['@graph'])
+    return None
+
+
+def date_from_json_ld(soup) -> Optional[str]:
+    """从 <script type="application/ld+json"> 中提取datePublished，soup为BeautifulSoup对象"""
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        found = _json_ld_date(data)
+        if found:
+            return found
+    return None
+
+
+def resolve_publish_date(url: Optional[str], soup=None, body: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    按代价从低到高解析发布日期
+    :param url: 文章网址
+    :param soup: 网页的BeautifulSoup对象，没有时跳过meta和JSON-LD
+    :param body: 文章正文，没有时跳过正文
+    :return: (ISO格式日期, 来源)，来源为 url、meta、json-ld、text 之一；都没有找到时返回 (None, None)
+    """
+    found = date_from_url(url)
+    if found:
+        return found, 'url'
+    if soup is not None:
+        found = date_from_meta(soup)
+        if found:
+            return found, 'meta'
+        found = date_from_json_ld(soup)
+        if found:
+            return found, 'json-ld'
+    if body:
+        found = find_date(body)
+        if is_plausible(found):
+            return found, 'text'
+    return None, None
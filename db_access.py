@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库访问层：所有MySQL脚本共用的连接配置、连接池、预处理语句和健康检查
+配置优先级：环境变量 > 配置文件 > 默认值
+- 环境变量：DB_HOST、DB_PORT、DB_USER、DB_PASSWORD、DB_NAME
+- 配置文件：DB_CONFIG_FILE 指定的路径，默认为当前目录下的 db_config.json（JSON对象，键与默认配置相同）
+"""
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import mysql.connector
+from mysql.connector import Error, pooling
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'host': 'localhost',
+    'port': 3306,
+    'user': 'root',
+    'password': '1234',
+    'database': 'public-opinion-analysis-system',
+    'charset': 'utf8mb4',
+}
+
+# 配置项对应的环境变量
+ENV_KEYS = {
+    'host': 'DB_HOST',
+    'port': 'DB_PORT',
+    'user': 'DB_USER',
+    'password': 'DB_PASSWORD',
+    'database': 'DB_NAME',
+}
+
+CONFIG_FILE_ENV = 'DB_CONFIG_FILE'
+DEFAULT_CONFIG_FILE = 'db_config.json'
+
+
+def load_db_config(config_file: Optional[str] = None, **overrides) -> Dict:
+    """
+    读取数据库配置
+    :param config_file: 配置文件路径，默认取环境变量DB_CONFIG_FILE或db_config.json（不存在时忽略）
+    :param overrides: 直接覆盖的配置项，例如 allow_local_infile=True
+    :return: 可传给mysql.connector的配置字典
+    """
+    config = dict(DEFAULT_CONFIG)
+
+    config_file = config_file or os.environ.get(CONFIG_FILE_ENV) or DEFAULT_CONFIG_FILE
+    if os.path.exists(config_file):
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+        logger.debug(f"已读取数据库配置文件 {config_file}")
+
+    for key, env_name in ENV_KEYS.items():
+        if os.environ.get(env_name):
+            config[key] = os.environ[env_name]
+    config['port'] = int(config['port'])
+
+    config.update(overrides)
+    return config
+
+
+def quote_identifier(name: str) -> str:
+    """给库名/表名加反引号，库名中含有'-'时必须加"""
+    return '`' + name.replace('`', '``') + '`'
+
+
+class Database:
+    def __init__(self, config: Optional[Dict] = None, pool_size: int = 5, pool_name: str = 'opinion'):
+        """
+        初始化数据库访问对象，连接池在第一次取连接时创建
+        :param config: 连接配置，默认由load_db_config()读取
+        :param pool_size: 连接池大小
+        :param pool_name: 连接池名称（只用于日志和区分连接池）
+        """
+        self.config = dict(config) if config else load_db_config()
+        self.pool_size = pool_size
+        self.pool_name = pool_name
+        self._pool = None
+
+    @property
+    def database(self) -> str:
+        return self.config.get('database', '')
+
+    def get_pool(self) -> pooling.MySQLConnectionPool:
+        if self._pool is None:
+            logger.info(f"正在创建连接池 {self.pool_name}（{self.config['host']}/{self.database}，大小 {self.pool_size}）")
+            self._pool = pooling.MySQLConnectionPool(
+                pool_name=self.pool_name,
+                pool_size=self.pool_size,
+                pool_reset_session=True,
+                **self.config
+            )
+        return self._pool
+
+    def get_connection(self):
+        """
+        从连接池取一个连接，取出时检查连接是否存活，断开的连接会自动重连
+        用完调用close()即归还连接池
+        """
+        conn = self.get_pool().get_connection()
+        try:
+            conn.ping(reconnect=True, attempts=2, delay=1)
+        except Error:
+            conn.close()
+            raise
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator:
+        """with块内借用一个连接，结束时归还"""
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self, prepared: bool = False) -> Iterator:
+        """
+        with块内得到一个游标，正常结束时提交，出错时回滚
+        :param prepared: 是否使用服务端预处理语句（同一游标重复执行相同语句时只预处理一次）
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor(prepared=prepared)
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def fetch_all(self, query: str, params: Tuple = ()) -> List[Tuple]:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def fetch_one(self, query: str, params: Tuple = ()) -> Optional[Tuple]:
+        rows = self.fetch_all(query, params)
+        return rows[0] if rows else None
+
+    def server_connection(self):
+        """不指定数据库的独立连接（不经过连接池），用于创建数据库"""
+        config = {key: value for key, value in self.config.items() if key != 'database'}
+        return mysql.connector.connect(**config)
+
+    def health_check(self) -> bool:
+        """
+        检查数据库是否可用，记录当前库名和往返耗时
+        :return: 是否健康
+        """
+        try:
+            start = time.perf_counter()
+            row = self.fetch_one("SELECT DATABASE(), VERSION()")
+            elapsed = (time.perf_counter() - start) * 1000
+            logger.info(f"数据库健康检查通过: {row[0]}（MySQL {row[1]}，耗时 {elapsed:.1f}ms）")
+            return True
+        except Error as e:
+            logger.error(f"数据库健康检查失败: {e}")
+            return False
+
+
+_default_database: Optional[Database] = None
+
+
+def get_database() -> Database:
+    """进程内共享的默认数据库访问对象，长时间运行的任务可以复用连接池中的连接"""
+    global _default_database
+    if _default_database is None:
+        _default_database = Database()
+    return _default_database
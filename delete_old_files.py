@@ -1,77 +1,66 @@
 import os
-import re
 from datetime import datetime
 import shutil
 
-def extract_date_from_url(url):
-    # 从URL中提取日期，格式如：2002-12/17
-    match = re.search(r'(\d{4}-\d{2}/\d{2})', url)
-    if match:
-        date_str = match.group(1)
-        return datetime.strptime(date_str, '%Y-%m/%d')
+from storage_layout import StorageLayout, make_article_id, split_article_id
+from article_reader import read_article, sidecar_path
+
+def get_publish_date(article):
+    # 发布日期来自网址、文本头部或网页元数据（见date_resolver.py）
+    # 正文中的日期可能是文章提到的其他日期，不据此删除
+    if article.get('publish_date') and article.get('date_source') != 'text':
+        return datetime.strptime(article['publish_date'][:10], '%Y-%m-%d')
     return None
 
-def get_media_files_list(file_path):
-    media_files = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        # 查找文件末尾的图片和视频列表
-        media_section = re.search(r'图片列表：(.*?)\n视频列表：(.*?)$', content, re.DOTALL)
-        if media_section:
-            images = media_section.group(1).strip().split('\n')
-            videos = media_section.group(2).strip().split('\n')
-            media_files.extend([img.strip() for img in images if img.strip()])
-            media_files.extend([vid.strip() for vid in videos if vid.strip()])
-    return media_files
+def get_media_files_list(article):
+    # 文章的图片和视频文件名（来自元数据文件或文本末尾的图片列表/视频列表）
+    return [asset['file_name'] for asset in article['images'] + article['videos']]
 
 def main():
-    texts_dir = 'texts'
-    images_dir = 'images'
-    videos_dir = 'videos'
+    layout = StorageLayout()
     
     # 确保目录存在
-    for dir_path in [images_dir, videos_dir]:
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path)
+    layout.ensure_dirs()
     
-    # 遍历texts目录中的所有文件
-    for filename in os.listdir(texts_dir):
-        if not filename.endswith('.txt'):
-            continue
-            
-        file_path = os.path.join(texts_dir, filename)
+    # 遍历texts目录中的所有文件（包括分片目录）
+    for file_path in layout.iter_text_files():
+        filename = os.path.basename(file_path)
         
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 提取URL
-        url_match = re.search(r'网址: (.*?)\n', content)
-        if not url_match:
+        # 读取文章的网址和资源列表
+        article = read_article(file_path)
+        url = article['url']
+        if not url:
             continue
             
-        url = url_match.group(1)
-        date = extract_date_from_url(url)
+        date = get_publish_date(article)
         
         if date and date.year < 2015:
             print(f"删除文件: {filename} (日期: {date.strftime('%Y-%m-%d')})")
             
             # 获取关联的媒体文件
-            media_files = get_media_files_list(file_path)
+            media_files = get_media_files_list(article)
             
-            # 删除文本文件
+            # 删除文本文件及其元数据文件
             os.remove(file_path)
+            if os.path.exists(sidecar_path(file_path)):
+                os.remove(sidecar_path(file_path))
+            
+            # 从清单中删除并记录变更，爬虫和下游的增量处理不再把它当作已有文章
+            stem = os.path.splitext(filename)[0]
+            article_id = split_article_id(stem) or make_article_id(url)
+            layout.remove_article(article_id)
+            layout.append_change(article_id, url, 'deleted', title=article['title'], text_file=file_path)
             
             # 删除关联的媒体文件
             for media_file in media_files:
                 # 尝试在images目录中删除
-                image_path = os.path.join(images_dir, media_file)
+                image_path = layout.media_path('image', media_file)
                 if os.path.exists(image_path):
                     os.remove(image_path)
                     print(f"  删除图片: {media_file}")
                 
                 # 尝试在videos目录中删除
-                video_path = os.path.join(videos_dir, media_file)
+                video_path = layout.media_path('video', media_file)
                 if os.path.exists(video_path):
                     os.remove(video_path)
                     print(f"  删除视频: {media_file}")
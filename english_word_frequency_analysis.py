@@ -1,11 +1,22 @@
-import os
 import re
+import heapq
+import argparse
 import pandas as pd
 from collections import Counter
+from functools import partial
+
+from storage_layout import StorageLayout
+from article_reader import read_article
+from token_cache import DEFAULT_CACHE_PATH, TokenCache
+from ngram_sketch import DEFAULT_DELTA, DEFAULT_EPSILON, NgramCounter, iter_ngrams, pmi
 
 # 文件夹路径
 texts_folder = 'texts'
 output_file = '英文词频分析结果.xlsx'
+# 分词缓存的命名空间，分词规则变化时更换版本号
+cache_namespace = 'english-words-v2'
+# 统计的n元词组长度及其Excel工作表名
+ngram_sheets = {2: '二元词组', 3: '三元词组'}
 
 # 英文停用词（扩展更多常见停用词）
 english_stopwords = set(['the', 'and', 'of', 'to', 'in', 'for', 'is', 'on', 'that', 'with', 'by', 
@@ -22,121 +33,223 @@ english_stopwords = set(['the', 'and', 'of', 'to', 'in', 'for', 'is', 'on', 'tha
                         'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'some', 'such',
                         'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'just', 'now'])
 
-# 用于存储所有文章的内容
-all_text = ''
+# 预编译的英文单词规则；词组不跨越标点和换行
+word_pattern = re.compile(r'\b[a-zA-Z]+\b')
+phrase_break_pattern = re.compile(r'[.,!?;:()\[\]"“”\n]+')
+
 
-# 处理文本文件
+# 处理文本文件：正文由article_reader统一切分（优先读取爬虫写的元数据文件）
 def extract_main_content(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        lines = content.split('\n')
-        
-        # 跳过前面的标题和网址
-        start_line = 0
-        for i, line in enumerate(lines):
-            if line.strip() and not line.startswith('标题:') and not line.startswith('网址:'):
-                start_line = i
-                break
-        
-        # 找到图片列表的位置
-        end_line = len(lines)
-        for i, line in enumerate(lines):
-            if '图片列表:' in line or '视频列表:' in line:
-                end_line = i
-                break
-        
-        # 提取正文
-        main_content = '\n'.join(lines[start_line:end_line])
-        return main_content
+        return read_article(file_path)['body']
     except Exception as e:
         print(f"处理文件 {file_path} 时出错: {e}")
         return ""
 
-print(f"开始处理 {texts_folder} 文件夹中的文本文件...")
-
-# 处理所有文本文件
-file_count = 0
-for filename in os.listdir(texts_folder):
-    if filename.endswith('.txt'):
-        file_path = os.path.join(texts_folder, filename)
-        content = extract_main_content(file_path)
-        if content:  # 确保内容不为空
-            all_text += content + '\n'
-            file_count += 1
-
-print(f"成功处理了 {file_count} 个文本文件")
-
-if file_count == 0:
-    print("没有找到有效的文本文件，程序退出")
-    exit()
-
-# 提取英文词汇
-print("正在提取和分析英文词汇...")
-english_text = re.findall(r'\b[a-zA-Z]+\b', all_text)
-valid_english_words = []
-
-for word in english_text:
-    word = word.lower().strip()
-    if len(word) > 1 and word not in english_stopwords:  # 只保留长度大于1的词且不在停用词中
-        valid_english_words.append(word)
-
-print(f"有效英文词数量: {len(valid_english_words)}")
-
-# 统计词频
-word_count = Counter(valid_english_words)
-total_words = sum(word_count.values())
-
-print(f"词汇总数: {total_words}")
-print(f"独立词汇数: {len(word_count)}")
-
-# 获取频率最高的词
-top_words = word_count.most_common(100)  # 取100个，确保至少有40个
-
-# 准备数据
-data = {
-    '词语': [],
-    '出现次数': [],
-    '频率 (%)': [],
-    '累计频率 (%)': []
-}
-
-cumulative_frequency = 0
-for word, count in top_words:
-    if count < 3:  # 出现次数太少的不考虑
-        continue
-    frequency = (count / total_words) * 100
-    cumulative_frequency += frequency
-    
-    data['词语'].append(word)
-    data['出现次数'].append(count)
-    data['频率 (%)'].append(round(frequency, 4))
-    data['累计频率 (%)'].append(round(cumulative_frequency, 4))
-
-# 创建DataFrame
-df = pd.DataFrame(data)
-
-# 按出现次数排序
-df_by_count = df.sort_values(by='出现次数', ascending=False)
-
-# 按词语字母排序
-df_alphabetical = df.sort_values(by='词语')
-
-print("保存结果到Excel...")
-
-try:
-    # 使用ExcelWriter保存到不同的sheet
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df_by_count.to_excel(writer, sheet_name='按频率排序', index=False)
-        df_alphabetical.to_excel(writer, sheet_name='按字母排序', index=False)
-    print(f'词频分析完成，结果已保存到 {output_file}')
-except Exception as e:
-    print(f"保存Excel文件时出错: {e}")
-    
-    # 尝试保存为CSV文件作为备选
+
+def is_content_word(word):
+    return len(word) > 1 and word not in english_stopwords
+
+
+def namespace_for(ngram_lengths):
+    """缓存的命名空间：统计词组和不统计词组时缓存的内容不同，分开存放"""
+    if not ngram_lengths:
+        return cache_namespace
+    return f"{cache_namespace}-ngrams-{'-'.join(str(n) for n in sorted(ngram_lengths))}"
+
+
+def tokenize(content, ngram_lengths=()):
+    """
+    一篇文章的英文单词计数（小写，过滤前），以及需要时各长度的词组计数，写入缓存
+    :param ngram_lengths: 统计的词组长度，为空时不统计词组
+    :return: {'words': 单词计数}，统计词组时再加上 'ngrams': {'2': 二元词组计数, ...}
+    """
+    phrases = [[word.lower() for word in word_pattern.findall(phrase)]
+               for phrase in phrase_break_pattern.split(content)]
+    document = {'words': Counter(word for words in phrases for word in words)}
+    if ngram_lengths:
+        document['ngrams'] = {str(n): Counter(iter_ngrams(phrases, n, is_content_word)) for n in ngram_lengths}
+    return document
+
+
+def count_words(file_paths, cache_path=None, ngram_counters=()):
+    """
+    逐篇提取英文单词计入Counter，不拼接全文也不保存单词列表；词组计数逐篇加入固定大小的近似计数结构
+    :param cache_path: 分词缓存文件，内容没变的文章直接使用缓存的计数；为None时不使用缓存
+    :param ngram_counters: 各长度的NgramCounter
+    :return: (所有单词的计数, 有效文件数, 命中缓存的文件数)
+    """
+    ngram_lengths = sorted(counter.n for counter in ngram_counters)
+    cache = TokenCache(namespace_for(ngram_lengths), cache_path) if cache_path else None
+    compute = partial(tokenize, ngram_lengths=ngram_lengths)
+    token_count = Counter()
+    file_count = 0
     try:
-        df_by_count.to_csv('英文词频分析结果.csv', index=False, encoding='utf-8-sig')
-        print("词频分析结果已保存为CSV文件")
-    except Exception as e2:
-        print(f"保存CSV文件也失败: {e2}") 
\ No newline at end of file
+        for file_path in file_paths:
+            content = extract_main_content(file_path)
+            if content:  # 确保内容不为空
+                document = cache.cached(content, compute) if cache else compute(content)
+                token_count.update(document['words'])
+                for counter in ngram_counters:
+                    counter.add_counts(document['ngrams'][str(counter.n)])
+                file_count += 1
+    finally:
+        if cache:
+            cache.close()
+    return token_count, file_count, cache.hits if cache else 0
+
+
+def filter_words(token_count):
+    """只保留长度大于1的词且不在停用词中"""
+    return Counter({word: count for word, count in token_count.items()
+                    if len(word) > 1 and word not in english_stopwords})
+
+
+def build_frequency_table(word_count, top_n=100, min_count=3):
+    """取频率最高的词（取100个，确保至少有40个），出现次数太少的不考虑，次数相同的按词语排序"""
+    total_words = sum(word_count.values())
+    data = {
+        '词语': [],
+        '出现次数': [],
+        '频率 (%)': [],
+        '累计频率 (%)': []
+    }
+
+    cumulative_frequency = 0
+    for word, count in heapq.nsmallest(top_n, word_count.items(), key=lambda item: (-item[1], item[0])):
+        if count < min_count:
+            continue
+        frequency = (count / total_words) * 100
+        cumulative_frequency += frequency
+
+        data['词语'].append(word)
+        data['出现次数'].append(count)
+        data['频率 (%)'].append(round(frequency, 4))
+        data['累计频率 (%)'].append(round(cumulative_frequency, 4))
+
+    return pd.DataFrame(data)
+
+
+def build_ngram_table(counter, top_n):
+    """出现次数最高的词组；出现次数为近似值，不小于真实次数，最多多算“最大误差”次"""
+    data = {
+        '词组': [],
+        '出现次数': [],
+        '最大误差': [],
+        '频率 (%)': []
+    }
+    for ngram, count, error in counter.top(top_n):
+        data['词组'].append(ngram)
+        data['出现次数'].append(count)
+        data['最大误差'].append(error)
+        data['频率 (%)'].append(round(count / counter.total * 100, 4) if counter.total else 0)
+    return pd.DataFrame(data)
+
+
+def build_collocation_table(bigram_counter, token_count, top_n, min_count=5):
+    """
+    搭配：从高频二元词组中按点互信息（PMI）排序，出现次数太少的不考虑（PMI会偏向罕见组合）
+    单词次数用精确计数，二元词组次数用近似计数
+    """
+    total_words = sum(token_count.values())
+    rows = []
+    for ngram, count, _ in bigram_counter.top(top_n * 10):
+        if count < min_count:
+            continue
+        first, second = ngram.split(' ')
+        rows.append((ngram, count, pmi(count, token_count[first], token_count[second], total_words)))
+    rows.sort(key=lambda row: (-row[2], row[0]))
+
+    data = {
+        '词组': [row[0] for row in rows[:top_n]],
+        '出现次数': [row[1] for row in rows[:top_n]],
+        'PMI': [round(row[2], 4) for row in rows[:top_n]]
+    }
+    return pd.DataFrame(data)
+
+
+def save_results(df, extra_sheets=None):
+    """
+    :param extra_sheets: 工作表名到DataFrame的字典（词组和搭配），追加在单词词频之后
+    """
+    # 按出现次数排序
+    df_by_count = df.sort_values(by='出现次数', ascending=False)
+
+    # 按词语字母排序
+    df_alphabetical = df.sort_values(by='词语')
+
+    print("保存结果到Excel...")
+
+    try:
+        # 使用ExcelWriter保存到不同的sheet
+        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+            df_by_count.to_excel(writer, sheet_name='按频率排序', index=False)
+            df_alphabetical.to_excel(writer, sheet_name='按字母排序', index=False)
+            for sheet_name, sheet_df in (extra_sheets or {}).items():
+                sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
+        print(f'词频分析完成，结果已保存到 {output_file}')
+    except Exception as e:
+        print(f"保存Excel文件时出错: {e}")
+
+        # 尝试保存为CSV文件作为备选
+        try:
+            df_by_count.to_csv('英文词频分析结果.csv', index=False, encoding='utf-8-sig')
+            print("词频分析结果已保存为CSV文件")
+        except Exception as e2:
+            print(f"保存CSV文件也失败: {e2}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='英文词频分析')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help=f'分词缓存文件，只处理新增或修改过的文章（默认{DEFAULT_CACHE_PATH}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用分词缓存')
+    parser.add_argument('--clear-cache', action='store_true', help='先清除分词缓存再分析')
+    parser.add_argument('--no-ngrams', action='store_true', help='不统计二元、三元词组和搭配')
+    parser.add_argument('--top-ngrams', type=int, default=50, help='每种词组输出的个数（默认50）')
+    parser.add_argument('--ngram-error', type=float, default=DEFAULT_EPSILON,
+                        help=f'词组计数的误差上限，相对于词组总数（默认{DEFAULT_EPSILON}），越小占用内存越多')
+    parser.add_argument('--ngram-delta', type=float, default=DEFAULT_DELTA,
+                        help=f'词组计数超出误差上限的概率（默认{DEFAULT_DELTA}）')
+    args = parser.parse_args()
+    cache_path = None if args.no_cache else args.cache
+
+    if cache_path and args.clear_cache:
+        cache = TokenCache(namespace_for(() if args.no_ngrams else ngram_sheets), cache_path)
+        print(f"已清除 {cache.clear()} 条分词缓存")
+        cache.close()
+
+    print(f"开始处理 {texts_folder} 文件夹中的文本文件...")
+
+    # 提取英文词汇
+    print("正在提取和分析英文词汇...")
+    ngram_counters = [] if args.no_ngrams else [
+        NgramCounter(n, args.ngram_error, args.ngram_delta) for n in ngram_sheets
+    ]
+    token_count, file_count, cached_count = count_words(StorageLayout().iter_text_files(), cache_path, ngram_counters)
+
+    print(f"成功处理了 {file_count} 个文本文件（{cached_count} 个使用缓存的分词结果）")
+
+    if file_count == 0:
+        print("没有找到有效的文本文件，程序退出")
+        return
+
+    word_count = filter_words(token_count)
+    total_words = sum(word_count.values())
+
+    print(f"有效英文词数量: {total_words}")
+    print(f"词汇总数: {total_words}")
+    print(f"独立词汇数: {len(word_count)}")
+
+    extra_sheets = {}
+    for counter in ngram_counters:
+        print(f"{counter.n}元词组总数: {counter.total}")
+        extra_sheets[ngram_sheets[counter.n]] = build_ngram_table(counter, args.top_ngrams)
+    if ngram_counters:
+        extra_sheets['搭配'] = build_collocation_table(ngram_counters[0], token_count, args.top_ngrams)
+
+    save_results(build_frequency_table(word_count), extra_sheets)
+
+
+if __name__ == '__main__':
+    main()
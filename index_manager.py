@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量导入时的索引维护：导入前删除二级索引和FULLTEXT索引，导入后统一重建
+每插入一行都要更新所有索引，大批量导入时先删后建要快得多。
+删除前先写标记文件记录被删除的索引，导入失败或进程中断时，
+下次运行（或 python index_manager.py --restore）会按标记文件恢复表结构。
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from mysql.connector import Error
+
+from db_access import Database, get_database
+from setup_database import DEFERRABLE_INDEXES
+
+logger = logging.getLogger(__name__)
+
+MARKER_FILE = 'bulk_load_indexes.json'
+
+
+class DeferredIndexes:
+    def __init__(self, db: Database, marker_path: str = MARKER_FILE, progress_interval: float = 5.0):
+        """
+        :param db: 数据库访问对象，重建时每张表使用一个独立连接
+        :param marker_path: 标记文件路径，存在即表示有索引待重建
+        :param progress_interval: 重建时打印进度的间隔（秒）
+        """
+        self.db = db
+        self.marker_path = marker_path
+        self.progress_interval = progress_interval
+
+    def pending(self) -> Optional[Dict]:
+        """读取标记文件，没有待重建的索引时返回None"""
+        if not os.path.exists(self.marker_path):
+            return None
+        with open(self.marker_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def existing_indexes(self, cursor, table: str) -> set:
+        cursor.execute(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,)
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def drop(self, conn) -> int:
+        """
+        删除可延迟的索引，先写标记文件再删除
+        :return: 删除的索引数
+        """
+        marker = self.pending()
+        if marker:
+            # 上次导入留下的索引还没重建，不能覆盖标记文件
+            logger.warning("上次批量导入的索引尚未重建，本次不再删除索引")
+            return 0
+
+        cursor = conn.cursor()
+        try:
+            dropped: Dict[str, List] = {}
+            for table, indexes in DEFERRABLE_INDEXES.items():
+                existing = self.existing_indexes(cursor, table)
+                dropped[table] = [[name, definition] for name, definition in indexes if name in existing]
+
+            count = sum(len(indexes) for indexes in dropped.values())
+            if not count:
+                return 0
+
+            tmp_path = self.marker_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'database': self.db.database,
+                    'started': datetime.now().isoformat(timespec='seconds'),
+                    'indexes': dropped,
+                }, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.marker_path)
+
+            for table, indexes in dropped.items():
+                if indexes:
+                    cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"DROP INDEX {name}" for name, _ in indexes))
+                    logger.info(f"已删除 {table} 的索引: {', '.join(name for name, _ in indexes)}")
+            return count
+        finally:
+            cursor.close()
+
+    def rebuild_table(self, table: str, indexes: List) -> float:
+        """
+        重建一张表的索引：普通二级索引合并为一条ALTER（只扫描一次表），
+        FULLTEXT索引逐个单独建（InnoDB一条ALTER只能新增一个FULLTEXT索引）
+        :return: 耗时（秒）
+        """
+        start = time.perf_counter()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                existing = self.existing_indexes(cursor, table)
+                todo = [(name, definition) for name, definition in indexes if name not in existing]
+                secondary = [definition for _, definition in todo if not definition.startswith('FULLTEXT')]
+                fulltext = [(name, definition) for name, definition in todo if definition.startswith('FULLTEXT')]
+
+                if secondary:
+                    logger.info(f"开始重建 {table} 的 {len(secondary)} 个二级索引")
+                    cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"ADD {definition}" for definition in secondary)
+                                   + ", ALGORITHM=INPLACE, LOCK=NONE")
+                    logger.info(f"{table} 二级索引重建完成 ({time.perf_counter() - start:.1f}s)")
+                for name, definition in fulltext:
+                    logger.info(f"开始重建 {table} 的全文索引 {name}")
+                    cursor.execute(f"ALTER TABLE {table} ADD {definition}")
+                    logger.info(f"{table} 全文索引 {name} 重建完成 ({time.perf_counter() - start:.1f}s)")
+            finally:
+                cursor.close()
+        return time.perf_counter() - start
+
+    def enable_progress_instruments(self):
+        """打开InnoDB ALTER TABLE阶段的performance_schema统计，没有权限时只按索引报告进度"""
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("UPDATE performance_schema.setup_instruments SET ENABLED = 'YES', TIMED = 'YES' "
+                               "WHERE NAME LIKE 'stage/innodb/alter%'")
+                cursor.execute("UPDATE performance_schema.setup_consumers SET ENABLED = 'YES' "
+                               "WHERE NAME LIKE 'events_stages_%'")
+            return True
+        except Error as e:
+            logger.debug(f"无法开启索引重建进度统计: {e}")
+            return False
+
+    def report_progress(self, done: threading.Event):
+        """定期从performance_schema读取正在执行的ALTER TABLE进度"""
+        while not done.wait(self.progress_interval):
+            try:
+                rows = self.db.fetch_all(
+                    "SELECT EVENT_NAME, WORK_COMPLETED, WORK_ESTIMATED "
+                    "FROM performance_schema.events_stages_current WHERE EVENT_NAME LIKE 'stage/innodb/alter%'"
+                )
+            except Error:
+                return
+            for event_name, completed, estimated in rows:
+                if estimated:
+                    logger.info(f"  索引重建进度: {event_name.rsplit('/', 1)[-1]} {completed}/{estimated} "
+                                f"({completed * 100 / estimated:.0f}%)")
+
+    def rebuild(self) -> bool:
+        """
+        按标记文件重建索引，不同的表并行重建，全部成功后删除标记文件
+        :return: 是否全部重建成功
+        """
+        marker = self.pending()
+        if not marker:
+            return True
+
+        tables = {table: indexes for table, indexes in marker['indexes'].items() if indexes}
+        logger.info(f"开始重建批量导入前删除的索引（{marker.get('started', '')}），共 {len(tables)} 张表")
+
+        done = threading.Event()
+        if self.enable_progress_instruments():
+            threading.Thread(target=self.report_progress, args=(done,), daemon=True).start()
+
+        ok = True
+        try:
+            with ThreadPoolExecutor(max_workers=max(len(tables), 1)) as pool:
+                futures = {table: pool.submit(self.rebuild_table, table, indexes) for table, indexes in tables.items()}
+                for table, future in futures.items():
+                    try:
+                        future.result()
+                    except Error as e:
+                        ok = False
+                        logger.error(f"重建 {table} 的索引失败: {e}")
+        finally:
+            done.set()
+
+        if ok:
+            os.remove(self.marker_path)
+            logger.info("索引重建完成，表结构已恢复")
+        else:
+            logger.error(f"部分索引重建失败，标记文件 {self.marker_path} 已保留，可运行 python index_manager.py --restore 重试")
+        return ok
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    deferred = DeferredIndexes(get_database())
+    if '--restore' in sys.argv[1:]:
+        sys.exit(0 if deferred.rebuild() else 1)
+
+    marker = deferred.pending()
+    if marker:
+        print(f"有待重建的索引（{marker.get('started', '')}）: {json.dumps(marker['indexes'], ensure_ascii=False)}")
+        print("运行 python index_manager.py --restore 重建")
+    else:
+        print("没有待重建的索引")
+
+
+if __name__ == '__main__':
+    main()
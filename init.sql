@@ -6,11 +6,16 @@ CREATE TABLE corpus (
                         media_name VARCHAR(200) COMMENT '具体媒体名称',
                         type ENUM('text', 'image', 'video') NOT NULL COMMENT '内容类型',
                         file_path VARCHAR(500) COMMENT '文件路径',
+                        url VARCHAR(1000) COMMENT '原始网址',
+                        url_hash CHAR(40) COMMENT '网址哈希（无网址时为标题哈希），用于幂等导入',
+                        content_hash CHAR(64) COMMENT '文件内容哈希',
                         image_url VARCHAR(500) COMMENT '图片URL',
                         video_url VARCHAR(500) COMMENT '视频URL',
                         publish_date DATE COMMENT '发布日期',
+                        publish_year SMALLINT NOT NULL DEFAULT 0 COMMENT '发布年份（分区键，无日期为0）',
                         create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
                         update_time DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+                        UNIQUE KEY uk_url_hash (url_hash),
                         INDEX idx_source (source),
                         INDEX idx_type (type),
                         INDEX idx_publish_date (publish_date),
@@ -21,6 +26,7 @@ CREATE TABLE corpus (
 CREATE TABLE sentiment_analysis (
                                     id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '主键ID',
                                     corpus_id BIGINT COMMENT '关联语料ID',
+                                    publish_year SMALLINT NOT NULL DEFAULT 0 COMMENT '语料发布年份（分区键，与corpus一致）',
                                     sentiment ENUM('positive', 'neutral', 'negative') NOT NULL COMMENT '情感倾向',
                                     sentiment_score DECIMAL(3,2) COMMENT '情感得分(0-10)',
                                     confidence DECIMAL(5,2) COMMENT '置信度(%)',
@@ -33,7 +39,7 @@ CREATE TABLE sentiment_analysis (
                                     emotion_surprise DECIMAL(5,2) COMMENT '惊讶情绪(%)',
                                     analysis_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '分析时间',
                                     FOREIGN KEY (corpus_id) REFERENCES corpus(id) ON DELETE CASCADE,
-                                    INDEX idx_corpus_id (corpus_id),
+                                    UNIQUE KEY uk_corpus_id (corpus_id),
                                     INDEX idx_sentiment (sentiment)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='情感分析结果表';
 
@@ -126,28 +132,58 @@ CREATE TABLE operation_logs (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户操作日志表';
 
 -- 插入示例数据
-INSERT INTO corpus (title, content, source, media_name, type, publish_date) VALUES
-                                                                                ('中国成功发射神舟十八号载人飞船', '北京时间10月25日，中国在酒泉卫星发射中心成功发射神舟十八号载人飞船...', 'china', '新华社', 'text', '2024-10-25'),
-                                                                                ('China launches Shenzhou-18 spacecraft', 'China successfully launched the Shenzhou-18 manned spacecraft...', 'usa', 'CNN', 'text', '2024-10-25'),
-                                                                                ('Китай запустил космический корабль Шэньчжоу-18', 'Китай успешно запустил пилотируемый космический корабль...', 'russia', 'TASS', 'text', '2024-10-25');
+INSERT INTO corpus (title, content, source, media_name, type, publish_date, publish_year) VALUES
+                                                                                ('中国成功发射神舟十八号载人飞船', '北京时间10月25日，中国在酒泉卫星发射中心成功发射神舟十八号载人飞船...', 'china', '新华社', 'text', '2024-10-25', 2024),
+                                                                                ('China launches Shenzhou-18 spacecraft', 'China successfully launched the Shenzhou-18 manned spacecraft...', 'usa', 'CNN', 'text', '2024-10-25', 2024),
+                                                                                ('Китай запустил космический корабль Шэньчжоу-18', 'Китай успешно запустил пилотируемый космический корабль...', 'russia', 'TASS', 'text', '2024-10-25', 2024);
+
+-- 9. 物化汇总表：按月预先聚合，统计视图从这里读取（由statistics_aggregator.py按月增量刷新）
+-- 没有发布日期的文章记在month=''下，视图中还原为NULL
+CREATE TABLE mv_corpus_monthly (
+                                   month CHAR(7) NOT NULL DEFAULT '' COMMENT '发布月份(YYYY-MM)，无日期为空串',
+                                   source ENUM('china', 'usa', 'russia') NOT NULL COMMENT '媒体来源国家',
+                                   type ENUM('text', 'image', 'video') NOT NULL COMMENT '内容类型',
+                                   article_count INT NOT NULL DEFAULT 0 COMMENT '文章数',
+                                   refresh_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+                                   PRIMARY KEY (month, source, type)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='语料月度汇总（v_corpus_statistics）';
+
+CREATE TABLE mv_sentiment_monthly (
+                                      month CHAR(7) NOT NULL DEFAULT '' COMMENT '发布月份(YYYY-MM)，无日期为空串',
+                                      source ENUM('china', 'usa', 'russia') NOT NULL COMMENT '媒体来源国家',
+                                      sentiment VARCHAR(10) NOT NULL DEFAULT '' COMMENT '情感倾向，未分析为空串',
+                                      article_count INT NOT NULL DEFAULT 0 COMMENT '文章数',
+                                      score_sum DECIMAL(12,2) COMMENT '情感得分之和',
+                                      score_count INT NOT NULL DEFAULT 0 COMMENT '有得分的文章数',
+                                      refresh_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+                                      PRIMARY KEY (month, source, sentiment)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='情感月度汇总（v_sentiment_statistics）';
+
+-- 汇总示例数据（与上面的示例语料对应，正式数据运行 python statistics_aggregator.py --rebuild 生成）
+INSERT INTO mv_corpus_monthly (month, source, type, article_count) VALUES
+                                                                      ('2024-10', 'china', 'text', 1),
+                                                                      ('2024-10', 'usa', 'text', 1),
+                                                                      ('2024-10', 'russia', 'text', 1);
+INSERT INTO mv_sentiment_monthly (month, source, sentiment, article_count, score_sum, score_count) VALUES
+                                                                                                      ('2024-10', 'china', '', 1, NULL, 0),
+                                                                                                      ('2024-10', 'usa', '', 1, NULL, 0),
+                                                                                                      ('2024-10', 'russia', '', 1, NULL, 0);
 
 -- 创建视图：语料库统计视图
 CREATE VIEW v_corpus_statistics AS
 SELECT
     source,
     type,
-    COUNT(*) as count,
-    DATE_FORMAT(publish_date, '%Y-%m') as month
-FROM corpus
-GROUP BY source, type, DATE_FORMAT(publish_date, '%Y-%m');
+    article_count as count,
+    NULLIF(month, '') as month
+FROM mv_corpus_monthly;
 
 -- 创建视图：情感分析统计视图
 CREATE VIEW v_sentiment_statistics AS
 SELECT
-    c.source,
-    sa.sentiment,
-    COUNT(*) as count,
-    AVG(sa.sentiment_score) as avg_score
-FROM corpus c
-         LEFT JOIN sentiment_analysis sa ON c.id = sa.corpus_id
-GROUP BY c.source, sa.sentiment;
\ No newline at end of file
+    source,
+    NULLIF(sentiment, '') as sentiment,
+    SUM(article_count) as count,
+    SUM(score_sum) / NULLIF(SUM(score_count), 0) as avg_score
+FROM mv_sentiment_monthly
+GROUP BY source, sentiment;
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量化的词典情感评分：批量评分大量文章时替代逐词遍历的VADER
+把情感词典编译为词表索引，一批句子构造成稀疏的句子×词矩阵，
+用一次稀疏矩阵乘法得到所有句子的情感分值，再按文章聚合。
+与VADER一致的部分：按空白切词（去掉单字符的词和词首尾的一个标点），每个词都计入pos/neg/neu的分母；
+compound = s / sqrt(s² + 15)；情感词前3个词以内每有一个否定词（not、never、含n't的词等，本身不是情感词），
+分值乘一次 -0.74。
+VADER中依赖上下文的规则（程度副词、全大写强调、but转折、感叹号和问号、never so等）没有实现，
+含有这些内容的句子得分与VADER不同，其余句子与VADER相同。
+可以加载额外的词典文件（每行“词语<TAB>分值”，分值范围与VADER相同，约-4到4），
+例如中文情感词典；词典中有中文词时，中文部分用jieba分词（未安装jieba时按连续汉字整体匹配）。
+依赖numpy和scipy。
+"""
+
+import re
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# VADER的归一化参数和否定系数
+VADER_ALPHA = 15
+NEGATION_SCALAR = -0.74
+NEGATION_WINDOW = 3
+NEGATE_WORDS = frozenset([
+    'aint', 'arent', 'cannot', 'cant', 'couldnt', 'darent', 'didnt', 'doesnt', "ain't", "aren't", "can't",
+    "couldn't", "daren't", "didn't", "doesn't", 'dont', 'hadnt', 'hasnt', 'havent', 'isnt', 'mightnt',
+    'mustnt', 'neither', "don't", "hadn't", "hasn't", "haven't", "isn't", "mightn't", "mustn't", 'neednt',
+    "needn't", 'never', 'none', 'nope', 'nor', 'not', 'nothing', 'nowhere', 'oughtnt', 'shant', 'shouldnt',
+    'uhuh', 'wasnt', 'werent', "oughtn't", "shan't", "shouldn't", 'uh-uh', "wasn't", "weren't", 'without',
+    'wont', 'wouldnt', "won't", "wouldn't", 'rarely', 'seldom', 'despite',
+    '不', '没', '没有', '无', '非', '未', '别', '并非', '不是', '绝不',
+])
+
+# VADER去掉的词首尾标点（每个词只去掉一个），以及判断词中是否有标点的规则
+PUNCTUATION = ('.', '!', '?', ',', ';', ':', '-', "'", '"', '!!', '!!!', '??', '???', '?!?', '!?!', '?!?!', '!?!?')
+punctuation_pattern = re.compile(r'[!"#$%&\'()*+,\-./:;<=>?@\[\\\]^_`{|}~]')
+cjk_pattern = re.compile(r'[一-龥]')
+cjk_run_pattern = re.compile(r'[一-龥]+')
+
+# 句子分类阈值，与text_sentiment_analysis.py一致
+SENTENCE_THRESHOLD = 0.05
+
+
+def load_vader_lexicon() -> Dict[str, float]:
+    """NLTK自带的VADER词典（需要先下载vader_lexicon）"""
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    return dict(SentimentIntensityAnalyzer().lexicon)
+
+
+def load_lexicon_file(path: str) -> Dict[str, float]:
+    """
+    读取词典文件：每行“词语<TAB>分值”，#开头的行和无法解析的行跳过
+    """
+    lexicon = {}
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) < 2:
+                continue
+            try:
+                lexicon[parts[0].strip().lower()] = float(parts[1])
+            except ValueError:
+                continue
+    return lexicon
+
+
+class LexiconScorer:
+    def __init__(self, lexicon: Dict[str, float], segmenter: Optional[Callable[[str], Iterable[str]]] = None):
+        """
+        :param lexicon: 词语到情感分值的字典（英文词为小写）
+        :param segmenter: 中文分词函数，为None时连续汉字整体作为一个词
+        """
+        self.vocabulary = {word: index for index, word in enumerate(lexicon)}
+        valence = np.fromiter(lexicon.values(), dtype=np.float64, count=len(lexicon))
+        # 列的前一半是原词，后一半是被否定奇数次（符号相反）的同一个词；矩阵元素是否定系数的绝对值的k次方
+        self.size = len(lexicon)
+        self.valence = np.concatenate([valence, -valence])
+        # VADER：正分值计为 s+1，负分值计为 |s-1|，分值为0的词计入中性；加上的1按命中次数计算
+        self.positive_part = np.where(self.valence > 0, self.valence, 0.0)
+        self.negative_part = np.where(self.valence < 0, -self.valence, 0.0)
+        self.positive_flag = (self.valence > 0).astype(np.float64)
+        self.negative_flag = (self.valence < 0).astype(np.float64)
+        self.nonzero_flag = (self.valence != 0).astype(np.float64)
+        self.segmenter = segmenter
+
+    @staticmethod
+    def strip_punctuation(token: str) -> str:
+        """与VADER一样去掉词首或词尾的一个标点，剩下的部分不含标点且多于一个字符时才去掉"""
+        for punctuation in PUNCTUATION:
+            for word in (token[len(punctuation):] if token.startswith(punctuation) else None,
+                         token[:-len(punctuation)] if token.endswith(punctuation) else None):
+                if word and len(word) > 1 and not punctuation_pattern.search(word):
+                    return word
+        return token
+
+    def tokens(self, sentence: str) -> List[str]:
+        """按空白切词（小写），忽略单个字符的词；含汉字的词取出连续汉字，有分词函数时再分词"""
+        words = []
+        for token in sentence.split():
+            if len(token) <= 1:
+                continue
+            if cjk_pattern.search(token):
+                for run in cjk_run_pattern.findall(token):
+                    words.extend(self.segmenter(run) if self.segmenter is not None else (run,))
+            else:
+                words.append(self.strip_punctuation(token).lower())
+        return words
+
+    def negation_count(self, words: List[str], position: int) -> int:
+        """情感词前3个词中否定词的个数，本身是情感词的不算（与VADER一致）"""
+        count = 0
+        for previous in words[max(0, position - NEGATION_WINDOW):position]:
+            if previous not in self.vocabulary and (previous in NEGATE_WORDS or "n't" in previous):
+                count += 1
+        return count
+
+    def sentence_matrix(self, sentences: Sequence[str]):
+        """
+        构造句子×词表的稀疏矩阵，元素是情感词分值的缩放系数（被否定k次时为0.74的k次方）
+        :return: (系数矩阵, 命中次数矩阵, 每句的词数)
+        """
+        indptr = [0]
+        indices = []
+        data = []
+        token_counts = np.zeros(len(sentences), dtype=np.float64)
+        vocabulary = self.vocabulary
+        for row, sentence in enumerate(sentences):
+            words = self.tokens(sentence)
+            token_counts[row] = len(words)
+            for position, word in enumerate(words):
+                index = vocabulary.get(word)
+                if index is None:
+                    continue
+                negations = self.negation_count(words, position)
+                indices.append(index + self.size if negations % 2 else index)
+                data.append(abs(NEGATION_SCALAR) ** negations)
+            indptr.append(len(indices))
+        shape = (len(sentences), 2 * self.size)
+        indices = np.asarray(indices, dtype=np.int64)
+        indptr = np.asarray(indptr, dtype=np.int64)
+        matrix = sparse.csr_matrix((np.asarray(data, dtype=np.float64), indices, indptr), shape=shape)
+        hits = sparse.csr_matrix((np.ones(len(indices), dtype=np.float64), indices, indptr), shape=shape)
+        return matrix, hits, token_counts
+
+    def score_sentences(self, sentences: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        一次稀疏矩阵乘法给所有句子评分
+        :return: compound、pos、neg、neu 四个数组，与VADER的polarity_scores含义相同
+        """
+        matrix, hits, token_counts = self.sentence_matrix(sentences)
+        raw = matrix @ self.valence
+        positive_sum = matrix @ self.positive_part + hits @ self.positive_flag
+        negative_sum = matrix @ self.negative_part + hits @ self.negative_flag
+        neutral_count = np.maximum(token_counts - hits @ self.nonzero_flag, 0)
+
+        total = positive_sum + negative_sum + neutral_count
+        safe_total = np.where(total > 0, total, 1)
+        compound = np.clip(raw / np.sqrt(raw * raw + VADER_ALPHA), -1, 1)
+        return {
+            'compound': np.round(compound, 4),
+            'pos': np.where(total > 0, positive_sum / safe_total, 0.0),
+            'neg': np.where(total > 0, negative_sum / safe_total, 0.0),
+            'neu': np.where(total > 0, neutral_count / safe_total, 0.0),
+        }
+
+    def score_documents(self, documents: Sequence[Sequence[str]]) -> List[Dict]:
+        """
+        给一批文章评分，文章得分取各句的平均值
+        :param documents: 每篇文章的句子列表
+        :return: 与text_sentiment_analysis.score_document相同字段的字典列表
+        """
+        document_count = len(documents)
+        lengths = np.fromiter((len(sentences) for sentences in documents), dtype=np.int64, count=document_count)
+        sentences = [sentence for document in documents for sentence in document]
+        document_index = np.repeat(np.arange(document_count), lengths)
+        scores = self.score_sentences(sentences)
+        compound = scores['compound']
+
+        safe_lengths = np.maximum(lengths, 1)
+        means = {key: np.bincount(document_index, weights=values, minlength=document_count) / safe_lengths
+                 for key, values in scores.items()}
+        positive = np.bincount(document_index, weights=compound >= SENTENCE_THRESHOLD, minlength=document_count)
+        negative = np.bincount(document_index, weights=compound <= -SENTENCE_THRESHOLD, minlength=document_count)
+        maximum = np.full(document_count, -np.inf)
+        minimum = np.full(document_count, np.inf)
+        np.maximum.at(maximum, document_index, compound)
+        np.minimum.at(minimum, document_index, compound)
+
+        results = []
+        for i in range(document_count):
+            if not lengths[i]:
+                results.append({'compound': 0.0, 'pos': 0.0, 'neg': 0.0, 'neu': 1.0, 'sentence_count': 0,
+                                'positive_sentences': 0, 'negative_sentences': 0, 'neutral_sentences': 0,
+                                'max_compound': 0.0, 'min_compound': 0.0})
+                continue
+            results.append({
+                'compound': round(float(means['compound'][i]), 4),
+                'pos': round(float(means['pos'][i]), 4),
+                'neg': round(float(means['neg'][i]), 4),
+                'neu': round(float(means['neu'][i]), 4),
+                'sentence_count': int(lengths[i]),
+                'positive_sentences': int(positive[i]),
+                'negative_sentences': int(negative[i]),
+                'neutral_sentences': int(lengths[i] - positive[i] - negative[i]),
+                'max_compound': float(maximum[i]),
+                'min_compound': float(minimum[i]),
+            })
+        return results
+
+
+def build_scorer(extra_lexicon_path: Optional[str] = None) -> LexiconScorer:
+    """
+    VADER词典加上可选的额外词典；额外词典中有中文词时尝试用jieba分词
+    """
+    lexicon = load_vader_lexicon()
+    segmenter = None
+    if extra_lexicon_path:
+        extra = load_lexicon_file(extra_lexicon_path)
+        lexicon.update(extra)
+        if any(cjk_pattern.search(word) for word in extra):
+            try:
+                import jieba
+                for word in extra:
+                    if cjk_pattern.search(word):
+                        jieba.add_word(word)
+                segmenter = jieba.lcut
+            except ImportError:
+                logger.warning("未安装jieba，中文按连续汉字整体匹配词典")
+    return LexiconScorer(lexicon, segmenter)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储迁移脚本：把按标题平铺的 texts/、images/、videos/ 迁移到分片目录布局
+用法: python migrate_storage.py [--dry-run]
+"""
+
+import os
+import re
+import sys
+import logging
+
+from storage_layout import StorageLayout, make_article_id, make_safe_title
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 图片列表/视频列表中的一行，例如 "1. 标题_1.jpeg - 尺寸: 600x303"
+LIST_LINE = re.compile(r'^(\d+)\. (.+?)((?: - 尺寸: \d+x\d+)?)$')
+
+
+def migrate_media_name(file_name: str, safe_title: str, article_id: str) -> str:
+    """把旧文件名中的标题前缀替换为文章ID"""
+    if file_name.startswith(safe_title + '_'):
+        return article_id + file_name[len(safe_title):]
+    return f"{article_id}_{file_name}"
+
+
+def migrate_article(layout: StorageLayout, file_path: str, dry_run: bool = False) -> bool:
+    """
+    迁移单篇文章及其图片和视频
+    :return: 是否迁移成功
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    title_match = re.search(r'^标题: (.+)$', content, re.MULTILINE)
+    url_match = re.search(r'^网址: (.+)$', content, re.MULTILINE)
+    title = title_match.group(1).strip() if title_match else os.path.splitext(os.path.basename(file_path))[0]
+    url = url_match.group(1).strip() if url_match else ""
+
+    # 没有网址的旧文件用标题生成ID
+    article_id = make_article_id(url or f"title:{title}")
+    safe_title = os.path.splitext(os.path.basename(file_path))[0] or make_safe_title(title)
+
+    new_text_path = layout.text_path(article_id)
+    if os.path.exists(new_text_path):
+        logger.warning(f"目标已存在，跳过: {file_path} -> {new_text_path}")
+        return False
+
+    images, videos = [], []
+    moves = []
+    section = None
+    new_lines = []
+    for line in content.split('\n'):
+        if line.startswith('图片列表:'):
+            section = 'image'
+        elif line.startswith('视频列表:'):
+            section = 'video'
+        elif section:
+            match = LIST_LINE.match(line)
+            if match:
+                old_name = match.group(2)
+                new_name = migrate_media_name(old_name, safe_title, article_id)
+                old_path = os.path.join(layout.folders[section], old_name)
+                if os.path.exists(old_path):
+                    moves.append((old_path, layout.media_path(section, new_name)))
+                else:
+                    logger.warning(f"  未找到媒体文件: {old_path}")
+                (images if section == 'image' else videos).append(new_name)
+                line = f"{match.group(1)}. {new_name}{match.group(3)}"
+        new_lines.append(line)
+
+    logger.info(f"迁移: {file_path} -> {new_text_path} (图片 {len(images)}, 视频 {len(videos)})")
+    if dry_run:
+        return True
+
+    for old_path, new_path in moves:
+        os.replace(old_path, layout.prepare_path(new_path))
+
+    with open(layout.prepare_path(new_text_path), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(new_lines))
+    os.remove(file_path)
+
+    layout.register_article(article_id, title, url, text_file=new_text_path, images=images, videos=videos)
+    return True
+
+
+def main():
+    dry_run = '--dry-run' in sys.argv[1:]
+    layout = StorageLayout()
+
+    # 只迁移平铺在texts/下的旧文件
+    legacy_files = [path for path in layout.iter_text_files()
+                    if os.path.dirname(path) == layout.folders['text']]
+    logger.info(f"找到 {len(legacy_files)} 个旧版文本文件{'（试运行）' if dry_run else ''}")
+
+    migrated = 0
+    failed = 0
+    for file_path in legacy_files:
+        try:
+            if migrate_article(layout, file_path, dry_run):
+                migrated += 1
+            else:
+                failed += 1
+        except Exception as e:
+            failed += 1
+            logger.error(f"迁移 {file_path} 失败: {e}")
+
+    if not dry_run:
+        layout.compact_manifest()
+    logger.info(f"迁移完成。成功: {migrated}, 跳过/失败: {failed}")
+
+
+if __name__ == '__main__':
+    main()
@@ -145,44 +145,137 @@ CREATE TABLE processing_logs (
     INDEX idx_start_time (start_time)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='数据处理日志表';
 
+-- 9. 物化汇总表：概览视图从这里读取，不再每次对corpus做GROUP BY
+-- 导入后对受影响的月份调用 RefreshMonthlySummaries('YYYY-MM') 增量刷新
+CREATE TABLE mv_sentiment_overview (
+    month CHAR(7) NOT NULL COMMENT '发布月份(YYYY-MM)',
+    source ENUM('china', 'usa', 'russia') NOT NULL COMMENT '媒体来源',
+    total_articles INT NOT NULL DEFAULT 0 COMMENT '总文章数',
+    positive_count INT NOT NULL DEFAULT 0 COMMENT '积极文章数',
+    neutral_count INT NOT NULL DEFAULT 0 COMMENT '中性文章数',
+    negative_count INT NOT NULL DEFAULT 0 COMMENT '消极文章数',
+    score_sum DECIMAL(12,3) COMMENT '情感得分之和',
+    score_count INT NOT NULL DEFAULT 0 COMMENT '有得分的文章数',
+    refresh_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+
+    PRIMARY KEY (month, source)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='情感概览月度汇总';
+
+CREATE TABLE mv_content_type_stats (
+    month CHAR(7) NOT NULL COMMENT '发布月份(YYYY-MM)',
+    content_type ENUM('text', 'image', 'video') NOT NULL COMMENT '内容类型',
+    source ENUM('china', 'usa', 'russia') NOT NULL COMMENT '媒体来源',
+    article_count INT NOT NULL DEFAULT 0 COMMENT '文章数',
+    image_sum INT NOT NULL DEFAULT 0 COMMENT '图片总数',
+    video_sum INT NOT NULL DEFAULT 0 COMMENT '视频总数',
+    media_count INT NOT NULL DEFAULT 0 COMMENT '不同媒体数',
+    refresh_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+
+    PRIMARY KEY (month, content_type, source)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='内容类型月度汇总';
+
 -- 创建视图：情感分析概览
 CREATE VIEW v_sentiment_overview AS
 SELECT
-    DATE_FORMAT(c.publish_date, '%Y-%m') as month,
-    c.source,
-    COUNT(*) as total_articles,
-    SUM(CASE WHEN sa.sentiment = 'positive' THEN 1 ELSE 0 END) as positive_count,
-    SUM(CASE WHEN sa.sentiment = 'neutral' THEN 1 ELSE 0 END) as neutral_count,
-    SUM(CASE WHEN sa.sentiment = 'negative' THEN 1 ELSE 0 END) as negative_count,
-    AVG(sa.sentiment_score) as avg_sentiment_score,
-    ROUND(SUM(CASE WHEN sa.sentiment = 'positive' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as positive_rate
-FROM corpus c
-LEFT JOIN sentiment_analysis sa ON c.id = sa.corpus_id
-WHERE c.publish_date IS NOT NULL
-GROUP BY DATE_FORMAT(c.publish_date, '%Y-%m'), c.source
-ORDER BY month DESC, c.source;
+    month,
+    source,
+    total_articles,
+    positive_count,
+    neutral_count,
+    negative_count,
+    score_sum / NULLIF(score_count, 0) as avg_sentiment_score,
+    ROUND(positive_count * 100.0 / total_articles, 2) as positive_rate
+FROM mv_sentiment_overview
+ORDER BY month DESC, source;
 
 -- 创建视图：内容类型统计
 CREATE VIEW v_content_type_stats AS
 SELECT
-    DATE_FORMAT(c.publish_date, '%Y-%m') as month,
-    c.content_type,
-    c.source,
-    COUNT(*) as count,
-    AVG(c.image_count) as avg_images,
-    AVG(c.video_count) as avg_videos,
-    COUNT(DISTINCT c.media_name) as media_count
-FROM corpus c
-WHERE c.publish_date IS NOT NULL
-GROUP BY DATE_FORMAT(c.publish_date, '%Y-%m'), c.content_type, c.source
-ORDER BY month DESC, c.content_type, c.source;
+    month,
+    content_type,
+    source,
+    article_count as count,
+    image_sum / article_count as avg_images,
+    video_sum / article_count as avg_videos,
+    media_count
+FROM mv_content_type_stats
+ORDER BY month DESC, content_type, source;
+
+-- 创建存储过程：刷新一个月的物化汇总（按发布日期范围过滤，可以使用 idx_publish_date 索引）
+DELIMITER //
+CREATE PROCEDURE RefreshMonthlySummaries(IN p_month VARCHAR(7))
+BEGIN
+    DECLARE month_start DATE DEFAULT CAST(CONCAT(p_month, '-01') AS DATE);
+
+    DELETE FROM mv_sentiment_overview WHERE month = p_month;
+    INSERT INTO mv_sentiment_overview (
+        month, source, total_articles, positive_count, neutral_count, negative_count, score_sum, score_count
+    )
+    SELECT
+        p_month,
+        c.source,
+        COUNT(*),
+        SUM(CASE WHEN sa.sentiment = 'positive' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN sa.sentiment = 'neutral' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN sa.sentiment = 'negative' THEN 1 ELSE 0 END),
+        SUM(sa.sentiment_score),
+        COUNT(sa.sentiment_score)
+    FROM corpus c
+    LEFT JOIN sentiment_analysis sa ON c.id = sa.corpus_id
+    WHERE c.publish_date >= month_start AND c.publish_date < month_start + INTERVAL 1 MONTH
+    GROUP BY c.source;
+
+    DELETE FROM mv_content_type_stats WHERE month = p_month;
+    INSERT INTO mv_content_type_stats (
+        month, content_type, source, article_count, image_sum, video_sum, media_count
+    )
+    SELECT
+        p_month,
+        c.content_type,
+        c.source,
+        COUNT(*),
+        COALESCE(SUM(c.image_count), 0),
+        COALESCE(SUM(c.video_count), 0),
+        COUNT(DISTINCT c.media_name)
+    FROM corpus c
+    WHERE c.publish_date >= month_start AND c.publish_date < month_start + INTERVAL 1 MONTH
+    GROUP BY c.content_type, c.source;
+END //
+
+-- 全量重建所有月份的物化汇总（初始化或修复数据时使用）
+CREATE PROCEDURE RebuildMonthlySummaries()
+BEGIN
+    DECLARE done INT DEFAULT 0;
+    DECLARE v_month VARCHAR(7);
+    DECLARE month_cursor CURSOR FOR
+        SELECT DISTINCT DATE_FORMAT(publish_date, '%Y-%m') FROM corpus WHERE publish_date IS NOT NULL;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = 1;
+
+    DELETE FROM mv_sentiment_overview;
+    DELETE FROM mv_content_type_stats;
+
+    OPEN month_cursor;
+    month_loop: LOOP
+        FETCH month_cursor INTO v_month;
+        IF done THEN
+            LEAVE month_loop;
+        END IF;
+        CALL RefreshMonthlySummaries(v_month);
+    END LOOP;
+    CLOSE month_cursor;
+END //
+DELIMITER ;
 
 -- 创建存储过程：更新月度统计数据
 DELIMITER //
-CREATE PROCEDURE UpdateMonthlyStatistics(IN stat_month VARCHAR(7))
+-- 参数名不能与列名相同，否则 WHERE stat_month = stat_month 恒为真会删除所有月份
+-- 按发布日期范围过滤，可以使用 idx_publish_date 索引（DATE_FORMAT(publish_date) = ? 需要全表扫描）
+CREATE PROCEDURE UpdateMonthlyStatistics(IN p_stat_month VARCHAR(7))
 BEGIN
+    DECLARE month_start DATE DEFAULT CAST(CONCAT(p_stat_month, '-01') AS DATE);
+
     -- 删除当月已存在的统计数据
-    DELETE FROM media_statistics WHERE stat_month = stat_month;
+    DELETE FROM media_statistics WHERE stat_month = p_stat_month;
 
     -- 插入新的统计数据
     INSERT INTO media_statistics (
@@ -191,8 +284,8 @@ BEGIN
         negative_articles, avg_sentiment_score, total_images, total_videos
     )
     SELECT
-        LAST_DAY(CONCAT(stat_month, '-01')) as stat_date,
-        stat_month,
+        LAST_DAY(month_start) as stat_date,
+        p_stat_month,
         c.source,
         COUNT(*) as total_articles,
         SUM(CASE WHEN c.content_type = 'text' THEN 1 ELSE 0 END) as text_articles,
@@ -206,10 +299,10 @@ BEGIN
         SUM(c.video_count) as total_videos
     FROM corpus c
     LEFT JOIN sentiment_analysis sa ON c.id = sa.corpus_id
-    WHERE DATE_FORMAT(c.publish_date, '%Y-%m') = stat_month
+    WHERE c.publish_date >= month_start AND c.publish_date < month_start + INTERVAL 1 MONTH
     GROUP BY c.source;
 
-    SELECT CONCAT('Updated statistics for month: ', stat_month) as result;
+    SELECT CONCAT('Updated statistics for month: ', p_stat_month) as result;
 END //
 DELIMITER ;
 
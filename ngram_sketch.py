@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+n元词组的近似计数：内存大小只由误差参数决定，与语料规模无关
+- CountMinSketch：depth×width 的计数矩阵，估计值不小于真实次数，
+  以 1-delta 的概率超出不多于 epsilon×N（N为加入的总次数），width=ceil(e/epsilon)，depth=ceil(ln(1/delta))
+- SpaceSaving：最多保留 capacity 个候选项的高频项（heavy hitter）统计，
+  次数≥N/capacity 的项一定在候选中，每个候选的计数最多多算 N/capacity
+- NgramCounter：同时使用两者，SpaceSaving 给出候选和误差上限，计数取两者估计值中较小的一个
+"""
+
+import math
+import heapq
+import hashlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# 默认误差参数：误差不超过总次数的万分之一，置信度99%
+DEFAULT_EPSILON = 0.0001
+DEFAULT_DELTA = 0.01
+
+
+class CountMinSketch:
+    def __init__(self, epsilon: float = DEFAULT_EPSILON, delta: float = DEFAULT_DELTA):
+        """
+        :param epsilon: 相对误差上限（相对于总次数）
+        :param delta: 超出误差上限的概率
+        """
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.rows = [array('Q', bytes(8 * self.width)) for _ in range(self.depth)]
+        self.total = 0
+
+    def _indexes(self, item: str) -> Iterator[int]:
+        # 双重哈希：一次blake2b得到两个64位哈希值，组合出depth个列号
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.width for i in range(self.depth))
+
+    def add(self, item: str, count: int = 1) -> int:
+        """加入count次item，返回加入后的估计次数"""
+        self.total += count
+        estimate = None
+        for row, index in zip(self.rows, self._indexes(item)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        return estimate
+
+    def estimate(self, item: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(item)))
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int):
+        """
+        :param capacity: 最多保留的候选项个数
+        """
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # 每个候选项在堆中恰有一项；计数增加后堆中的值会过时，淘汰时再更新
+        self.heap: List[Tuple[int, str]] = []
+        self.total = 0
+
+    def add(self, item: str, count: int = 1):
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+            heapq.heappush(self.heap, (count, item))
+            return
+
+        # 已满：淘汰计数最小的候选项，新项继承它的计数（作为误差上限）
+        while True:
+            heap_count, victim = heapq.heappop(self.heap)
+            if self.counts[victim] == heap_count:
+                break
+            heapq.heappush(self.heap, (self.counts[victim], victim))
+        del self.counts[victim]
+        del self.errors[victim]
+        self.counts[item] = heap_count + count
+        self.errors[item] = heap_count
+        heapq.heappush(self.heap, (heap_count + count, item))
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """
+        计数最高的k项，计数相同的按项排序
+        :return: (项, 估计次数, 误差上限) 列表
+        """
+        items = heapq.nsmallest(k, self.counts.items(), key=lambda pair: (-pair[1], pair[0]))
+        return [(item, count, self.errors[item]) for item, count in items]
+
+
+class NgramCounter:
+    def __init__(self, n: int, epsilon: float = DEFAULT_EPSILON, delta: float = DEFAULT_DELTA):
+        """
+        :param n: 词组长度
+        :param epsilon: 相对误差上限，SpaceSaving保留 ceil(1/epsilon) 个候选
+        :param delta: CountMinSketch超出误差上限的概率
+        """
+        self.n = n
+        self.sketch = CountMinSketch(epsilon, delta)
+        self.heavy_hitters = SpaceSaving(math.ceil(1 / epsilon))
+
+    @property
+    def total(self) -> int:
+        return self.sketch.total
+
+    def add_counts(self, counts: Dict[str, int]):
+        """加入一篇文章的词组计数"""
+        for ngram, count in counts.items():
+            self.sketch.add(ngram, count)
+            self.heavy_hitters.add(ngram, count)
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """
+        计数最高的k个词组，计数取两种估计中较小的一个（两者都不小于真实次数）
+        :return: (词组, 估计次数, 误差上限) 列表
+        """
+        candidates = []
+        for ngram, count, error in self.heavy_hitters.top(max(k * 2, k + 10)):
+            estimate = min(count, self.sketch.estimate(ngram))
+            candidates.append((ngram, estimate, min(error, estimate)))
+        candidates.sort(key=lambda row: (-row[1], row[0]))
+        return candidates[:k]
+
+
+def iter_ngrams(phrases: Iterable[Sequence[str]], n: int, is_content_word) -> Iterator[str]:
+    """
+    逐个短语（句子或逗号间的片段）产生n元词组，词组不跨越短语边界，以空格连接
+    首尾两个词必须是实词（is_content_word为真），中间可以是停用词，如 belt and road
+    """
+    for words in phrases:
+        for start in range(len(words) - n + 1):
+            if is_content_word(words[start]) and is_content_word(words[start + n - 1]):
+                yield ' '.join(words[start:start + n])
+
+
+def pmi(pair_count: int, first_count: int, second_count: int, total: int) -> float:
+    """二元词组的点互信息 log2(P(xy) / (P(x)P(y)))"""
+    return math.log2(pair_count * total / (first_count * second_count))
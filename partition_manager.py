@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按发布年份对 corpus 和 sentiment_analysis 做RANGE分区，并按年归档或删除旧数据（仅MySQL）
+分区键是 publish_year（无发布日期为0，落在 p_undated 分区），两张表的分区划分相同。
+分区后保留旧数据只需整块操作分区：
+- 归档：EXCHANGE PARTITION 把某年的分区换到独立的归档表 <表名>_archive_<年份>，只改元数据
+- 删除：DROP PARTITION 直接丢弃某年的分区，不逐行删除
+MySQL分区表的限制：主键和唯一键必须包含分区键，不支持外键和FULLTEXT索引，
+因此转换时会删除相关外键（级联删除改由本工具清理）和全文索引（全文检索退回LIKE）。
+用法:
+    python partition_manager.py                        查看分区
+    python partition_manager.py --convert [--first-year 2012] [--last-year 2026]
+    python partition_manager.py --add-year 2027
+    python partition_manager.py --archive-before 2015
+    python partition_manager.py --drop-before 2015
+"""
+
+import sys
+import argparse
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from mysql.connector import Error
+
+from db_access import Database, get_database
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ('corpus', 'sentiment_analysis')
+
+# 转换时各表的主键和唯一键（都加上分区键publish_year）
+PARTITION_KEYS = {
+    'corpus': ('PRIMARY KEY (id, publish_year)', 'uk_url_hash', 'UNIQUE KEY uk_url_hash (url_hash, publish_year)'),
+    'sentiment_analysis': ('PRIMARY KEY (id, publish_year)', 'uk_corpus_id',
+                           'UNIQUE KEY uk_corpus_id (corpus_id, publish_year)'),
+}
+
+UNDATED_PARTITION = 'p_undated'
+FUTURE_PARTITION = 'p_future'
+
+
+def year_partition(year: int) -> str:
+    return f"p{year}"
+
+
+def partition_clause(first_year: int, last_year: int) -> str:
+    """p_undated（publish_year=0）、每年一个分区，以及容纳以后年份的p_future"""
+    partitions = [f"PARTITION {UNDATED_PARTITION} VALUES LESS THAN (1)"]
+    partitions += [f"PARTITION {year_partition(year)} VALUES LESS THAN ({year + 1})"
+                   for year in range(first_year, last_year + 1)]
+    partitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (publish_year) (" + ", ".join(partitions) + ")"
+
+
+class PartitionManager:
+    def __init__(self, db: Database):
+        """
+        :param db: 数据库访问对象
+        """
+        self.db = db
+
+    def partitions(self, table: str) -> List[Tuple[str, str, int]]:
+        """
+        表的分区列表，未分区时返回空列表
+        :return: (分区名, 上界, 估算行数) 列表，按分区顺序排列
+        """
+        rows = self.db.fetch_all(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            (table,)
+        )
+        return [(name, description, rows or 0) for name, description, rows in rows]
+
+    def is_partitioned(self, table: str = 'corpus') -> bool:
+        return bool(self.partitions(table))
+
+    def year_partitions(self, table: str = 'corpus') -> Dict[int, str]:
+        """按年份的分区，键为年份"""
+        return {int(name[1:]): name for name, _, _ in self.partitions(table) if name[1:].isdigit()}
+
+    def drop_foreign_keys(self, cursor):
+        """删除两张分区表上的外键以及其他表引用它们的外键"""
+        cursor.execute(
+            "SELECT TABLE_NAME, CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+            "WHERE CONSTRAINT_SCHEMA = DATABASE() "
+            f"AND (TABLE_NAME IN ({', '.join(['%s'] * len(PARTITIONED_TABLES))}) "
+            f"OR REFERENCED_TABLE_NAME IN ({', '.join(['%s'] * len(PARTITIONED_TABLES))}))",
+            PARTITIONED_TABLES + PARTITIONED_TABLES
+        )
+        for table, constraint in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {table} DROP FOREIGN KEY {constraint}")
+            logger.info(f"已删除外键 {table}.{constraint}")
+
+    def convert(self, first_year: Optional[int] = None, last_year: Optional[int] = None):
+        """
+        把corpus和sentiment_analysis转换为按年RANGE分区（需要重建表，数据量大时耗时较长）
+        :param first_year: 第一个年份分区，默认为库中最早的发布年份（更早的年份也落在这个分区）
+        :param last_year: 最后一个年份分区，默认为今年，以后的年份落在p_future
+        """
+        if self.is_partitioned('corpus'):
+            logger.info("corpus表已经分区，无需转换")
+            return
+
+        min_year = self.db.fetch_one("SELECT MIN(publish_year) FROM corpus WHERE publish_year > 0")[0]
+        first_year = first_year or min_year or date.today().year
+        last_year = last_year or date.today().year
+        clause = partition_clause(first_year, last_year)
+
+        with self.db.transaction() as cursor:
+            self.drop_foreign_keys(cursor)
+
+            cursor.execute(
+                "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+                "AND TABLE_NAME = 'corpus' AND INDEX_TYPE = 'FULLTEXT'"
+            )
+            for (index_name,) in cursor.fetchall():
+                cursor.execute(f"ALTER TABLE corpus DROP INDEX {index_name}")
+                logger.warning(f"分区表不支持FULLTEXT索引，已删除 corpus.{index_name}，全文检索将退回LIKE")
+
+            for table in PARTITIONED_TABLES:
+                primary_key, unique_name, unique_key = PARTITION_KEYS[table]
+                logger.info(f"开始转换 {table} 为按年分区（{first_year}-{last_year}）")
+                cursor.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD {primary_key}, "
+                               f"DROP INDEX {unique_name}, ADD {unique_key}")
+                cursor.execute(f"ALTER TABLE {table} {clause}")
+                logger.info(f"{table} 分区转换完成")
+
+    def add_year(self, year: int):
+        """从p_future中拆出一个年份分区（以后的年份仍在p_future中）"""
+        for table in PARTITIONED_TABLES:
+            if year in self.year_partitions(table):
+                logger.info(f"{table} 已有 {year} 年的分区")
+                continue
+            with self.db.transaction() as cursor:
+                cursor.execute(
+                    f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ("
+                    f"PARTITION {year_partition(year)} VALUES LESS THAN ({year + 1}), "
+                    f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE)"
+                )
+            logger.info(f"{table} 已添加 {year} 年的分区")
+
+    def expired_years(self, before_year: int) -> List[int]:
+        """早于before_year的年份分区（两张表都有的）"""
+        corpus_years = self.year_partitions('corpus')
+        sentiment_years = self.year_partitions('sentiment_analysis')
+        return sorted(year for year in corpus_years if year < before_year and year in sentiment_years)
+
+    def partition_dates(self, partition: str) -> Set:
+        """分区中出现的发布日期，归档/删除后这些日期的汇总需要重算"""
+        return {row[0] for row in self.db.fetch_all(f"SELECT DISTINCT publish_date FROM corpus PARTITION ({partition})")}
+
+    def archive(self, before_year: int) -> List[str]:
+        """
+        把早于before_year的年份分区移到归档表 <表名>_archive_<年份>
+        归档表与原表结构相同但不分区，可以单独备份或迁移到其他存储；keywords中对应的记录保留
+        :return: 新建的归档表名
+        """
+        archived = []
+        dates = set()
+        for year in self.expired_years(before_year):
+            partition = year_partition(year)
+            dates |= self.partition_dates(partition)
+            with self.db.transaction() as cursor:
+                for table in PARTITIONED_TABLES:
+                    archive_table = f"{table}_archive_{year}"
+                    cursor.execute(f"CREATE TABLE {archive_table} LIKE {table}")
+                    cursor.execute(f"ALTER TABLE {archive_table} REMOVE PARTITIONING")
+                    # 交换只修改元数据：分区的数据换到归档表，分区变为空
+                    cursor.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {partition} WITH TABLE {archive_table}")
+                    cursor.execute(f"ALTER TABLE {table} DROP PARTITION {partition}")
+                    archived.append(archive_table)
+            logger.info(f"{year} 年的数据已归档到 {', '.join(archived[-2:])}")
+
+        self.refresh_statistics(dates)
+        return archived
+
+    def drop(self, before_year: int) -> List[int]:
+        """
+        直接删除早于before_year的年份分区，并清理keywords中失去关联的记录
+        :return: 删除的年份
+        """
+        years = self.expired_years(before_year)
+        dates = set()
+        for year in years:
+            partition = year_partition(year)
+            dates |= self.partition_dates(partition)
+            with self.db.transaction() as cursor:
+                for table in PARTITIONED_TABLES:
+                    cursor.execute(f"ALTER TABLE {table} DROP PARTITION {partition}")
+            logger.info(f"已删除 {year} 年的分区")
+
+        if years:
+            # 分区表没有外键，原来的级联删除在这里补上
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE k FROM keywords k LEFT JOIN corpus c ON c.id = k.corpus_id WHERE c.id IS NULL")
+                logger.info(f"清理了 {cursor.rowcount} 条失去关联的关键词记录")
+        self.refresh_statistics(dates)
+        return years
+
+    def refresh_statistics(self, dates: Set):
+        """重算被归档/删除的日期的汇总表"""
+        if not dates:
+            return
+        from storage_backends import MySQLBackend
+        from statistics_aggregator import StatisticsAggregator
+
+        backend = MySQLBackend(self.db.config, pool_size=1, pool_name='opinion_partition')
+        conn = backend.connect()
+        try:
+            StatisticsAggregator(backend, conn).refresh(dates)
+        finally:
+            conn.close()
+
+    def print_status(self):
+        for table in PARTITIONED_TABLES:
+            partitions = self.partitions(table)
+            if not partitions:
+                print(f"{table}: 未分区（运行 python partition_manager.py --convert 转换）")
+                continue
+            print(f"{table}: {len(partitions)} 个分区")
+            for name, description, rows in partitions:
+                print(f"  {name:<12} < {description:<10} 约 {rows} 行")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='corpus/sentiment_analysis按年分区与归档')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--convert', action='store_true', help='把两张表转换为按发布年份分区')
+    group.add_argument('--add-year', type=int, metavar='YEAR', help='从p_future中拆出一个年份分区')
+    group.add_argument('--archive-before', type=int, metavar='YEAR', help='把早于该年份的分区移到归档表')
+    group.add_argument('--drop-before', type=int, metavar='YEAR', help='删除早于该年份的分区')
+    parser.add_argument('--first-year', type=int, help='转换时的第一个年份分区（默认为最早的发布年份）')
+    parser.add_argument('--last-year', type=int, help='转换时的最后一个年份分区（默认为今年）')
+    args = parser.parse_args()
+
+    manager = PartitionManager(get_database())
+    try:
+        if args.convert:
+            manager.convert(args.first_year, args.last_year)
+        elif args.add_year:
+            manager.add_year(args.add_year)
+        elif args.archive_before:
+            manager.archive(args.archive_before)
+        elif args.drop_before:
+            manager.drop(args.drop_before)
+        manager.print_status()
+    except Error as e:
+        logger.error(f"分区操作失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
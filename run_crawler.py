@@ -7,9 +7,12 @@ def main():
     print("网页内容爬取工具")
     print("=" * 50)
     
-    # 检查命令行参数
-    if len(sys.argv) > 1:
-        excel_file = sys.argv[1]
+    # 检查命令行参数，--recrawl 表示重新爬取已完成的URL
+    args = [arg for arg in sys.argv[1:] if arg != '--recrawl']
+    recrawl = len(args) != len(sys.argv) - 1
+    
+    if args:
+        excel_file = args[0]
     else:
         # 列出当前目录下的所有Excel文件
         excel_files = [f for f in os.listdir('.') if f.endswith('.xlsx') or f.endswith('.xls')]
@@ -50,7 +53,7 @@ def main():
     print("\n开始爬取内容，详细信息请查看 crawler.log 日志文件...")
     
     # 创建爬虫实例并开始爬取
-    crawler = WebCrawler(excel_file)
+    crawler = WebCrawler(excel_file, recrawl=recrawl)
     crawler.start_crawling()
 
 if __name__ == "__main__":
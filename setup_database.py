@@ -5,37 +5,98 @@
 基于init.sql的内容
 """
 
-import mysql.connector
 from mysql.connector import Error
 import logging
 
+from db_access import get_database, quote_identifier
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 大批量导入时先删除、导入后再重建的索引（定义须与下方建表语句一致）
+# 唯一键和外键上的索引保留：upsert去重和外键检查依赖它们
+DEFERRABLE_INDEXES = {
+    'corpus': [
+        ('idx_source', 'INDEX idx_source (source)'),
+        ('idx_type', 'INDEX idx_type (type)'),
+        ('idx_publish_date', 'INDEX idx_publish_date (publish_date)'),
+        ('idx_title_content', 'FULLTEXT INDEX idx_title_content (title, content) WITH PARSER ngram'),
+    ],
+    'sentiment_analysis': [
+        ('idx_sentiment', 'INDEX idx_sentiment (sentiment)'),
+    ],
+}
+
+# 物化汇总表：按月预先聚合，统计视图从这里读取而不是每次扫描corpus
+# 没有发布日期的文章记在month=''下，视图中还原为NULL；由statistics_aggregator.py按月增量刷新
+SUMMARY_TABLES = {
+    'mv_corpus_monthly': """
+        CREATE TABLE IF NOT EXISTS mv_corpus_monthly (
+            month CHAR(7) NOT NULL DEFAULT '' COMMENT '发布月份(YYYY-MM)，无日期为空串',
+            source ENUM('china', 'usa', 'russia') NOT NULL COMMENT '媒体来源国家',
+            type ENUM('text', 'image', 'video') NOT NULL COMMENT '内容类型',
+            article_count INT NOT NULL DEFAULT 0 COMMENT '文章数',
+            refresh_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+            PRIMARY KEY (month, source, type)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='语料月度汇总（v_corpus_statistics）'
+    """,
+    'mv_sentiment_monthly': """
+        CREATE TABLE IF NOT EXISTS mv_sentiment_monthly (
+            month CHAR(7) NOT NULL DEFAULT '' COMMENT '发布月份(YYYY-MM)，无日期为空串',
+            source ENUM('china', 'usa', 'russia') NOT NULL COMMENT '媒体来源国家',
+            sentiment VARCHAR(10) NOT NULL DEFAULT '' COMMENT '情感倾向，未分析为空串',
+            article_count INT NOT NULL DEFAULT 0 COMMENT '文章数',
+            score_sum DECIMAL(12,2) COMMENT '情感得分之和',
+            score_count INT NOT NULL DEFAULT 0 COMMENT '有得分的文章数',
+            refresh_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+            PRIMARY KEY (month, source, sentiment)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='情感月度汇总（v_sentiment_statistics）'
+    """,
+}
+
+SUMMARY_VIEWS = {
+    'v_corpus_statistics': """
+        CREATE OR REPLACE VIEW v_corpus_statistics AS
+        SELECT
+            source,
+            type,
+            article_count as count,
+            NULLIF(month, '') as month
+        FROM mv_corpus_monthly
+    """,
+    'v_sentiment_statistics': """
+        CREATE OR REPLACE VIEW v_sentiment_statistics AS
+        SELECT
+            source,
+            NULLIF(sentiment, '') as sentiment,
+            SUM(article_count) as count,
+            SUM(score_sum) / NULLIF(SUM(score_count), 0) as avg_score
+        FROM mv_sentiment_monthly
+        GROUP BY source, sentiment
+    """,
+}
+
 def setup_database():
     """设置数据库和表结构"""
 
-    # 数据库连接配置（根据实际情况修改）
-    config = {
-        'host': 'localhost',
-        'user': 'root',
-        'password': 'your_password',  # 修改为实际密码
-        'charset': 'utf8mb4'
-    }
+    # 数据库连接配置见db_access.py（环境变量或db_config.json）
+    db = get_database()
+    connection = None
 
     try:
-        # 连接MySQL服务器
-        connection = mysql.connector.connect(**config)
+        # 连接MySQL服务器（数据库可能还不存在，不经过连接池）
+        connection = db.server_connection()
         cursor = connection.cursor()
 
         # 创建数据库
-        db_name = "sentiment_analysis"
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+        db_name = db.database
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {quote_identifier(db_name)} "
+                       "CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
         logger.info(f"数据库 {db_name} 创建成功或已存在")
 
         # 使用数据库
-        cursor.execute(f"USE {db_name}")
+        cursor.execute(f"USE {quote_identifier(db_name)}")
 
         # 创建语料库表
         create_corpus_table = """
@@ -47,11 +108,16 @@ def setup_database():
             media_name VARCHAR(200) COMMENT '具体媒体名称',
             type ENUM('text', 'image', 'video') NOT NULL COMMENT '内容类型',
             file_path VARCHAR(500) COMMENT '文件路径',
+            url VARCHAR(1000) COMMENT '原始网址',
+            url_hash CHAR(40) COMMENT '网址哈希（无网址时为标题哈希），用于幂等导入',
+            content_hash CHAR(64) COMMENT '文件内容哈希',
             image_url VARCHAR(500) COMMENT '图片URL',
             video_url VARCHAR(500) COMMENT '视频URL',
             publish_date DATE COMMENT '发布日期',
+            publish_year SMALLINT NOT NULL DEFAULT 0 COMMENT '发布年份（分区键，无日期为0）',
             create_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
             update_time DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+            UNIQUE KEY uk_url_hash (url_hash),
             INDEX idx_source (source),
             INDEX idx_type (type),
             INDEX idx_publish_date (publish_date),
@@ -67,6 +133,7 @@ def setup_database():
         CREATE TABLE IF NOT EXISTS sentiment_analysis (
             id BIGINT PRIMARY KEY AUTO_INCREMENT COMMENT '主键ID',
             corpus_id BIGINT COMMENT '关联语料ID',
+            publish_year SMALLINT NOT NULL DEFAULT 0 COMMENT '语料发布年份（分区键，与corpus一致）',
             sentiment ENUM('positive', 'neutral', 'negative') NOT NULL COMMENT '情感倾向',
             sentiment_score DECIMAL(3,2) COMMENT '情感得分(0-10)',
             confidence DECIMAL(5,2) COMMENT '置信度(%)',
@@ -79,7 +146,7 @@ def setup_database():
             emotion_surprise DECIMAL(5,2) COMMENT '惊讶情绪(%)',
             analysis_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '分析时间',
             FOREIGN KEY (corpus_id) REFERENCES corpus(id) ON DELETE CASCADE,
-            INDEX idx_corpus_id (corpus_id),
+            UNIQUE KEY uk_corpus_id (corpus_id),
             INDEX idx_sentiment (sentiment)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='情感分析结果表';
         """
@@ -205,36 +272,14 @@ def setup_database():
         cursor.execute(create_operation_logs_table)
         logger.info("operation_logs表创建成功")
 
-        # 创建视图：语料库统计视图
-        create_corpus_view = """
-        CREATE OR REPLACE VIEW v_corpus_statistics AS
-        SELECT
-            source,
-            type,
-            COUNT(*) as count,
-            DATE_FORMAT(publish_date, '%Y-%m') as month
-        FROM corpus
-        GROUP BY source, type, DATE_FORMAT(publish_date, '%Y-%m');
-        """
-
-        cursor.execute(create_corpus_view)
-        logger.info("v_corpus_statistics视图创建成功")
-
-        # 创建视图：情感分析统计视图
-        create_sentiment_view = """
-        CREATE OR REPLACE VIEW v_sentiment_statistics AS
-        SELECT
-            c.source,
-            sa.sentiment,
-            COUNT(*) as count,
-            AVG(sa.sentiment_score) as avg_score
-        FROM corpus c
-        LEFT JOIN sentiment_analysis sa ON c.id = sa.corpus_id
-        GROUP BY c.source, sa.sentiment;
-        """
+        # 创建物化汇总表和读取它们的统计视图
+        for table_name, ddl in SUMMARY_TABLES.items():
+            cursor.execute(ddl)
+            logger.info(f"{table_name}表创建成功")
 
-        cursor.execute(create_sentiment_view)
-        logger.info("v_sentiment_statistics视图创建成功")
+        for view_name, ddl in SUMMARY_VIEWS.items():
+            cursor.execute(ddl)
+            logger.info(f"{view_name}视图创建成功")
 
         # 提交所有更改
         connection.commit()
@@ -246,36 +291,14 @@ def setup_database():
             connection.rollback()
         raise
     finally:
-        if 'connection' in locals() and connection.is_connected():
+        if connection and connection.is_connected():
             cursor.close()
             connection.close()
             logger.info("MySQL连接已关闭")
 
 def test_connection():
-    """测试数据库连接"""
-    config = {
-        'host': 'localhost',
-        'user': 'root',
-        'password': 'your_password',
-        'database': 'sentiment_analysis',
-        'charset': 'utf8mb4'
-    }
-
-    try:
-        connection = mysql.connector.connect(**config)
-        if connection.is_connected():
-            cursor = connection.cursor()
-            cursor.execute("SELECT DATABASE();")
-            db_name = cursor.fetchone()[0]
-            logger.info(f"成功连接到数据库: {db_name}")
-            return True
-    except Error as e:
-        logger.error(f"连接测试失败: {e}")
-        return False
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    """测试数据库连接（经过连接池，并做一次健康检查）"""
+    return get_database().health_check()
 
 if __name__ == "__main__":
     print("开始设置数据库...")
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统计汇总：增量维护 statistics、hot_keywords、media_activity 三张汇总表，
+以及统计视图 v_corpus_statistics、v_sentiment_statistics 背后的物化汇总表 mv_corpus_monthly、mv_sentiment_monthly
+导入时记录受影响的发布日期，只重算这些日期（及其所在月份）的汇总行，
+查询条件都是 publish_date 上的等值或范围条件，可以使用 idx_publish_date 索引，
+同时带上 publish_year 条件，corpus按年分区后只扫描相关年份的分区（见partition_manager.py）。
+用法:
+    python statistics_aggregator.py --rebuild          全量重建（修复数据时使用）
+    python statistics_aggregator.py --dates 2024-10-25 2024-10-26
+    python statistics_aggregator.py --months 2024-10
+    python statistics_aggregator.py --refresh-views [2024-10 ...]   只刷新统计视图的汇总表（不指定月份时全量）
+"""
+
+import sys
+import argparse
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 每个日期/来源保留的热门关键词数
+HOT_KEYWORD_LIMIT = 100
+
+STATISTICS_COLUMNS = (
+    'stat_date', 'source', 'total_count', 'text_count', 'image_count', 'video_count',
+    'positive_count', 'neutral_count', 'negative_count', 'avg_sentiment'
+)
+MEDIA_ACTIVITY_COLUMNS = ('media_name', 'source', 'article_count', 'activity_score', 'stat_month')
+HOT_KEYWORD_COLUMNS = ('keyword', 'source', 'count', 'heat_score', 'stat_date')
+CORPUS_SUMMARY_COLUMNS = ('month', 'source', 'type', 'article_count')
+SENTIMENT_SUMMARY_COLUMNS = ('month', 'source', 'sentiment', 'article_count', 'score_sum', 'score_count')
+
+# 物化汇总表中没有发布日期的文章记在这个月份下
+UNDATED_MONTH = ''
+
+
+def to_date(value) -> date:
+    """MySQL返回date对象，SQLite返回ISO格式字符串，统一为date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def year_condition(days: List[date], alias: str = 'c') -> Tuple[str, List]:
+    """按年分区的裁剪条件：publish_year IN (...) AND publish_date IN (...)"""
+    years = sorted({day.year for day in days})
+    return (f"{alias}.publish_year IN ({', '.join(['%s'] * len(years))}) "
+            f"AND {alias}.publish_date IN ({', '.join(['%s'] * len(days))})", years + list(days))
+
+
+def month_range(month: str) -> Tuple[date, date]:
+    """'YYYY-MM' 转换为 [当月1日, 下月1日) 的日期范围"""
+    year, mon = (int(part) for part in month.split('-'))
+    start = date(year, mon, 1)
+    end = date(year + 1, 1, 1) if mon == 12 else date(year, mon + 1, 1)
+    return start, end
+
+
+class StatisticsAggregator:
+    def __init__(self, backend, conn, chunk_size: int = 200):
+        """
+        :param backend: 存储后端（见storage_backends）
+        :param conn: 数据库连接
+        :param chunk_size: 每次查询包含的日期数
+        """
+        self.backend = backend
+        self.conn = conn
+        self.chunk_size = chunk_size
+
+    def query(self, sql: str, params: Iterable = ()) -> List[Tuple]:
+        cursor = self.backend.cursor(self.conn)
+        try:
+            cursor.execute(sql, tuple(params))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def execute(self, sql: str, params: Iterable = (), many: bool = False):
+        cursor = self.backend.cursor(self.conn)
+        try:
+            if many:
+                cursor.executemany(sql, list(params))
+            else:
+                cursor.execute(sql, tuple(params))
+        finally:
+            cursor.close()
+
+    def ensure_summary_schema(self):
+        """创建统计视图使用的物化汇总表并把视图改为读取汇总表（旧库升级用，已存在时跳过）"""
+        if self.backend.name == 'sqlite':
+            self.backend.create_schema(self.conn)
+            return
+        if self.query("SELECT 1 FROM information_schema.TABLES "
+                      "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'mv_corpus_monthly' LIMIT 1"):
+            return
+
+        from setup_database import SUMMARY_TABLES, SUMMARY_VIEWS
+        logger.info("统计视图缺少物化汇总表，正在创建...")
+        for ddl in list(SUMMARY_TABLES.values()) + list(SUMMARY_VIEWS.values()):
+            self.execute(ddl)
+        self.conn.commit()
+
+    def summary_months(self) -> Set[str]:
+        """corpus中出现过的所有月份（含无发布日期的UNDATED_MONTH）"""
+        months = set()
+        for (publish_date,) in self.query("SELECT DISTINCT publish_date FROM corpus"):
+            months.add(to_date(publish_date).strftime('%Y-%m') if publish_date else UNDATED_MONTH)
+        return months
+
+    def summaries_missing(self) -> bool:
+        """物化汇总表为空而corpus有数据（刚升级的旧库），需要全量生成一次"""
+        return (not self.query("SELECT 1 FROM mv_corpus_monthly LIMIT 1")
+                and bool(self.query("SELECT 1 FROM corpus LIMIT 1")))
+
+    def refresh(self, dates: Iterable, months: Iterable[str] = ()) -> Dict[str, int]:
+        """
+        重算给定发布日期的统计和热门关键词，以及这些日期所在月份的媒体活跃度和视图汇总
+        :param dates: 受影响的发布日期（None表示无发布日期的文章，只影响视图汇总）
+        :param months: 另外需要重算的月份（YYYY-MM），用于月份内的文章已全部删除的情况
+        :return: 各汇总表写入的行数
+        """
+        dates = list(dates)
+        days = sorted({to_date(value) for value in dates if value})
+        summary_months = {day.strftime('%Y-%m') for day in days} | set(months)
+        if any(not value for value in dates):
+            summary_months.add(UNDATED_MONTH)
+
+        counts = {'statistics': 0, 'hot_keywords': 0, 'media_activity': 0, 'summaries': 0}
+        if self.summaries_missing():
+            logger.info("物化汇总表为空，将按corpus全量生成")
+            summary_months |= self.summary_months()
+        if not summary_months:
+            return counts
+
+        for start in range(0, len(days), self.chunk_size):
+            chunk = days[start:start + self.chunk_size]
+            counts['statistics'] += self.refresh_statistics(chunk)
+            counts['hot_keywords'] += self.refresh_hot_keywords(chunk)
+
+        for month in sorted(summary_months):
+            counts['summaries'] += self.refresh_summary_month(month)
+            if month != UNDATED_MONTH:
+                counts['media_activity'] += self.refresh_media_activity(month)
+
+        self.conn.commit()
+        logger.info(f"汇总表已更新：{len(days)} 个日期，statistics {counts['statistics']} 行，"
+                    f"hot_keywords {counts['hot_keywords']} 行，media_activity {counts['media_activity']} 行，"
+                    f"视图汇总 {len(summary_months)} 个月 {counts['summaries']} 行")
+        return counts
+
+    def refresh_statistics(self, days: List[date]) -> int:
+        """按日期和来源重算statistics，upsert新结果并删除已不存在的组合"""
+        placeholders = ', '.join(['%s'] * len(days))
+        condition, params = year_condition(days)
+        rows = self.query(f"""
+            SELECT c.publish_date, c.source, COUNT(*),
+                   SUM(CASE WHEN c.type = 'text' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN c.type = 'image' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN c.type = 'video' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN sa.sentiment = 'positive' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN sa.sentiment = 'neutral' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN sa.sentiment = 'negative' THEN 1 ELSE 0 END),
+                   AVG(sa.sentiment_score)
+            FROM corpus c
+            LEFT JOIN sentiment_analysis sa ON sa.corpus_id = c.id
+            WHERE {condition}
+            GROUP BY c.publish_date, c.source
+        """, params)
+
+        values = []
+        present = set()
+        for row in rows:
+            stat_date = to_date(row[0])
+            # avg_sentiment为DECIMAL(3,2)，满分10分的平均值需截到9.99
+            avg_score = min(round(float(row[9]), 2), 9.99) if row[9] is not None else None
+            values.append((stat_date, row[1]) + tuple(int(n or 0) for n in row[2:9]) + (avg_score,))
+            present.add((stat_date, row[1]))
+
+        self.execute(self.backend.upsert_sql('statistics', STATISTICS_COLUMNS, STATISTICS_COLUMNS[2:]), values, many=True)
+
+        # 某个日期/来源的文章全部被删除或改了日期时，删除对应的旧汇总行
+        existing = self.query(f"SELECT stat_date, source FROM statistics WHERE stat_date IN ({placeholders})", days)
+        stale = [(to_date(stat_date), source) for stat_date, source in existing if (to_date(stat_date), source) not in present]
+        if stale:
+            self.execute("DELETE FROM statistics WHERE stat_date = %s AND source = %s", stale, many=True)
+        return len(values)
+
+    def refresh_hot_keywords(self, days: List[date]) -> int:
+        """
+        按日期和来源重算热门关键词（来源于keywords表），另有source='all'的汇总
+        heat_score为当天该来源文章中提到该关键词的文章比例(%)
+        """
+        placeholders = ', '.join(['%s'] * len(days))
+        condition, params = year_condition(days)
+        totals = {}
+        for publish_date, source, total in self.query(
+                f"SELECT c.publish_date, c.source, COUNT(*) FROM corpus c WHERE {condition} "
+                "GROUP BY c.publish_date, c.source", params):
+            day = to_date(publish_date)
+            totals[(day, source)] = total
+            totals[(day, 'all')] = totals.get((day, 'all'), 0) + total
+
+        groups: Dict[Tuple[date, str], Dict[str, List[int]]] = {}
+        for publish_date, source, keyword, frequency, articles in self.query(f"""
+                SELECT c.publish_date, c.source, k.keyword, SUM(k.frequency), COUNT(DISTINCT k.corpus_id)
+                FROM keywords k
+                JOIN corpus c ON c.id = k.corpus_id
+                WHERE {condition}
+                GROUP BY c.publish_date, c.source, k.keyword
+                """, params):
+            day = to_date(publish_date)
+            for key in ((day, source), (day, 'all')):
+                stat = groups.setdefault(key, {}).setdefault(keyword, [0, 0])
+                stat[0] += int(frequency or 0)
+                stat[1] += int(articles)
+
+        values = []
+        for (day, source), keywords in groups.items():
+            top = sorted(keywords.items(), key=lambda item: (-item[1][0], item[0]))[:HOT_KEYWORD_LIMIT]
+            for keyword, (count, articles) in top:
+                heat_score = round(articles * 100.0 / totals[(day, source)], 2) if totals.get((day, source)) else 0
+                values.append((keyword, source, count, heat_score, day))
+
+        # 热门关键词按日期整体替换：只涉及受影响的日期
+        self.execute(f"DELETE FROM hot_keywords WHERE stat_date IN ({placeholders})", days)
+        if values:
+            self.execute(self.backend.upsert_sql('hot_keywords', HOT_KEYWORD_COLUMNS), values, many=True)
+        return len(values)
+
+    def refresh_media_activity(self, month: str) -> int:
+        """重算一个月的媒体活跃度，activity_score为当月日均报道数"""
+        start, end = month_range(month)
+        rows = self.query("""
+            SELECT media_name, source, COUNT(*)
+            FROM corpus
+            WHERE publish_year = %s AND publish_date >= %s AND publish_date < %s AND media_name IS NOT NULL
+            GROUP BY media_name, source
+        """, (start.year, start, end))
+
+        days_in_month = (end - start).days
+        values = [(media_name, source, count, round(count / days_in_month, 2), month)
+                  for media_name, source, count in rows]
+        self.execute(self.backend.upsert_sql('media_activity', MEDIA_ACTIVITY_COLUMNS, MEDIA_ACTIVITY_COLUMNS[1:4]),
+                     values, many=True)
+
+        present = {media_name for media_name, *_ in values}
+        stale = [(name, month) for (name,) in self.query(
+            "SELECT media_name FROM media_activity WHERE stat_month = %s", (month,)) if name not in present]
+        if stale:
+            self.execute("DELETE FROM media_activity WHERE media_name = %s AND stat_month = %s", stale, many=True)
+        return len(values)
+
+    def refresh_summary_month(self, month: str) -> int:
+        """
+        整月替换统计视图的物化汇总行
+        :param month: 'YYYY-MM'，UNDATED_MONTH表示没有发布日期的文章
+        :return: 写入的行数
+        """
+        if month == UNDATED_MONTH:
+            condition, params = "c.publish_year = 0 AND c.publish_date IS NULL", ()
+        else:
+            start, end = month_range(month)
+            condition, params = ("c.publish_year = %s AND c.publish_date >= %s AND c.publish_date < %s",
+                                 (start.year, start, end))
+
+        corpus_rows = [(month, source, content_type, count) for source, content_type, count in self.query(
+            f"SELECT c.source, c.type, COUNT(*) FROM corpus c WHERE {condition} GROUP BY c.source, c.type", params)]
+        sentiment_rows = [
+            (month, source, sentiment or '', count, float(score_sum) if score_sum is not None else None, score_count)
+            for source, sentiment, count, score_sum, score_count in self.query(f"""
+                SELECT c.source, sa.sentiment, COUNT(*), SUM(sa.sentiment_score), COUNT(sa.sentiment_score)
+                FROM corpus c
+                LEFT JOIN sentiment_analysis sa ON sa.corpus_id = c.id
+                WHERE {condition}
+                GROUP BY c.source, sa.sentiment
+                """, params)
+        ]
+
+        self.execute("DELETE FROM mv_corpus_monthly WHERE month = %s", (month,))
+        self.execute("DELETE FROM mv_sentiment_monthly WHERE month = %s", (month,))
+        if corpus_rows:
+            self.execute(self.backend.upsert_sql('mv_corpus_monthly', CORPUS_SUMMARY_COLUMNS), corpus_rows, many=True)
+        if sentiment_rows:
+            self.execute(self.backend.upsert_sql('mv_sentiment_monthly', SENTIMENT_SUMMARY_COLUMNS),
+                         sentiment_rows, many=True)
+        return len(corpus_rows) + len(sentiment_rows)
+
+    def refresh_views(self, months: Optional[Iterable[str]] = None) -> int:
+        """
+        只刷新统计视图的物化汇总表
+        :param months: 需要重算的月份，None表示清空后全量重建
+        :return: 写入的行数
+        """
+        if months is None:
+            for table in ('mv_corpus_monthly', 'mv_sentiment_monthly'):
+                self.execute(f"DELETE FROM {table}")
+            months = self.summary_months()
+        months = sorted(set(months))
+        count = sum(self.refresh_summary_month(month) for month in months)
+        self.conn.commit()
+        logger.info(f"统计视图汇总已刷新：{len(months)} 个月，{count} 行")
+        return count
+
+    def rebuild(self) -> Dict[str, int]:
+        """全量重建所有汇总表"""
+        logger.info("开始全量重建汇总表")
+        for table in ('statistics', 'hot_keywords', 'media_activity', 'mv_corpus_monthly', 'mv_sentiment_monthly'):
+            self.execute(f"DELETE FROM {table}")
+        days = [row[0] for row in self.query("SELECT DISTINCT publish_date FROM corpus")]
+        return self.refresh(days)
+
+    def refresh_months(self, months: Iterable[str]) -> Dict[str, int]:
+        """重算给定月份内所有发布日期的汇总"""
+        months = list(months)
+        days: Set[date] = set()
+        for month in months:
+            start, end = month_range(month)
+            days.update(row[0] for row in self.query(
+                "SELECT DISTINCT publish_date FROM corpus WHERE publish_date >= %s AND publish_date < %s", (start, end)))
+        return self.refresh(days, months)
+
+
+def main():
+    from storage_backends import create_backend
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='维护statistics、hot_keywords、media_activity及统计视图的汇总表')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--rebuild', action='store_true', help='清空并全量重建汇总表')
+    group.add_argument('--dates', nargs='+', help='重算指定发布日期（YYYY-MM-DD）')
+    group.add_argument('--months', nargs='+', help='重算指定月份（YYYY-MM）')
+    group.add_argument('--refresh-views', nargs='*', metavar='MONTH',
+                       help='只刷新统计视图的物化汇总表，可指定月份（YYYY-MM），不指定时全量重建')
+    parser.add_argument('--backend', choices=('mysql', 'sqlite'), default='mysql', help='存储后端（默认mysql）')
+    parser.add_argument('--sqlite-path', default='corpus.db', help='sqlite数据库文件（默认corpus.db）')
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend, sqlite_path=args.sqlite_path)
+    conn = backend.connect()
+    try:
+        aggregator = StatisticsAggregator(backend, conn)
+        aggregator.ensure_summary_schema()
+        if args.refresh_views is not None:
+            aggregator.refresh_views(args.refresh_views or None)
+        elif args.rebuild:
+            aggregator.rebuild()
+        elif args.dates:
+            aggregator.refresh(args.dates)
+        else:
+            aggregator.refresh_months(args.months)
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"汇总表更新失败: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
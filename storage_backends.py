@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储后端：DataProcessor通过这里访问数据库
+- MySQLBackend：经db_access连接池访问MySQL，表结构见init.sql
+- SQLiteBackend：嵌入式SQLite，表结构与init.sql对应，标题/正文全文索引用FTS5，
+  不需要数据库服务器，适合单机部署、测试和性能对比
+SQL统一使用%s占位符，SQLite后端的游标会转换为?
+"""
+
+import os
+import sqlite3
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from mysql.connector import Error as MySQLError
+    DB_ERRORS: Tuple[type, ...] = (MySQLError, sqlite3.Error)
+except ImportError:
+    MySQLError = None
+    DB_ERRORS = (sqlite3.Error,)
+
+# 各表upsert使用的唯一键（与init.sql中的UNIQUE KEY一致）
+UNIQUE_KEYS = {
+    'corpus': 'url_hash',
+    'sentiment_analysis': 'corpus_id',
+    'statistics': 'stat_date, source',
+    'media_activity': 'media_name, stat_month',
+}
+
+# SQLite不支持datetime.date的默认转换（Python 3.12起已弃用），显式存为ISO格式文本
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' '))
+
+# 与init.sql对应的SQLite表结构：ENUM改为CHECK约束，DECIMAL改为REAL，
+# ON UPDATE CURRENT_TIMESTAMP用触发器实现，FULLTEXT索引改为FTS5外部内容表
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS corpus (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    content TEXT,
+    source TEXT NOT NULL CHECK (source IN ('china', 'usa', 'russia')),
+    media_name TEXT,
+    type TEXT NOT NULL CHECK (type IN ('text', 'image', 'video')),
+    file_path TEXT,
+    url TEXT,
+    url_hash TEXT UNIQUE,
+    content_hash TEXT,
+    image_url TEXT,
+    video_url TEXT,
+    publish_date TEXT,
+    publish_year INTEGER NOT NULL DEFAULT 0,
+    create_time TEXT DEFAULT CURRENT_TIMESTAMP,
+    update_time TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_corpus_source ON corpus (source);
+CREATE INDEX IF NOT EXISTS idx_corpus_type ON corpus (type);
+CREATE INDEX IF NOT EXISTS idx_corpus_publish_date ON corpus (publish_date);
+CREATE INDEX IF NOT EXISTS idx_corpus_title ON corpus (title);
+
+CREATE TRIGGER IF NOT EXISTS trg_corpus_update_time AFTER UPDATE ON corpus
+WHEN NEW.update_time = OLD.update_time
+BEGIN
+    UPDATE corpus SET update_time = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS sentiment_analysis (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    corpus_id INTEGER UNIQUE REFERENCES corpus(id) ON DELETE CASCADE,
+    publish_year INTEGER NOT NULL DEFAULT 0,
+    sentiment TEXT NOT NULL CHECK (sentiment IN ('positive', 'neutral', 'negative')),
+    sentiment_score REAL,
+    confidence REAL,
+    positive_rate REAL,
+    negative_rate REAL,
+    neutral_rate REAL,
+    emotion_joy REAL,
+    emotion_trust REAL,
+    emotion_fear REAL,
+    emotion_surprise REAL,
+    analysis_time TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_sentiment_sentiment ON sentiment_analysis (sentiment);
+
+CREATE TABLE IF NOT EXISTS keywords (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    corpus_id INTEGER NOT NULL REFERENCES corpus(id) ON DELETE CASCADE,
+    keyword TEXT NOT NULL,
+    weight REAL,
+    frequency INTEGER DEFAULT 1,
+    create_time TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_keywords_corpus_id ON keywords (corpus_id);
+CREATE INDEX IF NOT EXISTS idx_keywords_keyword ON keywords (keyword);
+
+CREATE TABLE IF NOT EXISTS polish_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    original_text TEXT NOT NULL,
+    polished_text TEXT,
+    polish_type TEXT,
+    fluency_score INTEGER,
+    professionalism_score INTEGER,
+    objectivity_score INTEGER,
+    readability_score INTEGER,
+    suggestions TEXT,
+    create_time TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_polish_records_create_time ON polish_records (create_time);
+
+CREATE TABLE IF NOT EXISTS statistics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stat_date TEXT NOT NULL,
+    source TEXT NOT NULL CHECK (source IN ('china', 'usa', 'russia')),
+    total_count INTEGER DEFAULT 0,
+    text_count INTEGER DEFAULT 0,
+    image_count INTEGER DEFAULT 0,
+    video_count INTEGER DEFAULT 0,
+    positive_count INTEGER DEFAULT 0,
+    neutral_count INTEGER DEFAULT 0,
+    negative_count INTEGER DEFAULT 0,
+    avg_sentiment REAL,
+    create_time TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (stat_date, source)
+);
+
+CREATE TABLE IF NOT EXISTS hot_keywords (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    keyword TEXT NOT NULL,
+    source TEXT DEFAULT 'all' CHECK (source IN ('china', 'usa', 'russia', 'all')),
+    count INTEGER DEFAULT 1,
+    heat_score REAL,
+    stat_date TEXT NOT NULL,
+    create_time TEXT DEFAULT CURRENT_TIMESTAMP,
+    update_time TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_hot_keywords_keyword ON hot_keywords (keyword);
+CREATE INDEX IF NOT EXISTS idx_hot_keywords_stat_date ON hot_keywords (stat_date);
+CREATE INDEX IF NOT EXISTS idx_hot_keywords_heat_score ON hot_keywords (heat_score DESC);
+
+CREATE TABLE IF NOT EXISTS media_activity (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    media_name TEXT NOT NULL,
+    source TEXT NOT NULL CHECK (source IN ('china', 'usa', 'russia')),
+    article_count INTEGER DEFAULT 0,
+    activity_score REAL,
+    stat_month TEXT NOT NULL,
+    create_time TEXT DEFAULT CURRENT_TIMESTAMP,
+    update_time TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (media_name, stat_month)
+);
+CREATE INDEX IF NOT EXISTS idx_media_activity_stat_month ON media_activity (stat_month);
+
+CREATE TABLE IF NOT EXISTS operation_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    operation_type TEXT NOT NULL,
+    operation_desc TEXT,
+    request_params TEXT,
+    response_result TEXT,
+    ip_address TEXT,
+    create_time TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_operation_logs_type ON operation_logs (operation_type);
+CREATE INDEX IF NOT EXISTS idx_operation_logs_create_time ON operation_logs (create_time);
+
+-- 统计视图读取的物化汇总表，由statistics_aggregator.py按月增量刷新
+CREATE TABLE IF NOT EXISTS mv_corpus_monthly (
+    month TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL CHECK (source IN ('china', 'usa', 'russia')),
+    type TEXT NOT NULL CHECK (type IN ('text', 'image', 'video')),
+    article_count INTEGER NOT NULL DEFAULT 0,
+    refresh_time TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (month, source, type)
+);
+
+CREATE TABLE IF NOT EXISTS mv_sentiment_monthly (
+    month TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL CHECK (source IN ('china', 'usa', 'russia')),
+    sentiment TEXT NOT NULL DEFAULT '',
+    article_count INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL,
+    score_count INTEGER NOT NULL DEFAULT 0,
+    refresh_time TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (month, source, sentiment)
+);
+
+-- 视图每次都重建，旧库中直接扫描corpus的视图定义会被替换
+DROP VIEW IF EXISTS v_corpus_statistics;
+CREATE VIEW v_corpus_statistics AS
+SELECT
+    source,
+    type,
+    article_count as count,
+    NULLIF(month, '') as month
+FROM mv_corpus_monthly;
+
+DROP VIEW IF EXISTS v_sentiment_statistics;
+CREATE VIEW v_sentiment_statistics AS
+SELECT
+    source,
+    NULLIF(sentiment, '') as sentiment,
+    SUM(article_count) as count,
+    SUM(score_sum) / NULLIF(SUM(score_count), 0) as avg_score
+FROM mv_sentiment_monthly
+GROUP BY source, sentiment;
+"""
+
+# 旧库缺少的列：(表, 列, 列定义, 回填语句)
+SQLITE_MIGRATIONS = (
+    ('corpus', 'publish_year', "INTEGER NOT NULL DEFAULT 0",
+     "UPDATE corpus SET publish_year = CAST(strftime('%Y', publish_date) AS INTEGER) WHERE publish_date IS NOT NULL"),
+    ('sentiment_analysis', 'publish_year', "INTEGER NOT NULL DEFAULT 0",
+     "UPDATE sentiment_analysis SET publish_year = "
+     "(SELECT publish_year FROM corpus WHERE corpus.id = sentiment_analysis.corpus_id)"),
+)
+
+# 全文索引：外部内容FTS5表，由触发器与corpus表保持同步
+# trigram分词可匹配任意3个字符以上的中英文片段，对应MySQL的ngram全文索引
+SQLITE_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS corpus_fts USING fts5(
+    title, content, content='corpus', content_rowid='id', tokenize='{tokenizer}'
+);
+CREATE TRIGGER IF NOT EXISTS trg_corpus_fts_insert AFTER INSERT ON corpus BEGIN
+    INSERT INTO corpus_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_corpus_fts_delete AFTER DELETE ON corpus BEGIN
+    INSERT INTO corpus_fts (corpus_fts, rowid, title, content) VALUES ('delete', OLD.id, OLD.title, OLD.content);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_corpus_fts_update AFTER UPDATE OF title, content ON corpus BEGIN
+    INSERT INTO corpus_fts (corpus_fts, rowid, title, content) VALUES ('delete', OLD.id, OLD.title, OLD.content);
+    INSERT INTO corpus_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);
+END;
+"""
+
+
+class SQLiteCursor:
+    """包装sqlite3游标，把%s占位符转换为?，其余接口与DB-API游标相同"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, params=()):
+        return self._cursor.execute(query.replace('%s', '?'), tuple(params or ()))
+
+    def executemany(self, query: str, rows):
+        return self._cursor.executemany(query.replace('%s', '?'), rows)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class MySQLBackend:
+    name = 'mysql'
+    supports_load_data = True
+    # 导入清单文件名（清单记录的是“已导入到哪个库”，不同后端分开保存）
+    import_manifest_name = 'import_manifest.json'
+
+    def __init__(self, config: Optional[Dict] = None, pool_size: int = 5, pool_name: str = 'opinion'):
+        """
+        :param config: 连接配置，默认由db_access.load_db_config()读取
+        """
+        from db_access import Database
+
+        self.db = Database(config, pool_size=pool_size, pool_name=pool_name)
+
+    @property
+    def database(self) -> str:
+        return self.db.database
+
+    def enable_local_infile(self):
+        """LOAD DATA LOCAL INFILE需要客户端显式允许，换用打开了该选项的独立连接池"""
+        from db_access import Database
+
+        self.db = Database(dict(self.db.config, allow_local_infile=True), pool_size=1, pool_name='opinion_bulk')
+
+    def connect(self):
+        """从连接池取连接，close()即归还"""
+        return self.db.get_connection()
+
+    def cursor(self, conn, prepared: bool = False):
+        return conn.cursor(prepared=prepared)
+
+    def upsert_sql(self, table: str, columns: Tuple[str, ...], update_columns: Tuple[str, ...] = ()) -> str:
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        if update_columns:
+            query += " ON DUPLICATE KEY UPDATE " + ", ".join(f"{col} = VALUES({col})" for col in update_columns)
+        return query
+
+    def fulltext_search(self, conn, keywords: str, limit: int = 20) -> List[Tuple]:
+        """
+        在标题和正文中全文检索，返回(id, title)列表
+        分区后的corpus表不支持FULLTEXT索引（见partition_manager.py），此时退回LIKE
+        """
+        cursor = conn.cursor()
+        try:
+            try:
+                cursor.execute(
+                    "SELECT id, title FROM corpus WHERE MATCH(title, content) AGAINST (%s IN BOOLEAN MODE) LIMIT %s",
+                    (keywords, limit)
+                )
+            except MySQLError as e:
+                # 1191: Can't find FULLTEXT index matching the column list
+                if getattr(e, 'errno', None) != 1191:
+                    raise
+                pattern = f"%{keywords}%"
+                cursor.execute("SELECT id, title FROM corpus WHERE title LIKE %s OR content LIKE %s LIMIT %s",
+                               (pattern, pattern, limit))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+class SQLiteBackend:
+    name = 'sqlite'
+    supports_load_data = False
+
+    def __init__(self, path: str = 'corpus.db'):
+        """
+        :param path: 数据库文件路径，':memory:'为内存数据库
+        """
+        self.path = path
+        self.fts_tokenizer = 'trigram'
+        # 内存数据库每次都是空库，不使用导入清单
+        stem = os.path.splitext(os.path.basename(path))[0]
+        self.import_manifest_name = None if path == ':memory:' else f'import_manifest_{stem}.json'
+
+    @property
+    def database(self) -> str:
+        return self.path
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        打开数据库连接
+        写入线程与主线程先后使用同一连接（不会并发），因此关闭同线程检查
+        """
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        if self.path != ':memory:':
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def cursor(self, conn: sqlite3.Connection, prepared: bool = False) -> SQLiteCursor:
+        # sqlite3模块自带语句缓存，prepared参数只为与MySQL后端接口一致
+        return SQLiteCursor(conn.cursor())
+
+    def create_schema(self, conn: sqlite3.Connection):
+        """创建与init.sql对应的表、索引、视图和FTS5全文索引（已存在时跳过）"""
+        conn.executescript(SQLITE_SCHEMA)
+        for table, column, definition, backfill in SQLITE_MIGRATIONS:
+            if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                logger.info(f"{table}表缺少{column}列，正在升级表结构...")
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                conn.execute(backfill)
+        try:
+            conn.executescript(SQLITE_FTS_SCHEMA.format(tokenizer=self.fts_tokenizer))
+        except sqlite3.OperationalError as e:
+            # SQLite 3.34之前没有trigram分词器
+            logger.warning(f"FTS5 trigram分词不可用（{e}），改用unicode61分词")
+            self.fts_tokenizer = 'unicode61'
+            conn.executescript(SQLITE_FTS_SCHEMA.format(tokenizer=self.fts_tokenizer))
+        conn.commit()
+
+    def upsert_sql(self, table: str, columns: Tuple[str, ...], update_columns: Tuple[str, ...] = ()) -> str:
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        if update_columns:
+            query += (f" ON CONFLICT ({UNIQUE_KEYS[table]}) DO UPDATE SET "
+                      + ", ".join(f"{col} = excluded.{col}" for col in update_columns))
+        return query
+
+    def fulltext_search(self, conn: sqlite3.Connection, keywords: str, limit: int = 20) -> List[Tuple]:
+        """在标题和正文中全文检索，返回(id, title)列表，按相关度排序"""
+        if self.fts_tokenizer == 'trigram' and len(keywords) < 3:
+            # trigram索引无法匹配少于3个字符的词，退回LIKE
+            pattern = f"%{keywords}%"
+            return conn.execute(
+                "SELECT id, title FROM corpus WHERE title LIKE ? OR content LIKE ? LIMIT ?",
+                (pattern, pattern, limit)
+            ).fetchall()
+        phrase = '"' + keywords.replace('"', '""') + '"'
+        return conn.execute(
+            "SELECT c.id, c.title FROM corpus_fts JOIN corpus c ON c.id = corpus_fts.rowid "
+            "WHERE corpus_fts MATCH ? ORDER BY corpus_fts.rank LIMIT ?",
+            (phrase, limit)
+        ).fetchall()
+
+
+def create_backend(name: str = 'mysql', db_config: Optional[Dict] = None, sqlite_path: str = 'corpus.db'):
+    """
+    按名称创建存储后端
+    :param name: 'mysql' 或 'sqlite'
+    """
+    if name == 'sqlite':
+        return SQLiteBackend(sqlite_path)
+    if name == 'mysql':
+        return MySQLBackend(db_config)
+    raise ValueError(f"未知的存储后端: {name}")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储布局：texts/、images/、videos/ 的分片目录结构和路径解析
+每篇文章以URL的哈希作为稳定ID，文件保存在 <目录>/<ID前2位>/<ID第3-4位>/ 下，
+storage_manifest.jsonl 记录ID与标题、网址、文件和内容指纹的对应关系，
+crawler_changes.jsonl 记录每次爬取的变更（新增/修改/未变）和文章的删除，供下游增量处理。
+旧版按标题平铺的文件仍然可以被解析，可用 migrate_storage.py 迁移。
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+ID_LENGTH = 16
+
+# 以文章ID开头的文件名，例如 3f2a9c0d1e4b5a67_1.jpeg
+_ID_PREFIX = re.compile(r'^([0-9a-f]{%d})(?=[_.]|$)' % ID_LENGTH)
+
+
+def make_article_id(url: str) -> str:
+    """根据URL生成稳定的文章ID"""
+    return hashlib.sha1(url.strip().encode('utf-8')).hexdigest()[:ID_LENGTH]
+
+
+def make_safe_title(title: str) -> str:
+    """清理文件名中的不合法字符（旧版平铺布局的命名规则）"""
+    return re.sub(r'[\\/*?:"<>|]', "", title)
+
+
+def split_article_id(file_name: str) -> Optional[str]:
+    """从分片布局的文件名中取出文章ID，旧版文件名返回None"""
+    match = _ID_PREFIX.match(file_name)
+    return match.group(1) if match else None
+
+
+class StorageLayout:
+    def __init__(self, base_dir: str = '.', manifest_file: str = 'storage_manifest.jsonl',
+                 change_feed_file: str = 'crawler_changes.jsonl', load_manifest: bool = True):
+        """
+        初始化存储布局
+        :param base_dir: texts/images/videos 所在的根目录
+        :param manifest_file: 清单文件名（相对于base_dir）
+        :param change_feed_file: 变更记录文件名（相对于base_dir）
+        :param load_manifest: 只需要解析路径时可以不加载清单
+        """
+        self.base_dir = base_dir
+        self.folders = {
+            'text': os.path.normpath(os.path.join(base_dir, 'texts')),
+            'image': os.path.normpath(os.path.join(base_dir, 'images')),
+            'video': os.path.normpath(os.path.join(base_dir, 'videos')),
+        }
+        self.manifest_path = os.path.normpath(os.path.join(base_dir, manifest_file))
+        self.change_feed_path = os.path.normpath(os.path.join(base_dir, change_feed_file))
+        self.articles = self.load_manifest() if load_manifest else {}
+
+    def ensure_dirs(self):
+        """创建顶层目录"""
+        for folder in self.folders.values():
+            os.makedirs(folder, exist_ok=True)
+
+    def load_manifest(self) -> Dict[str, Dict]:
+        """
+        加载清单，清单为追加写入的JSON行，同一ID以最后一条为准，最后一条是删除标记的文章不再出现
+        :return: 文章ID到清单记录的字典
+        """
+        articles = {}
+        if not os.path.exists(self.manifest_path):
+            return articles
+
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    if entry.get('deleted'):
+                        articles.pop(entry['id'], None)
+                    else:
+                        articles[entry['id']] = entry
+                except (ValueError, KeyError):
+                    logging.warning(f"清单第{line_no}行无法解析，已跳过")
+        return articles
+
+    def register_article(self, article_id: str, title: str, url: str, **fields) -> Dict:
+        """
+        记录（或更新）一篇文章的清单信息
+        :param fields: 其他字段，例如 text_file、images、videos
+        :return: 合并后的清单记录
+        """
+        entry = dict(self.articles.get(article_id, {}))
+        entry.update(fields)
+        entry.update({
+            'id': article_id,
+            'title': title,
+            'url': url,
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        })
+        self.articles[article_id] = entry
+
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
+
+    def remove_article(self, article_id: str) -> Optional[Dict]:
+        """
+        从清单中删除一篇文章：追加一条删除标记，compact_manifest时一并去掉
+        :return: 被删除的清单记录，清单中没有时返回None
+        """
+        entry = self.articles.pop(article_id, None)
+        if entry is None:
+            return None
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'id': article_id,
+                'deleted': True,
+                'updated': datetime.now().isoformat(timespec='seconds'),
+            }) + '\n')
+        return entry
+
+    def compact_manifest(self):
+        """重写清单，去掉被覆盖的历史记录"""
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.articles.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.manifest_path)
+
+    def get_article(self, article_id: str) -> Optional[Dict]:
+        return self.articles.get(article_id)
+
+    def append_change(self, article_id: str, url: str, status: str, **fields):
+        """
+        追加一条变更记录
+        :param status: 'added'、'modified'、'unchanged' 或 'deleted'
+        """
+        record = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'id': article_id,
+            'url': url,
+            'status': status,
+        }
+        record.update(fields)
+        with open(self.change_feed_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def iter_changes(self, since: Optional[str] = None, statuses=('added', 'modified')) -> Iterator[Dict]:
+        """
+        读取变更记录
+        :param since: 只返回该时间（ISO格式）之后的记录
+        :param statuses: 需要的变更类型
+        """
+        if not os.path.exists(self.change_feed_path):
+            return
+        with open(self.change_feed_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since and record.get('time', '') <= since:
+                    continue
+                if statuses and record.get('status') not in statuses:
+                    continue
+                yield record
+
+    def shard_dir(self, kind: str, article_id: str) -> str:
+        """文章ID对应的分片目录"""
+        return os.path.join(self.folders[kind], article_id[:2], article_id[2:4])
+
+    def text_path(self, article_id: str, ext: str = '.txt') -> str:
+        """文章文本文件路径"""
+        return os.path.join(self.shard_dir('text', article_id), article_id + ext)
+
+    @staticmethod
+    def media_file_name(article_id: str, index, ext: str) -> str:
+        """
+        图片/视频文件名
+        :param index: 序号，背景图片可传入 'bg_3' 这样的字符串
+        """
+        return f"{article_id}_{index}.{ext}"
+
+    def media_path(self, kind: str, file_name: str) -> str:
+        """
+        根据文件名解析图片或视频的路径，兼容旧版平铺布局
+        :param kind: 'image' 或 'video'
+        """
+        article_id = split_article_id(file_name)
+        if article_id:
+            return os.path.join(self.shard_dir(kind, article_id), file_name)
+        return os.path.join(self.folders[kind], file_name)
+
+    def prepare_path(self, path: str) -> str:
+        """确保文件所在目录存在"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def write_if_changed(self, path: str, data: bytes) -> bool:
+        """
+        内容与已有文件不同时才写入
+        :return: 是否写入了文件
+        """
+        try:
+            if os.path.getsize(path) == len(data):
+                with open(path, 'rb') as f:
+                    if f.read() == data:
+                        return False
+        except OSError:
+            pass
+
+        with open(self.prepare_path(path), 'wb') as f:
+            f.write(data)
+        return True
+
+    def title_for_text_path(self, path: str) -> str:
+        """根据文本文件路径取文章标题，清单中没有时退回文件名"""
+        stem = os.path.splitext(os.path.basename(path))[0]
+        entry = self.articles.get(stem) if split_article_id(stem) == stem else None
+        return entry['title'] if entry else stem
+
+    def iter_text_files(self) -> Iterator[str]:
+        """
+        遍历所有文本文件，包括旧版平铺文件和分片目录中的文件
+        :return: 按路径排序的文本文件路径
+        """
+        text_folder = self.folders['text']
+        if not os.path.isdir(text_folder):
+            return
+
+        flat_files: List[str] = []
+        shard_dirs: List[str] = []
+        with os.scandir(text_folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.txt'):
+                    flat_files.append(entry.path)
+                elif entry.is_dir() and len(entry.name) == 2:
+                    shard_dirs.append(entry.path)
+
+        yield from sorted(flat_files)
+
+        for shard in sorted(shard_dirs):
+            for sub in sorted(os.listdir(shard)):
+                sub_path = os.path.join(shard, sub)
+                if not os.path.isdir(sub_path):
+                    continue
+                for name in sorted(os.listdir(sub_path)):
+                    if name.endswith('.txt'):
+                        yield os.path.join(sub_path, name)
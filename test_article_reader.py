@@ -0,0 +1,55 @@
+"""
+文本文件解析：爬虫写入的格式，以及手工编辑时常见的全角冒号
+"""
+
+from article_reader import parse_article_text
+
+ASCII_TEXT = """标题: Belt and Road forum opens
+网址: https://www.chinadaily.com.cn/a/202206/06/WS629d.html
+
+The forum opened on Monday.
+Delegates from 100 countries attended.
+
+Specials
+Some site links
+
+图片列表:
+1. 3f2a9c0d1e4b5a67_1.jpeg - 尺寸: 600x303
+2. 3f2a9c0d1e4b5a67_2.png
+
+视频列表:
+1. 3f2a9c0d1e4b5a67_1.mp4
+"""
+
+FULL_WIDTH_TEXT = """标题：一带一路论坛开幕
+网址：https://example.com/news/item.html
+日期：2024年10月25日
+
+论坛于周一开幕。
+
+图片列表：
+1. 3f2a9c0d1e4b5a67_1.jpeg - 尺寸: 800x600
+"""
+
+
+def test_ascii_colon_file():
+    article = parse_article_text(ASCII_TEXT)
+    assert article['title'] == 'Belt and Road forum opens'
+    assert article['url'] == 'https://www.chinadaily.com.cn/a/202206/06/WS629d.html'
+    assert article['body'] == 'The forum opened on Monday.\nDelegates from 100 countries attended.'
+    assert (article['publish_date'], article['date_source']) == ('2022-06-06', 'url')
+    assert article['images'] == [
+        {'file_name': '3f2a9c0d1e4b5a67_1.jpeg', 'width': 600, 'height': 303},
+        {'file_name': '3f2a9c0d1e4b5a67_2.png', 'width': None, 'height': None},
+    ]
+    assert article['videos'] == [{'file_name': '3f2a9c0d1e4b5a67_1.mp4'}]
+
+
+def test_full_width_colon_file():
+    article = parse_article_text(FULL_WIDTH_TEXT)
+    assert article['title'] == '一带一路论坛开幕'
+    assert article['url'] == 'https://example.com/news/item.html'
+    assert article['body'] == '论坛于周一开幕。'
+    assert (article['publish_date'], article['date_source']) == ('2024-10-25', 'header')
+    assert article['images'] == [{'file_name': '3f2a9c0d1e4b5a67_1.jpeg', 'width': 800, 'height': 600}]
+    assert article['videos'] == []
@@ -0,0 +1,113 @@
+"""
+DataProcessor的写入路径，用嵌入式SQLite后端测试，不需要MySQL
+"""
+
+import os
+
+import pytest
+
+from storage_backends import SQLiteBackend
+from data_processor_fixed import CORPUS_COLUMNS, CORPUS_UPDATE_COLUMNS, DataProcessor, parse_text_file
+
+
+def write_article(texts_dir, name, title, url, body):
+    os.makedirs(texts_dir, exist_ok=True)
+    path = os.path.join(texts_dir, f'{name}.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"标题: {title}\n网址: {url}\n\n{body}\n")
+    return path
+
+
+def write_articles(texts_dir, count):
+    return [
+        write_article(texts_dir, f'article{i}', f'Article {i}', f'https://www.chinadaily.com.cn/a/202410/{i + 1:02d}/WS{i}.html',
+                      f'Body of article {i}.')
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def processor(tmp_path):
+    processor = DataProcessor(batch_size=4, backend=SQLiteBackend(str(tmp_path / 'corpus.db')))
+    processor.connect_db()
+    processor.ensure_schema()
+    yield processor
+    processor.disconnect_db()
+
+
+def corpus_count(processor):
+    processor.cursor.execute("SELECT COUNT(*) FROM corpus")
+    return processor.cursor.fetchone()[0]
+
+
+def test_insert_rows_bisects_failing_batch(processor, tmp_path):
+    paths = write_articles(str(tmp_path / 'texts'), 8)
+    rows = [tuple(parse_text_file(path, str(tmp_path))[col] for col in CORPUS_COLUMNS) for path in paths]
+    # source违反CHECK约束，整批executemany失败后二分定位到这一行
+    source_index = CORPUS_COLUMNS.index('source')
+    rows[5] = rows[5][:source_index] + ('mars',) + rows[5][source_index + 1:]
+
+    failed = []
+    written = processor.insert_rows('corpus', CORPUS_COLUMNS, rows, CORPUS_UPDATE_COLUMNS, failed)
+    assert written == 7
+    assert failed == [rows[5]]
+    assert corpus_count(processor) == 7
+
+
+def test_bulk_load_fallback_tracks_failed_rows(processor, tmp_path):
+    paths = write_articles(str(tmp_path / 'texts'), 6)
+    records = [parse_text_file(path, str(tmp_path)) for path in paths]
+    # 库中已有第一篇的旧版本
+    processor.insert_corpus_batch([dict(records[0], content='Old body.', content_hash='old')])
+    records[3]['source'] = 'mars'
+
+    # SQLite不支持LOAD DATA，退回批量INSERT
+    failed_paths = set()
+    loaded = processor.bulk_load_corpus(iter(records), failed_paths)
+    assert loaded == 5
+    assert failed_paths == {paths[3]}
+    assert corpus_count(processor) == 5
+    processor.cursor.execute("SELECT content, content_hash FROM corpus WHERE url_hash = %s", (records[0]['url_hash'],))
+    assert processor.cursor.fetchone() == (records[0]['content'], records[0]['content_hash'])
+
+
+def test_find_stale_and_missing_rows(processor, tmp_path):
+    paths = write_articles(str(tmp_path / 'texts'), 4)
+    records = [parse_text_file(path, str(tmp_path)) for path in paths]
+    processor.insert_corpus_batch(records[:3])
+
+    content_hashes = {record['url_hash']: (record['file_path'], record['content_hash']) for record in records}
+    content_hashes[records[1]['url_hash']] = (paths[1], 'changed')
+    missing = []
+    assert processor.find_stale_rows(content_hashes, missing) == [paths[1]]
+    assert missing == [paths[3]]
+
+
+def test_reimport_skips_unchanged_files(processor, tmp_path):
+    texts_dir = str(tmp_path / 'texts')
+    paths = write_articles(texts_dir, 5)
+    processor.process_text_files(texts_dir)
+    assert corpus_count(processor) == 5
+    assert os.path.exists(tmp_path / 'import_manifest_corpus.json')
+    processor.cursor.execute("SELECT id, url_hash FROM corpus")
+    ids = dict((url_hash, corpus_id) for corpus_id, url_hash in processor.cursor.fetchall())
+
+    # 第二次导入：清单中的大小和修改时间都没变，不写数据库
+    changes = processor.conn.total_changes
+    processor.process_text_files(texts_dir)
+    assert processor.conn.total_changes == changes
+
+    # 只改修改时间：内容哈希相同，仍然不写数据库
+    stat = os.stat(paths[0])
+    os.utime(paths[0], (stat.st_atime, stat.st_mtime + 10))
+    processor.process_text_files(texts_dir)
+    assert processor.conn.total_changes == changes
+    assert processor.load_import_manifest()[paths[0]]['mtime'] == stat.st_mtime + 10
+
+    # 内容变化的文件按url_hash更新原来的行，不产生重复行
+    write_article(texts_dir, 'article2', 'Article 2', 'https://www.chinadaily.com.cn/a/202410/03/WS2.html', 'New body.')
+    processor.process_text_files(texts_dir)
+    assert corpus_count(processor) == 5
+    record = parse_text_file(paths[2], str(tmp_path))
+    processor.cursor.execute("SELECT id, content FROM corpus WHERE url_hash = %s", (record['url_hash'],))
+    assert processor.cursor.fetchone() == (ids[record['url_hash']], 'New body.')
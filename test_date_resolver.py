@@ -0,0 +1,20 @@
+"""
+从China Daily的两种网址格式中解析发布日期
+"""
+
+from date_resolver import date_from_url
+
+
+def test_compact_month_url():
+    assert date_from_url('https://www.chinadaily.com.cn/a/202206/06/WS629d5f2ba310fd2b29e60f6a.html') == '2022-06-06'
+
+
+def test_dashed_month_url():
+    assert date_from_url('http://www.chinadaily.com.cn/cndy/2017-04/05/content_28797640.htm') == '2017-04-05'
+
+
+def test_url_without_date():
+    assert date_from_url('https://www.chinadaily.com.cn/opinion/') is None
+    assert date_from_url(None) is None
+    # 不存在的日期不当作发布日期
+    assert date_from_url('https://www.chinadaily.com.cn/a/202213/45/WS1.html') is None
@@ -0,0 +1,103 @@
+"""
+批量导入时删除、重建索引的标记文件恢复流程
+用记录索引状态的假连接代替MySQL，只检查标记文件和执行的DDL
+"""
+
+import re
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+from mysql.connector import Error
+
+from index_manager import DeferredIndexes
+from setup_database import DEFERRABLE_INDEXES
+
+
+class FakeServer:
+    """按表记录现有索引名，解析DeferredIndexes执行的ALTER TABLE"""
+
+    def __init__(self):
+        self.indexes = {table: {name for name, _ in indexes} for table, indexes in DEFERRABLE_INDEXES.items()}
+        self.names = {definition: name for indexes in DEFERRABLE_INDEXES.values() for name, definition in indexes}
+        self.fail_tables = set()
+
+    def execute(self, sql, params=None):
+        if 'information_schema.STATISTICS' in sql:
+            return [(name,) for name in sorted(self.indexes[params[0]])]
+        table = re.match(r'ALTER TABLE (\w+) ', sql).group(1)
+        if table in self.fail_tables and ' ADD ' in sql:
+            raise Error(msg=f'cannot rebuild {table}')
+        for name in re.findall(r'DROP INDEX (\w+)', sql):
+            self.indexes[table].discard(name)
+        for definition, name in self.names.items():
+            if f'ADD {definition}' in sql:
+                self.indexes[table].add(name)
+        return []
+
+
+class FakeCursor:
+    def __init__(self, server):
+        self.server = server
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.rows = self.server.execute(sql, params)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self):
+        return FakeCursor(self.server)
+
+
+class FakeDatabase:
+    database = 'test'
+
+    def __init__(self, server):
+        self.server = server
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self.server)
+
+    @contextmanager
+    def transaction(self):
+        # 没有performance_schema权限，重建时不报告进度
+        raise Error(msg='access denied')
+        yield
+
+
+def test_marker_survives_crash_and_rebuild_restores_indexes(tmp_path):
+    server = FakeServer()
+    marker_path = str(tmp_path / 'bulk_load_indexes.json')
+    deferred = DeferredIndexes(FakeDatabase(server), marker_path)
+
+    assert deferred.drop(FakeConnection(server)) == 5
+    assert server.indexes == {'corpus': set(), 'sentiment_analysis': set()}
+
+    # 进程中断后重新运行：标记文件还在，不会再次删除（也不会覆盖标记文件）
+    restarted = DeferredIndexes(FakeDatabase(server), marker_path)
+    assert restarted.pending()['indexes']['corpus'][0] == ['idx_source', 'INDEX idx_source (source)']
+    assert restarted.drop(FakeConnection(server)) == 0
+
+    # 一张表重建失败时保留标记文件，下次重试
+    server.fail_tables.add('corpus')
+    assert restarted.rebuild() is False
+    assert restarted.pending() is not None
+    assert server.indexes['sentiment_analysis'] == {'idx_sentiment'}
+
+    server.fail_tables.clear()
+    assert restarted.rebuild() is True
+    assert restarted.pending() is None
+    assert server.indexes['corpus'] == {name for name, _ in DEFERRABLE_INDEXES['corpus']}
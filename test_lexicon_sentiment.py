@@ -0,0 +1,49 @@
+"""
+对照NLTK的VADER检查向量化词典评分的结果
+使用一个小词典构造VADER分析器，不需要下载vader_lexicon
+"""
+
+import pytest
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+from lexicon_sentiment import LexiconScorer
+
+LEXICON = {
+    'good': 1.9, 'bad': -2.5, 'success': 2.7, 'failure': -2.3, 'happy': 2.7,
+    'crisis': -3.1, 'support': 1.7, 'war': -2.9, 'growth': 1.6, ':)': 2.0,
+}
+
+# 不含程度副词、全大写、but、感叹号等VADER上下文规则的句子，两者结果应相同
+SENTENCES = [
+    "The talks were a good success.",
+    "This is not good.",
+    "It is not never good news for the 2 sides.",
+    "We don't think the war is bad.",
+    "Growth was not a failure in 2023, it was 3.5 percent :)",
+    "Nothing here is happy, nor is it a crisis",
+    "x y z",
+    "",
+]
+
+
+def make_vader():
+    analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    analyzer.lexicon = dict(LEXICON)
+    analyzer.constants = VaderConstants()
+    return analyzer
+
+
+@pytest.mark.parametrize('sentence', SENTENCES)
+def test_scores_match_vader(sentence):
+    expected = make_vader().polarity_scores(sentence)
+    scores = LexiconScorer(LEXICON).score_sentences([sentence])
+    for key in ('compound', 'pos', 'neg', 'neu'):
+        assert round(float(scores[key][0]), 3) == pytest.approx(expected[key], abs=1e-3), key
+
+
+def test_double_negation_applies_scalar_twice():
+    scorer = LexiconScorer(LEXICON)
+    once = scorer.score_sentences(["it is not good"])['compound'][0]
+    twice = scorer.score_sentences(["it is not never good"])['compound'][0]
+    assert once < 0 < twice
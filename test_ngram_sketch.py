@@ -0,0 +1,57 @@
+"""
+近似计数的误差上限：与精确计数比较
+"""
+
+import math
+import random
+from collections import Counter
+
+from ngram_sketch import CountMinSketch, NgramCounter, SpaceSaving, iter_ngrams
+
+
+def make_stream(seed=7, length=20000, vocabulary=2000):
+    # 长尾分布：少数项出现很多次
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    return rng.choices([f'item{i}' for i in range(vocabulary)], weights=weights, k=length)
+
+
+def test_count_min_never_underestimates():
+    stream = make_stream()
+    exact = Counter(stream)
+    epsilon = 0.001
+    sketch = CountMinSketch(epsilon, 0.01)
+    for item in stream:
+        sketch.add(item)
+    bound = epsilon * len(stream)
+    for item, count in exact.items():
+        estimate = sketch.estimate(item)
+        assert count <= estimate <= count + bound
+    assert sketch.estimate('never-added') <= bound
+
+
+def test_space_saving_bounds():
+    stream = make_stream()
+    exact = Counter(stream)
+    capacity = 100
+    summary = SpaceSaving(capacity)
+    for item in stream:
+        summary.add(item)
+    bound = math.ceil(len(stream) / capacity)
+    for item, count, error in summary.top(capacity):
+        assert count - error <= exact[item] <= count
+        assert error <= bound
+    # 次数不少于 N/capacity 的项一定在候选中
+    kept = set(summary.counts)
+    assert all(item in kept for item, count in exact.items() if count >= bound)
+
+
+def test_ngram_counter_top_matches_exact():
+    phrases = [['belt', 'and', 'road', 'initiative'], ['belt', 'and', 'road'], ['trade', 'growth']]
+    exact = Counter(iter_ngrams(phrases, 3, lambda word: word != 'and'))
+    assert exact == Counter({'belt and road': 2})
+
+    counter = NgramCounter(2, 0.01, 0.01)
+    counter.add_counts(Counter(iter_ngrams(phrases, 2, lambda word: word != 'and')))
+    assert counter.total == 2
+    assert counter.top(5) == [('road initiative', 1, 0), ('trade growth', 1, 0)]
@@ -0,0 +1,85 @@
+"""
+汇总表的增量刷新：只重算给定日期和月份，结果与全量重建一致
+"""
+
+from datetime import date
+
+import pytest
+
+from storage_backends import SQLiteBackend
+from statistics_aggregator import StatisticsAggregator
+
+ARTICLES = [
+    # (标题, 来源, 媒体, 发布日期, 情感, 得分)
+    ('a1', 'china', 'China Daily', date(2024, 10, 25), 'positive', 8.0),
+    ('a2', 'china', 'China Daily', date(2024, 10, 25), 'negative', 2.0),
+    ('a3', 'usa', 'CNN', date(2024, 10, 26), 'neutral', 5.0),
+    ('a4', 'china', 'Xinhua', date(2024, 11, 1), None, None),
+    ('a5', 'russia', 'TASS', None, 'neutral', 5.0),
+]
+
+
+@pytest.fixture
+def aggregator(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'corpus.db'))
+    conn = backend.connect()
+    backend.create_schema(conn)
+    for title, source, media, publish_date, sentiment, score in ARTICLES:
+        cursor = conn.execute(
+            "INSERT INTO corpus (title, source, media_name, type, url_hash, publish_date, publish_year) "
+            "VALUES (?, ?, ?, 'text', ?, ?, ?)",
+            (title, source, media, title, publish_date, publish_date.year if publish_date else 0))
+        if sentiment:
+            conn.execute("INSERT INTO sentiment_analysis (corpus_id, sentiment, sentiment_score) VALUES (?, ?, ?)",
+                         (cursor.lastrowid, sentiment, score))
+    conn.commit()
+    yield StatisticsAggregator(backend, conn)
+    conn.close()
+
+
+def snapshot(aggregator):
+    tables = {
+        'statistics': "SELECT stat_date, source, total_count, positive_count, negative_count, avg_sentiment FROM statistics",
+        'media_activity': "SELECT media_name, source, article_count, stat_month FROM media_activity",
+        'mv_corpus_monthly': "SELECT month, source, type, article_count FROM mv_corpus_monthly",
+        'mv_sentiment_monthly': "SELECT month, source, sentiment, article_count, score_sum FROM mv_sentiment_monthly",
+    }
+    return {table: sorted(aggregator.query(sql)) for table, sql in tables.items()}
+
+
+def test_refresh_dates_matches_rebuild(aggregator):
+    aggregator.refresh([date(2024, 10, 25), '2024-10-26', '2024-11-01', None])
+    incremental = snapshot(aggregator)
+    assert ('2024-10-25', 'china', 2, 1, 1, 5.0) in incremental['statistics']
+    assert ('', 'russia', 'text', 1) in incremental['mv_corpus_monthly']
+
+    aggregator.rebuild()
+    assert snapshot(aggregator) == incremental
+
+
+def test_refresh_only_touches_given_dates(aggregator):
+    aggregator.rebuild()
+    before = snapshot(aggregator)
+
+    # 10月26日的文章改到11月：只重算新旧日期，旧日期的汇总行被删除
+    aggregator.execute("UPDATE corpus SET publish_date = '2024-11-02', publish_year = 2024 WHERE title = 'a3'")
+    aggregator.refresh(['2024-10-26', '2024-11-02'])
+    after = snapshot(aggregator)
+    assert [row for row in after['statistics'] if row[0] == '2024-10-25'] == \
+           [row for row in before['statistics'] if row[0] == '2024-10-25']
+    assert not [row for row in after['statistics'] if row[0] == '2024-10-26']
+    assert ('CNN', 'usa', 1, '2024-11') in after['media_activity']
+    assert ('CNN', 'usa', 1, '2024-10') not in after['media_activity']
+
+    aggregator.rebuild()
+    assert snapshot(aggregator) == after
+
+
+def test_refresh_months_removes_emptied_month(aggregator):
+    aggregator.rebuild()
+    aggregator.execute("DELETE FROM corpus WHERE title = 'a4'")
+    # 11月已没有文章，只能通过months参数重算
+    aggregator.refresh_months(['2024-11'])
+    result = snapshot(aggregator)
+    assert not [row for row in result['media_activity'] if row[3] == '2024-11']
+    assert not [row for row in result['mv_corpus_monthly'] if row[0] == '2024-11']
@@ -0,0 +1,46 @@
+"""
+嵌入式SQLite后端的表结构、upsert语句和全文检索
+"""
+
+import pytest
+
+from storage_backends import SQLiteBackend
+
+
+@pytest.fixture
+def sqlite(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'corpus.db'))
+    conn = backend.connect()
+    backend.create_schema(conn)
+    yield backend, conn
+    conn.close()
+
+
+def test_schema_is_idempotent(sqlite):
+    backend, conn = sqlite
+    backend.create_schema(conn)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    assert {'corpus', 'sentiment_analysis', 'statistics', 'media_activity', 'mv_corpus_monthly',
+            'v_corpus_statistics', 'corpus_fts'} <= tables
+    assert 'publish_year' in {row[1] for row in conn.execute("PRAGMA table_info(corpus)")}
+
+
+def test_upsert_sql_updates_by_unique_key(sqlite):
+    backend, conn = sqlite
+    columns = ('title', 'content', 'source', 'type', 'url_hash')
+    query = backend.upsert_sql('corpus', columns, ('title', 'content'))
+    assert query == ("INSERT INTO corpus (title, content, source, type, url_hash) VALUES (%s, %s, %s, %s, %s) "
+                     "ON CONFLICT (url_hash) DO UPDATE SET title = excluded.title, content = excluded.content")
+    assert 'ON CONFLICT' not in backend.upsert_sql('corpus', columns)
+
+    cursor = backend.cursor(conn)
+    cursor.executemany(query, [('Belt and Road', 'first version', 'china', 'text', 'h1'),
+                               ('Trade', 'trade growth', 'china', 'text', 'h2')])
+    cursor.execute(query, ('Belt and Road forum', 'second version', 'china', 'text', 'h1'))
+    conn.commit()
+    assert conn.execute("SELECT id, title, content FROM corpus ORDER BY id").fetchall() == [
+        (1, 'Belt and Road forum', 'second version'), (2, 'Trade', 'trade growth')]
+
+    # FTS5索引由触发器同步，更新后只能检索到新内容
+    assert backend.fulltext_search(conn, 'second') == [(1, 'Belt and Road forum')]
+    assert backend.fulltext_search(conn, 'first') == []
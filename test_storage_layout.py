@@ -0,0 +1,27 @@
+"""
+存储清单的删除标记和变更记录
+"""
+
+from storage_layout import StorageLayout, make_article_id
+
+
+def test_removed_article_stays_removed_after_reload(tmp_path):
+    layout = StorageLayout(str(tmp_path))
+    url = 'https://www.chinadaily.com.cn/a/201406/06/WS1.html'
+    article_id = make_article_id(url)
+    layout.register_article(article_id, 'Old article', url, images=[f'{article_id}_1.jpeg'])
+    layout.register_article(make_article_id('https://example.com/kept'), 'Kept', 'https://example.com/kept')
+
+    assert layout.remove_article(article_id)['title'] == 'Old article'
+    assert layout.remove_article(article_id) is None
+    layout.append_change(article_id, url, 'deleted', title='Old article')
+
+    reloaded = StorageLayout(str(tmp_path))
+    assert reloaded.get_article(article_id) is None
+    assert len(reloaded.articles) == 1
+    assert [record['id'] for record in reloaded.iter_changes(statuses=('deleted',))] == [article_id]
+
+    # 删除后重新爬取到的文章恢复为正常记录；压缩后的清单不再含删除标记
+    reloaded.register_article(article_id, 'Old article', url)
+    reloaded.compact_manifest()
+    assert StorageLayout(str(tmp_path)).get_article(article_id)['title'] == 'Old article'
@@ -0,0 +1,36 @@
+"""
+分析结果缓存的读写和命中统计
+"""
+
+from token_cache import TokenCache, content_key
+
+
+def test_round_trip_and_hit_miss(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return {'words': {'belt': 2, 'road': 1}, 'pair': (1, 2)}
+
+    cache = TokenCache('test-v1', path)
+    first = cache.cached('Belt and Road', compute)
+    second = cache.cached('Belt and Road', compute)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert calls == ['Belt and Road']
+    # 未命中时返回计算结果本身，命中时结果经过JSON往返：元组变成列表
+    assert first == {'words': {'belt': 2, 'road': 1}, 'pair': (1, 2)}
+    assert second == {'words': {'belt': 2, 'road': 1}, 'pair': [1, 2]}
+    cache.close()
+
+    # 重新打开后仍能读到；其他命名空间读不到
+    cache = TokenCache('test-v1', path)
+    assert cache.get(content_key('Belt and Road')) == second
+    assert cache.get(content_key('other text')) is None
+    other = TokenCache('test-v2', path)
+    assert other.get(content_key('Belt and Road')) is None
+    other.close()
+
+    assert cache.clear() == 1
+    assert cache.get(content_key('Belt and Road')) is None
+    cache.close()
@@ -0,0 +1,43 @@
+"""
+多进程分词与单进程分词的结果一致
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip('jieba')
+pytest.importorskip('pandas')
+
+from word_frequency_analysis import count_tokens, count_tokens_parallel
+
+BODIES = [
+    '一带一路倡议促进了沿线国家的经济合作。',
+    '中国与俄罗斯的贸易额持续增长，经济合作不断深化。',
+    'The Belt and Road Initiative promotes trade.',
+    '',
+    '美国媒体关注中国经济增长。' * 3,
+]
+
+
+def write_texts(texts_dir):
+    os.makedirs(texts_dir)
+    paths = []
+    for i, body in enumerate(BODIES):
+        path = os.path.join(texts_dir, f'article{i}.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"标题: 文章{i}\n网址: https://example.com/{i}\n\n{body}\n")
+        paths.append(path)
+    return paths
+
+
+def test_parallel_matches_serial(tmp_path):
+    paths = write_texts(str(tmp_path / 'texts'))
+    serial = count_tokens(paths)
+    assert serial[1] == 4
+    assert count_tokens_parallel(paths, workers=2) == serial
+
+    # 使用缓存时结果相同，第二次全部命中缓存
+    cache_path = str(tmp_path / 'token_cache.db')
+    assert count_tokens_parallel(paths, 2, cache_path)[:2] == serial[:2]
+    assert count_tokens_parallel(paths, 2, cache_path) == serial[:2] + (4,)
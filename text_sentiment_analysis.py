@@ -1,100 +1,283 @@
 import os
 import re
+import json
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import nltk
 from nltk.sentiment import SentimentIntensityAnalyzer
 
-# 下载VADER词典（用于情感分析）
-nltk.download('vader_lexicon', quiet=True)
+from storage_layout import StorageLayout
+from article_reader import read_article
+from token_cache import DEFAULT_CACHE_PATH, TokenCache, content_key
+
+# 输出文件：文本汇总（data_processor_fixed.py按此格式导入）和逐篇的结构化结果
+results_file = 'text_sentiment_analysis_results.txt'
+jsonl_file = 'text_sentiment_analysis_results.jsonl'
+# 结果缓存的命名空间，评分规则变化时更换版本号
+cache_namespace = 'vader-sentences-v1'
+
+# 分句规则：换行，中文句末标点之后，英文句末标点后接空白
+sentence_break_pattern = re.compile(r'\n+|(?<=[。！？])|(?<=[.!?])\s+')
+
+# 分类阈值（VADER推荐值）；文章得分是各句平均值，不像整篇评分那样趋近±1，负面阈值不再用-0.5
+SENTENCE_THRESHOLD = 0.05
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+# 工作进程中的情感分析器，每个进程初始化一次
+sia = None
+
+
+def init_worker():
+    global sia
+    sia = SentimentIntensityAnalyzer()
+
+
+def split_sentences(text):
+    return [sentence for sentence in (part.strip() for part in sentence_break_pattern.split(text)) if sentence]
+
+
+def score_document(body):
+    """
+    逐句用VADER评分，文章得分取各句得分的平均值（VADER对长文本的建议做法）
+    :return: compound、pos、neg、neu（各句平均）以及句子统计
+    """
+    sentences = split_sentences(body)
+    if not sentences:
+        return {'compound': 0.0, 'pos': 0.0, 'neg': 0.0, 'neu': 1.0, 'sentence_count': 0,
+                'positive_sentences': 0, 'negative_sentences': 0, 'neutral_sentences': 0,
+                'max_compound': 0.0, 'min_compound': 0.0}
 
-# 初始化情感分析器
-sia = SentimentIntensityAnalyzer()
+    totals = {'compound': 0.0, 'pos': 0.0, 'neg': 0.0, 'neu': 0.0}
+    compounds = []
+    for sentence in sentences:
+        scores = sia.polarity_scores(sentence)
+        for key in totals:
+            totals[key] += scores[key]
+        compounds.append(scores['compound'])
 
-# 统计变量
-positive = 0
-negative = 0
-neutral = 0
-positive_articles = []
-negative_articles = []
-neutral_articles = []
+    count = len(sentences)
+    result = {key: round(value / count, 4) for key, value in totals.items()}
+    result.update({
+        'sentence_count': count,
+        'positive_sentences': sum(1 for c in compounds if c >= SENTENCE_THRESHOLD),
+        'negative_sentences': sum(1 for c in compounds if c <= -SENTENCE_THRESHOLD),
+        'neutral_sentences': sum(1 for c in compounds if -SENTENCE_THRESHOLD < c < SENTENCE_THRESHOLD),
+        'max_compound': max(compounds),
+        'min_compound': min(compounds),
+    })
+    return result
 
-# 遍历texts文件夹中的所有txt文件
-for file in os.listdir('texts'):
-    if file.endswith('.txt'):
-        file_path = os.path.join('texts', file)
+
+def classify(compound_score):
+    # 根据复合得分分类
+    if compound_score >= POSITIVE_THRESHOLD:
+        return 'positive'
+    if compound_score <= NEGATIVE_THRESHOLD:
+        return 'negative'
+    return 'neutral'
+
+
+def iter_documents(layout):
+    """逐篇产出 (文本路径, 标题, 文章)，只对正文评分；读取失败的文件跳过"""
+    for file_path in layout.iter_text_files():
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-                # 使用文件名作为标题
-                title = file.replace('.txt', '')
-                
-                # 进行情感分析
-                scores = sia.polarity_scores(content)
-                compound_score = scores['compound']
-                
-                # 根据复合得分分类
-                if compound_score >= 0.05:
-                    positive += 1
-                    positive_articles.append((title, compound_score))
-                elif compound_score <= -0.5:
-                    negative += 1
-                    negative_articles.append((title, compound_score))
-                else:
-                    neutral += 1
-                    neutral_articles.append((title, compound_score))
+            article = read_article(file_path)
         except Exception as e:
-            print(f"处理文件 {file} 时出错: {e}")
-
-# 按情感得分排序
-positive_articles.sort(key=lambda x: x[1], reverse=True)
-negative_articles.sort(key=lambda x: x[1])
-neutral_articles.sort(key=lambda x: abs(x[1]))
-
-# 打印汇总结果
-print("=" * 60)
-print("情感分析汇总结果")
-print("=" * 60)
-print(f"正向报道: {positive}篇")
-print(f"负面报道: {negative}篇")
-print(f"中性报道: {neutral}篇")
-print(f"总计: {positive + negative + neutral}篇")
-print("=" * 60)
-
-# 保存详细分析结果到文件
-with open('text_sentiment_analysis_results.txt', 'w', encoding='utf-8-sig') as f:
-    f.write("情感分析详细结果\n")
-    f.write("==============\n\n")
-    
-    f.write(f"汇总统计:\n")
-    f.write(f"正向报道: {positive}篇\n")
-    f.write(f"负面报道: {negative}篇\n")
-    f.write(f"中性报道: {neutral}篇\n")
-    f.write(f"总计: {positive + negative + neutral}篇\n\n")
-    
-    f.write("正向报道列表 (共{}篇):\n".format(positive))
-    for i, (title, score) in enumerate(positive_articles, 1):
-        f.write(f"{i}. {title} (得分: {score:.3f})\n")
-    
-    f.write("\n负面报道列表 (共{}篇):\n".format(negative))
-    for i, (title, score) in enumerate(negative_articles, 1):
-        f.write(f"{i}. {title} (得分: {score:.3f})\n")
-    
-    f.write("\n中性报道列表 (共{}篇):\n".format(neutral))
-    for i, (title, score) in enumerate(neutral_articles, 1):
-        f.write(f"{i}. {title} (得分: {score:.3f})\n")
-
-print("\n详细分析结果已保存到 text_sentiment_analysis_results.txt")
-
-# 显示最积极的5篇报道
-print("\n最积极的5篇报道:")
-print("-" * 60)
-for i, (title, score) in enumerate(positive_articles[:5], 1):
-    print(f"{i}. {title}")
-    print(f"   得分: {score:.3f}")
-
-# 显示最消极的5篇报道
-print("\n最消极的5篇报道:")
-print("-" * 60)
-for i, (title, score) in enumerate(negative_articles[:5], 1):
-    print(f"{i}. {title}")
-    print(f"   得分: {score:.3f}") 
\ No newline at end of file
+            print(f"处理文件 {os.path.basename(file_path)} 时出错: {e}")
+            continue
+        # 使用文件名作为标题，分片布局下从清单中取标题（与导入时按标题匹配一致）
+        yield file_path, layout.title_for_text_path(file_path), article
+
+
+def iter_scores(documents, workers, cache=None):
+    """
+    按文件顺序产出 (文本路径, 标题, 文章, 得分)
+    命中缓存的文章不再评分，其余在进程池中逐句评分，同时在途的任务数有上限
+    """
+    if workers <= 1:
+        init_worker()
+        for file_path, title, article in documents:
+            body = article['body']
+            scores = cache.cached(body, score_document) if cache else score_document(body)
+            yield file_path, title, article, scores
+        return
+
+    max_in_flight = workers * 8
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        in_flight = deque()
+
+        def finish():
+            file_path, title, article, key, pending = in_flight.popleft()
+            if isinstance(pending, dict):
+                return file_path, title, article, pending
+            scores = pending.result()
+            if cache:
+                cache.put(key, scores)
+            return file_path, title, article, scores
+
+        for file_path, title, article in documents:
+            key = content_key(article['body']) if cache else None
+            scores = cache.get(key) if cache else None
+            if scores is not None:
+                cache.hits += 1
+                in_flight.append((file_path, title, article, key, scores))
+            else:
+                if cache:
+                    cache.misses += 1
+                in_flight.append((file_path, title, article, key, pool.submit(score_document, article['body'])))
+            if len(in_flight) >= max_in_flight:
+                yield finish()
+        while in_flight:
+            yield finish()
+
+
+def iter_lexicon_scores(documents, scorer, batch_size):
+    """按批用向量化的词典评分（见lexicon_sentiment.py），按文件顺序产出 (文本路径, 标题, 文章, 得分)"""
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield from score_lexicon_batch(batch, scorer)
+            batch = []
+    if batch:
+        yield from score_lexicon_batch(batch, scorer)
+
+
+def score_lexicon_batch(batch, scorer):
+    results = scorer.score_documents([split_sentences(article['body']) for _, _, article in batch])
+    for (file_path, title, article), scores in zip(batch, results):
+        yield file_path, title, article, scores
+
+
+def write_text_report(articles):
+    """按原来的格式写文本汇总"""
+    positive_articles, negative_articles, neutral_articles = articles['positive'], articles['negative'], articles['neutral']
+    positive, negative, neutral = len(positive_articles), len(negative_articles), len(neutral_articles)
+
+    with open(results_file, 'w', encoding='utf-8-sig') as f:
+        f.write("情感分析详细结果\n")
+        f.write("==============\n\n")
+
+        f.write(f"汇总统计:\n")
+        f.write(f"正向报道: {positive}篇\n")
+        f.write(f"负面报道: {negative}篇\n")
+        f.write(f"中性报道: {neutral}篇\n")
+        f.write(f"总计: {positive + negative + neutral}篇\n\n")
+
+        f.write("正向报道列表 (共{}篇):\n".format(positive))
+        for i, (title, score) in enumerate(positive_articles, 1):
+            f.write(f"{i}. {title} (得分: {score:.3f})\n")
+
+        f.write("\n负面报道列表 (共{}篇):\n".format(negative))
+        for i, (title, score) in enumerate(negative_articles, 1):
+            f.write(f"{i}. {title} (得分: {score:.3f})\n")
+
+        f.write("\n中性报道列表 (共{}篇):\n".format(neutral))
+        for i, (title, score) in enumerate(neutral_articles, 1):
+            f.write(f"{i}. {title} (得分: {score:.3f})\n")
+
+
+def write_parquet(records, path):
+    """写Parquet文件（需要pandas和pyarrow），失败时只提示，不影响其他输出"""
+    try:
+        import pandas as pd
+        pd.DataFrame(records).to_parquet(path, index=False)
+        print(f"结构化结果已保存到 {path}")
+    except Exception as e:
+        print(f"保存Parquet文件失败（需要pandas和pyarrow）: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文章情感分析（逐句评分）')
+    parser.add_argument('--engine', choices=('vader', 'lexicon'), default='vader',
+                        help='vader：NLTK的VADER（默认）；lexicon：向量化的词典评分，适合批量处理大量文章（需要numpy和scipy）')
+    parser.add_argument('--lexicon', help='lexicon引擎额外加载的词典文件（每行“词语<TAB>分值”），如中文情感词典')
+    parser.add_argument('--batch-size', type=int, default=2000, help='lexicon引擎每批评分的文章数（默认2000）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='vader引擎评分的进程数（默认等于CPU核数，1为单进程）')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help=f'vader引擎的结果缓存文件，只分析新增或修改过的文章（默认{DEFAULT_CACHE_PATH}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用结果缓存')
+    parser.add_argument('--jsonl', default=jsonl_file, help=f'逐篇结构化结果的JSONL文件（默认{jsonl_file}）')
+    parser.add_argument('--parquet', help='同时把逐篇结果写入Parquet文件（需要pyarrow）')
+    args = parser.parse_args()
+
+    # 下载VADER词典（用于情感分析）
+    nltk.download('vader_lexicon', quiet=True)
+
+    # lexicon引擎整批评分比查缓存还快，不使用缓存
+    cache = None if args.no_cache or args.engine == 'lexicon' else TokenCache(cache_namespace, args.cache)
+    layout = StorageLayout()
+    if args.engine == 'lexicon':
+        from lexicon_sentiment import build_scorer
+        scores_iter = iter_lexicon_scores(iter_documents(layout), build_scorer(args.lexicon), args.batch_size)
+    else:
+        scores_iter = iter_scores(iter_documents(layout), args.workers, cache)
+    articles = {'positive': [], 'negative': [], 'neutral': []}
+    records = [] if args.parquet else None
+
+    try:
+        with open(args.jsonl, 'w', encoding='utf-8') as jsonl:
+            for file_path, title, article, scores in scores_iter:
+                sentiment = classify(scores['compound'])
+                articles[sentiment].append((title, scores['compound']))
+                record = {
+                    'title': title,
+                    'text_path': file_path,
+                    'url': article.get('url'),
+                    'publish_date': article.get('publish_date'),
+                    'sentiment': sentiment,
+                }
+                record.update(scores)
+                jsonl.write(json.dumps(record, ensure_ascii=False) + '\n')
+                if records is not None:
+                    records.append(record)
+    finally:
+        if cache:
+            print(f"{cache.hits} 篇文章使用缓存的得分，{cache.misses} 篇重新分析")
+            cache.close()
+
+    # 按情感得分排序
+    positive_articles, negative_articles, neutral_articles = articles['positive'], articles['negative'], articles['neutral']
+    positive_articles.sort(key=lambda x: x[1], reverse=True)
+    negative_articles.sort(key=lambda x: x[1])
+    neutral_articles.sort(key=lambda x: abs(x[1]))
+    positive, negative, neutral = len(positive_articles), len(negative_articles), len(neutral_articles)
+
+    # 打印汇总结果
+    print("=" * 60)
+    print("情感分析汇总结果")
+    print("=" * 60)
+    print(f"正向报道: {positive}篇")
+    print(f"负面报道: {negative}篇")
+    print(f"中性报道: {neutral}篇")
+    print(f"总计: {positive + negative + neutral}篇")
+    print("=" * 60)
+
+    # 保存详细分析结果到文件
+    write_text_report(articles)
+    print(f"\n详细分析结果已保存到 {results_file}")
+    print(f"逐篇结构化结果已保存到 {args.jsonl}")
+    if records is not None:
+        write_parquet(records, args.parquet)
+
+    # 显示最积极的5篇报道
+    print("\n最积极的5篇报道:")
+    print("-" * 60)
+    for i, (title, score) in enumerate(positive_articles[:5], 1):
+        print(f"{i}. {title}")
+        print(f"   得分: {score:.3f}")
+
+    # 显示最消极的5篇报道
+    print("\n最消极的5篇报道:")
+    print("-" * 60)
+    for i, (title, score) in enumerate(negative_articles[:5], 1):
+        print(f"{i}. {title}")
+        print(f"   得分: {score:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析结果缓存：按文章内容哈希保存每篇文章的分词计数、情感得分等中间结果
+词频分析和情感分析每次运行时只处理新增或修改过的文章，其余文章直接取缓存再合并成全库结果。
+缓存是一个SQLite文件（默认 token_cache.db），每条记录是JSON经zlib压缩后的二进制数据，
+以 (命名空间, 内容的SHA256摘要) 为键；命名空间区分不同的分析方法及其版本（如 jieba-0.42.1），
+分词规则或词典变化时换一个命名空间即可，旧记录可以用 --clear-cache 清除。
+"""
+
+import json
+import zlib
+import sqlite3
+import hashlib
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'token_cache.db'
+# 每写入这么多条记录提交一次
+COMMIT_EVERY = 200
+
+
+def content_key(text: str) -> bytes:
+    """缓存键：内容的SHA256摘要（32字节）"""
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+
+class TokenCache:
+    def __init__(self, namespace: str, path: str = DEFAULT_CACHE_PATH):
+        """
+        :param namespace: 命名空间，区分不同的分析方法及其版本
+        :param path: 缓存文件路径；多个进程可以同时读写同一个文件
+        """
+        self.namespace = namespace
+        self.path = path
+        # 多进程同时写入时等待锁，而不是立即报错
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_cache ("
+            "namespace TEXT NOT NULL, content_hash BLOB NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (namespace, content_hash)) WITHOUT ROWID"
+        )
+        self.conn.commit()
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[Any]:
+        """读取一条缓存，不存在或无法解码时返回None"""
+        row = self.conn.execute(
+            "SELECT data FROM token_cache WHERE namespace = ? AND content_hash = ?", (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(row[0]))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"缓存记录无法解码（{e}），重新计算")
+            return None
+
+    def put(self, key: bytes, value: Any):
+        """写入一条缓存，每COMMIT_EVERY条提交一次"""
+        data = zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO token_cache (namespace, content_hash, data) VALUES (?, ?, ?)",
+            (self.namespace, key, data)
+        )
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    def cached(self, text: str, compute: Callable[[str], Any]) -> Any:
+        """
+        取text对应的缓存结果，没有时调用compute(text)计算并写入缓存
+        命中缓存时结果经过JSON往返：元组变成列表，字典的键变成字符串；调用方应能同时处理两种形式
+        """
+        key = content_key(text)
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute(text)
+        self.put(key, value)
+        return value
+
+    def clear(self) -> int:
+        """删除本命名空间的全部缓存，返回删除的条数"""
+        cursor = self.conn.execute("DELETE FROM token_cache WHERE namespace = ?", (self.namespace,))
+        self.conn.commit()
+        return cursor.rowcount
+
+    def commit(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -1,12 +1,22 @@
 import os
 import re
+import heapq
+import argparse
 import jieba
 import pandas as pd
 from collections import Counter
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from storage_layout import StorageLayout
+from article_reader import read_article
+from token_cache import DEFAULT_CACHE_PATH, TokenCache
 
 # 文件夹路径
 texts_folder = 'texts'
 output_file = '词频分析结果.xlsx'
+# 分词缓存的命名空间：jieba版本变化（词典可能不同）时不复用旧的分词结果
+cache_namespace = f"jieba-{getattr(jieba, '__version__', '')}"
 
 # 常见中文停用词
 chinese_stopwords = set(['的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', 
@@ -21,131 +31,181 @@ english_stopwords = set(['the', 'and', 'of', 'to', 'in', 'for', 'is', 'on', 'tha
                         'said', 'were', 'been', 'would', 'more', 'we', 'other', 'year', 'all', 
                         'had', 'our', 'new', 'one', 'two', 'his', 'her', 'him', 'she', 'he', 'i'])
 
-# 用于存储所有文章的内容
-all_text = ''
+# 预编译的过滤规则：含中文字符的词，以及纯英文单词
+chinese_pattern = re.compile(r'[\u4e00-\u9fa5]')
+english_pattern = re.compile(r'[a-zA-Z]+')
+
 
-# 处理文本文件
+# 处理文本文件：正文由article_reader统一切分（优先读取爬虫写的元数据文件）
 def extract_main_content(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 检查文件是否包含中文
-        if not re.search(r'[\u4e00-\u9fa5]', content):
-            return ""  # 如果没有中文，则返回空字符串
-            
-        lines = content.split('\n')
-        
-        # 跳过前面的标题和网址
-        start_line = 0
-        for i, line in enumerate(lines):
-            if line.strip() and not line.startswith('标题:') and not line.startswith('网址:'):
-                start_line = i
-                break
-        
-        # 找到图片列表的位置
-        end_line = len(lines)
-        for i, line in enumerate(lines):
-            if '图片列表:' in line or '视频列表:' in line:
-                end_line = i
-                break
-        
-        # 提取正文
-        main_content = '\n'.join(lines[start_line:end_line])
-        return main_content
+        return read_article(file_path)['body']
     except Exception as e:
         print(f"处理文件 {file_path} 时出错: {e}")
         return ""
 
-print(f"开始处理 {texts_folder} 文件夹中的文本文件...")
-
-# 处理所有文本文件
-file_count = 0
-for filename in os.listdir(texts_folder):
-    if filename.endswith('.txt'):
-        file_path = os.path.join(texts_folder, filename)
-        content = extract_main_content(file_path)
-        if content:  # 确保内容不为空
-            all_text += content + '\n'
-            file_count += 1
-
-print(f"成功处理了 {file_count} 个文本文件")
-
-if file_count == 0:
-    print("没有找到有效的中文文本文件，程序退出")
-    exit()
-
-# 使用jieba进行中文分词
-print("正在进行中文分词...")
-words = jieba.cut(all_text)
-words_list = list(words)  # 将生成器转换为列表
-
-# 过滤停用词和单字词
-valid_words = []
-for word in words_list:
-    word = word.strip()
-    # 如果是中文词且长度大于1且不是停用词
-    if re.search(r'[\u4e00-\u9fa5]', word) and len(word) > 1 and word not in chinese_stopwords:
-        valid_words.append(word)
-    # 如果是英文词且长度大于2且不是停用词 
-    elif re.match(r'^[a-zA-Z]+$', word) and len(word) > 2 and word.lower() not in english_stopwords:
-        valid_words.append(word)
-
-print(f"有效词数量: {len(valid_words)}")
-
-# 统计词频
-word_count = Counter(valid_words)
-total_words = sum(word_count.values())
-
-print(f"词汇总数: {total_words}")
-print(f"独立词汇数: {len(word_count)}")
-
-# 获取频率最高的词
-top_words = word_count.most_common(50)  # 取50个，确保至少有40个
-
-# 准备数据
-data = {
-    '词语': [],
-    '出现次数': [],
-    '频率 (%)': [],
-    '语言': []
-}
-
-for word, count in top_words:
-    if count < 3:  # 出现次数太少的不考虑
-        continue
-    frequency = (count / total_words) * 100
-    data['词语'].append(word)
-    data['出现次数'].append(count)
-    data['频率 (%)'].append(round(frequency, 4))
-    # 判断词语是中文还是英文
-    if re.search(r'[\u4e00-\u9fa5]', word):
-        data['语言'].append('中文')
-    else:
-        data['语言'].append('英文')
-
-# 创建DataFrame
-df = pd.DataFrame(data)
-
-# 分别获取中文和英文词频
-df_chinese = df[df['语言'] == '中文']
-df_english = df[df['语言'] == '英文']
-
-print("保存结果到Excel...")
-
-try:
-    # 使用ExcelWriter保存到不同的sheet
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='所有词频', index=False)
-        df_chinese.to_excel(writer, sheet_name='中文词频', index=False)
-        df_english.to_excel(writer, sheet_name='英文词频', index=False)
-    print(f'词频分析完成，结果已保存到 {output_file}')
-except Exception as e:
-    print(f"保存Excel文件时出错: {e}")
-    
-    # 尝试保存为CSV文件作为备选
+
+def is_valid_word(word):
+    # 中文词长度大于1且不是停用词，英文词长度大于2且不是停用词
+    if chinese_pattern.search(word):
+        return len(word) > 1 and word not in chinese_stopwords
+    return english_pattern.fullmatch(word) is not None and len(word) > 2 and word.lower() not in english_stopwords
+
+
+def segment(content):
+    # 一篇文章的分词计数（过滤前），写入缓存
+    return Counter(jieba.cut(content))
+
+
+def count_tokens(file_paths, cache_path=None):
+    """
+    逐篇分词，分词结果直接计入Counter，不拼接全文也不保存分词列表，内存只与词汇量有关
+    :param cache_path: 分词缓存文件，内容没变的文章直接使用缓存的计数；为None时不使用缓存
+    :return: (所有分词的计数, 有效文件数, 命中缓存的文件数)
+    """
+    cache = TokenCache(cache_namespace, cache_path) if cache_path else None
+    token_count = Counter()
+    file_count = 0
+    try:
+        for file_path in file_paths:
+            content = extract_main_content(file_path)
+            if content:  # 确保内容不为空
+                token_count.update(cache.cached(content, segment) if cache else segment(content))
+                file_count += 1
+    finally:
+        if cache:
+            cache.close()
+    return token_count, file_count, cache.hits if cache else 0
+
+
+def init_worker():
+    # 每个工作进程启动时加载一次jieba词典
+    jieba.initialize()
+
+
+def count_tokens_parallel(file_paths, workers, cache_path=None):
+    """
+    把文件按顺序切成连续的分片交给进程池分词，各进程返回部分计数后按分片顺序合并
+    分片比进程数多几倍，文章长短不一时各进程的负载也比较均衡
+    :return: (所有分词的计数, 有效文件数, 命中缓存的文件数)
+    """
+    file_paths = list(file_paths)
+    shard_size = max(1, -(-len(file_paths) // (workers * 4)))
+    shards = [file_paths[i:i + shard_size] for i in range(0, len(file_paths), shard_size)]
+
+    token_count = Counter()
+    file_count = cached_count = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        for shard_count, shard_files, shard_cached in pool.map(partial(count_tokens, cache_path=cache_path), shards):
+            token_count.update(shard_count)
+            file_count += shard_files
+            cached_count += shard_cached
+    return token_count, file_count, cached_count
+
+
+def filter_words(token_count):
+    """过滤停用词和单字词：每个不同的分词只判断一次"""
+    word_count = Counter()
+    for token, count in token_count.items():
+        word = token.strip()
+        if is_valid_word(word):
+            word_count[word] += count
+    return word_count
+
+
+def build_frequency_table(word_count, top_n=50, min_count=3):
+    """
+    取频率最高的词（取50个，确保至少有40个），出现次数太少的不考虑
+    次数相同的词按词语排序，结果与分词的进程数无关
+    """
+    total_words = sum(word_count.values())
+    data = {
+        '词语': [],
+        '出现次数': [],
+        '频率 (%)': [],
+        '语言': []
+    }
+
+    for word, count in heapq.nsmallest(top_n, word_count.items(), key=lambda item: (-item[1], item[0])):
+        if count < min_count:
+            continue
+        frequency = (count / total_words) * 100
+        data['词语'].append(word)
+        data['出现次数'].append(count)
+        data['频率 (%)'].append(round(frequency, 4))
+        # 判断词语是中文还是英文
+        data['语言'].append('中文' if chinese_pattern.search(word) else '英文')
+
+    return pd.DataFrame(data)
+
+
+def save_results(df):
+    # 分别获取中文和英文词频
+    df_chinese = df[df['语言'] == '中文']
+    df_english = df[df['语言'] == '英文']
+
+    print("保存结果到Excel...")
+
     try:
-        df.to_csv('词频分析结果.csv', index=False, encoding='utf-8-sig')
-        print("词频分析结果已保存为CSV文件")
-    except Exception as e2:
-        print(f"保存CSV文件也失败: {e2}") 
\ No newline at end of file
+        # 使用ExcelWriter保存到不同的sheet
+        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name='所有词频', index=False)
+            df_chinese.to_excel(writer, sheet_name='中文词频', index=False)
+            df_english.to_excel(writer, sheet_name='英文词频', index=False)
+        print(f'词频分析完成，结果已保存到 {output_file}')
+    except Exception as e:
+        print(f"保存Excel文件时出错: {e}")
+
+        # 尝试保存为CSV文件作为备选
+        try:
+            df.to_csv('词频分析结果.csv', index=False, encoding='utf-8-sig')
+            print("词频分析结果已保存为CSV文件")
+        except Exception as e2:
+            print(f"保存CSV文件也失败: {e2}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='中英文词频分析')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='分词的进程数（默认等于CPU核数，1为单进程）')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help=f'分词缓存文件，只对新增或修改过的文章分词（默认{DEFAULT_CACHE_PATH}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用分词缓存')
+    parser.add_argument('--clear-cache', action='store_true', help='先清除分词缓存再分析')
+    args = parser.parse_args()
+    cache_path = None if args.no_cache else args.cache
+
+    if cache_path and args.clear_cache:
+        cache = TokenCache(cache_namespace, cache_path)
+        print(f"已清除 {cache.clear()} 条分词缓存")
+        cache.close()
+
+    print(f"开始处理 {texts_folder} 文件夹中的文本文件...")
+
+    # 使用jieba逐篇进行中文分词
+    file_paths = StorageLayout().iter_text_files()
+    if args.workers > 1:
+        print(f"正在进行中文分词（{args.workers} 个进程）...")
+        token_count, file_count, cached_count = count_tokens_parallel(file_paths, args.workers, cache_path)
+    else:
+        print("正在进行中文分词...")
+        token_count, file_count, cached_count = count_tokens(file_paths, cache_path)
+
+    print(f"成功处理了 {file_count} 个文本文件（{cached_count} 个使用缓存的分词结果）")
+
+    if file_count == 0:
+        print("没有找到有效的中文文本文件，程序退出")
+        return
+
+    word_count = filter_words(token_count)
+    total_words = sum(word_count.values())
+
+    print(f"有效词数量: {total_words}")
+    print(f"词汇总数: {total_words}")
+    print(f"独立词汇数: {len(word_count)}")
+
+    save_results(build_frequency_table(word_count))
+
+
+if __name__ == '__main__':
+    main()